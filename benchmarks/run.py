@@ -0,0 +1,201 @@
+"""
+Benchmarks of wftools clients and commands against the in-process ServiceStub of the tests,
+so that they run offline with controlled latency, payload size and errors.
+
+    python benchmarks/run.py -o results.json
+    python benchmarks/run.py -o new.json --compare results.json
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import click
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'tests')]
+
+from mock_server import ServiceStub, workflow_id  # noqa: E402
+from wftools.cromwell import CromwellClient  # noqa: E402
+from wftools.parallel import imap_unordered  # noqa: E402
+from wftools.profile import summarize  # noqa: E402
+from wftools.scripts.wftools import cli  # noqa: E402
+from wftools.trace import percentile  # noqa: E402
+
+BENCHMARKS = dict()
+
+
+def benchmark(name):
+    """
+    Register a benchmark: a function (stub, options) returning (number of successful operations, list of
+    latencies of successful attempts, number of failed attempts)
+    """
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def attempt(func, *args):
+    """Time a call, returning (result, seconds, error) so that failures injected by the stub are counted"""
+    start = time.perf_counter()
+    try:
+        return func(*args), time.perf_counter() - start, None
+    except Exception as e:
+        return None, time.perf_counter() - start, e
+
+
+def repeat(func, times):
+    """Call func(i) for i in range(times), return (list of results, latencies and errors of attempts)"""
+    results, latencies, errors = [], [], 0
+    for i in range(times):
+        result, latency, error = attempt(func, i)
+        if error is None:
+            results.append(result)
+            latencies.append(latency)
+        else:
+            errors += 1
+    return results, latencies, errors
+
+
+@benchmark('single_status')
+def single_status(stub, options):
+    with CromwellClient(stub.url) as client:
+        _, latencies, errors = repeat(lambda i: client.status(workflow_id(i % len(stub.workflows))),
+                                      options['requests'])
+    return len(latencies), latencies, errors
+
+
+@benchmark('bulk_status')
+def bulk_status(stub, options):
+    ids = [workflow_id(i % len(stub.workflows)) for i in range(options['requests'])]
+    with CromwellClient(stub.url, pool_size=options['workers']) as client:
+        results = list(imap_unordered(lambda i: timed(client.status, i), ids, options['workers']))
+    latencies = [result[1] for _, result, error in results if error is None]
+    return len(latencies), latencies, len(results) - len(latencies)
+
+
+@benchmark('list_pagination')
+def list_pagination(stub, options):
+    with CromwellClient(stub.url) as client:
+        workflows, latencies, errors = repeat(lambda i: list(client.iter_workflows(page_size=options['page_size'])), 1)
+    return sum(len(w) for w in workflows), latencies, errors
+
+
+@benchmark('metadata_parsing')
+def metadata_parsing(stub, options):
+    with CromwellClient(stub.url) as client:
+        calls, latencies, errors = repeat(
+            lambda i: summarize(client.iter_shards(workflow_id(i)), workflow_id(i))['calls'], options['iterations'])
+    return sum(c.shards for workflow_calls in calls for c in workflow_calls), latencies, errors
+
+
+@benchmark('batch_submission')
+def batch_submission(stub, options):
+    inputs = [{'main.sample': 'sample{}'.format(i)} for i in range(options['batch_size'])]
+    workflow = os.path.join(ROOT, 'tests', 'hello.wdl')
+    with CromwellClient(stub.url) as client:
+        batches, latencies, errors = repeat(lambda i: client.submit_batch(workflow, inputs), options['iterations'])
+    return len(batches) * len(inputs), latencies, errors
+
+
+@benchmark('output_collection')
+def output_collection(stub, options):
+    from click.testing import CliRunner
+
+    with tempfile.TemporaryDirectory() as directory:
+        outputs = dict()
+        for i in range(options['files']):
+            path = os.path.join(directory, 'out{}.bin'.format(i))
+            with open(path, 'wb') as file:
+                file.write(os.urandom(options['file_size']))
+            outputs['main.call{}.out'.format(i % 10)] = outputs.get('main.call{}.out'.format(i % 10), []) + [path]
+        stub.outputs = outputs
+
+        def collect(i):
+            destination = os.path.join(directory, 'collected{}'.format(i))
+            result = CliRunner().invoke(cli, ['cromwell', '--no-cache', 'collect', '-h', stub.url, workflow_id(0),
+                                              destination])
+            if result.exit_code:
+                raise Exception(result.output)
+
+        collected, latencies, errors = repeat(collect, options['iterations'])
+    return options['files'] * len(collected), latencies, errors
+
+
+def revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=ROOT).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run(name, options):
+    """
+    Run a benchmark against a new ServiceStub
+    :return: dict of results, durations in seconds
+    """
+    with ServiceStub(workflows=options['workflows'], calls=options['calls'], shards=options['shards'],
+                     padding=options['padding'], latency=options['latency'], error_rate=options['error_rate'],
+                     seed=0, record_requests=False) as stub:
+        (operations, latencies, errors), seconds = timed(BENCHMARKS[name], stub, options)
+    latencies.sort()
+    return dict(name=name, operations=operations, errors=errors, seconds=round(seconds, 6),
+                throughput=round(operations / seconds, 3) if seconds else None,
+                p50=percentile(latencies, 50), p95=percentile(latencies, 95), max=latencies[-1] if latencies else None)
+
+
+@click.command()
+@click.option('-o', '--output', type=click.Path(), help='Write results to this JSON file')
+@click.option('-k', '--benchmark', 'names', multiple=True, type=click.Choice(list(BENCHMARKS)),
+              help='Run only these benchmarks')
+@click.option('--compare', type=click.File(), help='Results of a previous run to compare throughput with')
+@click.option('--requests', default=500, show_default=True, help='Status requests of single and bulk benchmarks')
+@click.option('--workers', default=10, show_default=True, help='Simultaneous requests of bulk status')
+@click.option('--workflows', default=2000, show_default=True, help='Workflows listed by the stub server')
+@click.option('--page-size', default=100, show_default=True, help='Workflows per page of list pagination')
+@click.option('--calls', default=20, show_default=True, help='Calls in metadata of a workflow')
+@click.option('--shards', default=50, show_default=True, help='Shards of each call')
+@click.option('--padding', default=200, show_default=True, help='Bytes of command line of each shard')
+@click.option('--batch-size', default=100, show_default=True, help='Workflows per batch submission')
+@click.option('--files', default=100, show_default=True, help='Output files collected')
+@click.option('--file-size', default=64 * 1024, show_default=True, help='Bytes of each output file')
+@click.option('--iterations', default=5, show_default=True, help='Repetitions of metadata, batch and collect')
+@click.option('--latency', default=0.0, show_default=True, help='Seconds of latency of stub server')
+@click.option('--error-rate', default=0.0, show_default=True, help='Fraction of requests failed by stub server')
+def main(output, names, compare, **options):
+    """Run benchmarks against an in-process stub server"""
+    results = []
+    for name in names or BENCHMARKS:
+        result = run(name, options)
+        results.append(result)
+        click.echo('{name:20} {operations:>8} ops {errors:>6} errors {seconds:>9.3f} s {throughput:>12.1f} ops/s'
+                   .format(**result), err=True)
+
+    report = dict(wftools=revision(), python=platform.python_version(), platform=platform.platform(),
+                  date=datetime.now(timezone.utc).isoformat(), options=options, benchmarks=results)
+    if output:
+        with open(output, 'w') as file:
+            json.dump(report, file, indent=2)
+
+    if compare is not None:
+        previous = {b['name']: b for b in json.load(compare)['benchmarks']}
+        for result in results:
+            if result['name'] in previous and previous[result['name']]['throughput']:
+                click.echo('{:20} {:+.1%} throughput'.format(
+                    result['name'], result['throughput'] / previous[result['name']]['throughput'] - 1), err=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -16,6 +16,10 @@ setup(
     install_requires=[
         'Click', 'requests'
     ],
+    extras_require={
+        'arrow': ['pyarrow'],
+        'yaml': ['PyYAML']
+    },
     entry_points='''
         [console_scripts]
         wftools=wftools.scripts.wftools:cli
@@ -0,0 +1,258 @@
+import json
+import random
+import re
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+
+class MockServer:
+    """
+    In-process HTTP server that answers requests with registered handlers.
+    Handlers are registered by method and path regex and receive (request, match) returning (status, body).
+    Latency and errors can be injected to simulate a loaded server.
+    """
+
+    def __init__(self, latency=0, error_rate=0, error_status=500, seed=None, record_requests=True):
+        """
+        Initializes MockServer
+        :param latency: seconds every response is delayed
+        :param error_rate: fraction of requests answered with error_status instead of calling their handler
+        :param error_status: HTTP status of injected errors
+        :param seed: seed of random choice of failed requests
+        :param record_requests: keep received requests in requests attribute
+        """
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+        self.record_requests = record_requests
+        self.routes = []
+        self.requests = []
+        self.connections = set()
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler_class())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address
+        return 'http://{}:{}'.format(host, port)
+
+    def route(self, method, pattern, handler):
+        """
+        Register a handler
+        :param method: HTTP method
+        :param pattern: regex matched against the whole request path
+        :param handler: function (request, match) returning (status, body); body is serialized as JSON unless bytes
+        """
+        self.routes.insert(0, (method, re.compile(pattern + '$'), handler))
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def _dispatch(self, request):
+        with self.lock:
+            if self.record_requests:
+                self.requests.append(request)
+            self.connections.add(request.client_address)
+            failed = self.error_rate and self.random.random() < self.error_rate
+        if self.latency:
+            time.sleep(self.latency)
+        if failed:
+            return self.error_status, dict(status='error', message='Injected error')
+        for method, pattern, handler in self.routes:
+            match = pattern.match(request.path)
+            if method == request.method and match:
+                return handler(request, match)
+        return 404, dict(status='fail', message='Not found: ' + request.path)
+
+    def _handler_class(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # headers and body are written separately, Nagle's algorithm would delay the body until acknowledged
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _handle(self):
+                url = urlsplit(self.path)
+                length = int(self.headers.get('Content-Length', 0))
+                request = Request(self.command, url.path, parse_qs(url.query), dict(self.headers),
+                                  self.rfile.read(length) if length else b'', self.client_address)
+                status, body = mock._dispatch(request)
+                if not isinstance(body, bytes):
+                    body = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = do_POST = do_PATCH = _handle
+
+        return Handler
+
+
+class Request:
+    """Request received by MockServer"""
+
+    def __init__(self, method, path, query, headers, body, client_address):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.headers = headers
+        self.body = body
+        self.client_address = client_address
+
+    def form(self):
+        """
+        Parse multipart/form-data body
+        :return: dict of field name to content in bytes
+        """
+        return {name: content for name, _, content in self.parts()}
+
+    def parts(self):
+        """
+        Parse multipart/form-data body keeping repeated fields
+        :return: list of (field name, file name, content in bytes) tuples
+        """
+        content_type = self.headers.get('Content-Type', '')
+        message = BytesParser(policy=HTTP).parsebytes(b'Content-Type: ' + content_type.encode() + b'\r\n\r\n' +
+                                                      self.body)
+        return [(part.get_param('name', header='content-disposition'), part.get_filename(),
+                 part.get_payload(decode=True)) for part in message.iter_parts()]
+
+
+def workflow_id(index):
+    """Deterministic workflow ID of the index-th workflow of ServiceStub"""
+    return '00000000-0000-4000-8000-{:012d}'.format(index)
+
+
+class ServiceStub(MockServer):
+    """
+    MockServer answering the endpoints used by CromwellClient, TesClient and WesClient with generated workflows,
+    tasks and runs. The size of metadata is set by the number of calls, shards per call and padding bytes per shard.
+    Other arguments (latency, error injection) are passed to MockServer.
+    """
+
+    def __init__(self, workflows=100, calls=10, shards=10, padding=0, outputs=None, **kwargs):
+        """
+        Initializes ServiceStub
+        :param workflows: number of workflows, TES tasks and WES runs listed
+        :param calls: number of calls in metadata of a workflow
+        :param shards: number of shards of each call
+        :param padding: bytes of command line of each shard
+        :param outputs: dict of outputs of workflows, by default one file per call
+        :param kwargs: options of MockServer
+        """
+        super().__init__(**kwargs)
+        self.workflows = [workflow_id(i) for i in range(workflows)]
+        self.outputs = outputs or {'main.call{}.out'.format(c): 'gs://bucket/call{}/out.txt'.format(c)
+                                   for c in range(calls)}
+        self.submitted = 0
+        self._metadata = json.dumps(self._generate_metadata(calls, shards, padding))
+
+        api = r'/api/workflows/v1'
+        for method, pattern, handler in [
+                ('GET', api + r'/query', self._query),
+                ('POST', api + r'/query', lambda r, m: (200, dict(results=[], totalResultsCount=0))),
+                ('POST', api, self._submit),
+                ('POST', api + r'/batch', self._submit_batch),
+                ('GET', api + r'/backends', lambda r, m: (200, dict(supportedBackends=['Local']))),
+                ('GET', api + r'/([^/]+)/status', lambda r, m: (200, dict(id=m.group(1), status='Succeeded'))),
+                ('POST', api + r'/([^/]+)/abort', lambda r, m: (200, dict(id=m.group(1), status='Aborting'))),
+                ('POST', api + r'/([^/]+)/releaseHold', lambda r, m: (200, dict(id=m.group(1), status='Submitted'))),
+                ('GET', api + r'/([^/]+)/labels', lambda r, m: (200, dict(id=m.group(1), labels=dict()))),
+                ('PATCH', api + r'/([^/]+)/labels', lambda r, m: (200, dict(id=m.group(1), labels=json.loads(r.body)))),
+                ('GET', api + r'/([^/]+)/outputs', lambda r, m: (200, dict(id=m.group(1), outputs=self.outputs))),
+                ('GET', api + r'/([^/]+)/logs', lambda r, m: (200, dict(id=m.group(1), calls=dict()))),
+                ('GET', api + r'/([^/]+)/metadata', self._metadata_response),
+                ('POST', r'/api/womtool/v1/describe', lambda r, m: (200, dict(valid=True, errors=[]))),
+                ('GET', r'/engine/v1/version', lambda r, m: (200, dict(cromwell='85'))),
+                ('GET', r'/engine/v1/status', lambda r, m: (200, dict())),
+                ('GET', r'/v1/tasks', self._tes_list),
+                ('POST', r'/v1/tasks', lambda r, m: (200, dict(id=self._next_id()))),
+                ('GET', r'/v1/tasks/service-info', lambda r, m: (200, dict(name='stub'))),
+                ('GET', r'/v1/tasks/([^/:]+)', lambda r, m: (200, dict(id=m.group(1), state='COMPLETE'))),
+                ('POST', r'/v1/tasks/([^/:]+):cancel', lambda r, m: (200, dict())),
+                ('GET', r'/ga4gh/wes/v1/runs', self._wes_list),
+                ('POST', r'/ga4gh/wes/v1/runs', lambda r, m: (200, dict(run_id=self._next_id()))),
+                ('GET', r'/ga4gh/wes/v1/service-info', lambda r, m: (200, dict(workflow_type_versions=dict()))),
+                ('GET', r'/ga4gh/wes/v1/run/([^/]+)', lambda r, m: (200, dict(run_id=m.group(1), state='COMPLETE'))),
+                ('GET', r'/ga4gh/wes/v1/([^/]+)/status', lambda r, m: (200, dict(run_id=m.group(1), state='COMPLETE'))),
+                ('POST', r'/ga4gh/wes/v1/([^/]+)/cancel', lambda r, m: (200, dict(run_id=m.group(1))))]:
+            self.route(method, pattern, handler)
+
+    @staticmethod
+    def _generate_metadata(calls, shards, padding):
+        metadata = dict(id='WORKFLOW_ID', workflowName='main', status='Succeeded',
+                        start='2020-01-01T00:00:00.000Z', end='2020-01-01T02:00:00.000Z', calls=dict())
+        for c in range(calls):
+            metadata['calls']['main.call{}'.format(c)] = [dict(
+                shardIndex=s, attempt=1, executionStatus='Done', backend='Local', jobId=str(s),
+                start='2020-01-01T00:{:02}:00.000Z'.format(c), end='2020-01-01T01:{:02}:00.000Z'.format(c),
+                callCaching=dict(hit=False), runtimeAttributes=dict(cpu='2', memory='4 GB'), commandLine='x' * padding,
+                executionEvents=[dict(description='RunningJob', startTime='2020-01-01T00:{:02}:30.000Z'.format(c),
+                                      endTime='2020-01-01T00:{:02}:30.000Z'.format(c + 10))])
+                for s in range(shards)]
+        return metadata
+
+    def _next_id(self):
+        with self.lock:
+            self.submitted += 1
+            return workflow_id(len(self.workflows) + self.submitted)
+
+    def _page(self, items, start, size):
+        return items[start:start + size], str(start + size) if start + size < len(items) else None
+
+    def _query(self, request, match):
+        page = int(request.query.get('page', ['1'])[0])
+        size = int(request.query.get('pageSize', [str(len(self.workflows))])[0])
+        ids, _ = self._page(self.workflows, (page - 1) * size, size)
+        return 200, dict(results=[dict(id=i, name='main', status='Succeeded') for i in ids],
+                         totalResultsCount=len(self.workflows))
+
+    def _submit(self, request, match):
+        return 201, dict(id=self._next_id(), status='Submitted')
+
+    def _submit_batch(self, request, match):
+        inputs = json.loads(request.form()['workflowInputs'])
+        return 200, [dict(id=self._next_id(), status='Submitted') for _ in inputs]
+
+    def _metadata_response(self, request, match):
+        return 200, self._metadata.replace('WORKFLOW_ID', match.group(1)).encode()
+
+    def _tes_list(self, request, match):
+        ids, token = self._page(self.workflows, int(request.query.get('page_token', ['0'])[0]),
+                                int(request.query.get('page_size', ['256'])[0]))
+        response = dict(tasks=[dict(id=i, state='COMPLETE') for i in ids])
+        if token:
+            response['next_page_token'] = token
+        return 200, response
+
+    def _wes_list(self, request, match):
+        ids, token = self._page(self.workflows, int(request.query.get('page_token', ['0'])[0]),
+                                int(request.query.get('page_size', ['256'])[0]))
+        response = dict(runs=[dict(run_id=i, state='COMPLETE') for i in ids])
+        if token:
+            response['next_page_token'] = token
+        return 200, response
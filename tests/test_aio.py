@@ -0,0 +1,65 @@
+import asyncio
+from time import sleep, monotonic
+from unittest import TestCase
+
+from mock_server import MockServer
+from wftools.aio import AsyncCromwellClient, as_completed
+
+
+def status(request, match):
+    sleep(0.1)
+    if match.group(1) == 'missing':
+        return 404, dict(status='fail', message='Unrecognized workflow ID: missing')
+    return 200, dict(id=match.group(1), status='Running')
+
+
+class TestAsyncCromwellClient(TestCase):
+
+    def setUp(self):
+        self.server = MockServer().start()
+        self.server.route('GET', r'/api/workflows/v1/(.+)/status', status)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_status(self):
+        async def main():
+            async with AsyncCromwellClient(self.server.url) as client:
+                return await client.status('abc')
+
+        self.assertEqual(asyncio.run(main()), 'Running')
+
+    def test_as_completed(self):
+        workflow_ids = ['wf{}'.format(i) for i in range(20)] + ['missing']
+
+        async def main():
+            async with AsyncCromwellClient(self.server.url, concurrency=10) as client:
+                return [r async for r in client.as_completed(client.status, workflow_ids)]
+
+        start = monotonic()
+        results = asyncio.run(main())
+        elapsed = monotonic() - start
+
+        self.assertEqual(sorted(r[0] for r in results), sorted(workflow_ids))
+        errors = {item: error for item, _, error in results if error is not None}
+        self.assertEqual(list(errors), ['missing'])
+        self.assertTrue(all(result == 'Running' for item, result, _ in results if item != 'missing'))
+        self.assertLess(elapsed, 1.5)
+
+    def test_as_completed_bounded(self):
+        running = []
+        peak = []
+
+        async def work(item):
+            running.append(item)
+            peak.append(len(running))
+            await asyncio.sleep(0.01)
+            running.remove(item)
+            return item * 2
+
+        async def main():
+            return [r async for r in as_completed(work, range(30), concurrency=4)]
+
+        results = asyncio.run(main())
+        self.assertEqual(sorted(r[1] for r in results), [i * 2 for i in range(30)])
+        self.assertLessEqual(max(peak), 4)
@@ -0,0 +1,61 @@
+import sys
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from click.testing import CliRunner
+
+from mock_server import MockServer
+from wftools.analytics import CallAggregator, Usage, parse_memory, write_table
+from wftools.scripts.wftools import cli
+
+
+def shard(minutes, status='Done', attempt=1, hit=False):
+    events = [dict(description='RunningJob', startTime='2020-01-01T00:00:00Z',
+                   endTime='2020-01-01T00:{:02}:00Z'.format(minutes))]
+    return dict(executionStatus=status, shardIndex=-1, attempt=attempt, start='2020-01-01T00:00:00Z',
+                end='2020-01-01T00:{:02}:00Z'.format(minutes), executionEvents=[] if hit else events,
+                callCaching=dict(hit=hit), runtimeAttributes=dict(cpu='4', memory='8 GB'))
+
+
+class TestAnalytics(TestCase):
+
+    def test_parse_memory(self):
+        self.assertEqual(parse_memory('8 GB'), 8)
+        self.assertEqual(parse_memory('512 MiB'), 0.5)
+        self.assertEqual(parse_memory(2), 2)
+        self.assertIsNone(parse_memory('a lot'))
+
+    def test_aggregator(self):
+        aggregator = CallAggregator()
+        aggregator.add([Usage('main.a', 0, 1, 'RetryableFailure', False, 60, 2, 4),
+                        Usage('main.a', 0, 2, 'Done', False, 1800, 2, 4)])
+        aggregator.add([Usage('main.a', 0, 1, 'Failed', False, 3600, 2, 4)])
+        aggregator.add([Usage('main.a', 0, 1, 'Done', True, 1, 2, 4)])
+        stats = aggregator.results()[0]
+        self.assertEqual((stats.workflows, stats.shards, stats.attempts), (3, 3, 4))
+        self.assertEqual((stats.p50, stats.max), (1800, 3600))
+        self.assertEqual((stats.failure_rate, stats.cache_hit_rate), (1 / 3, 1 / 3))
+        self.assertEqual((stats.cpu_hours, stats.memory_hours), (3.033, 6.067))
+
+    def test_write_table_without_pyarrow(self):
+        with patch.dict(sys.modules, pyarrow=None), self.assertRaisesRegex(Exception, 'requires pyarrow'):
+            write_table([dict(name='main.a')], ['name'], 'calls.parquet', 'parquet')
+
+    def test_command(self):
+        metadata = dict(wf0=[shard(10)], wf1=[shard(20)], wf2=[shard(1, 'Failed'), shard(30, attempt=2)],
+                        wf3=[shard(5, hit=True)])
+        with MockServer() as server, tempfile.NamedTemporaryFile(suffix='.csv') as output:
+            server.route('GET', r'/api/workflows/v1/query',
+                         lambda r, m: (200, dict(results=[dict(id=i) for i in metadata], totalResultsCount=4)))
+            server.route('GET', r'/api/workflows/v1/(.+)/metadata',
+                         lambda r, m: (200, dict(id=m.group(1), calls={'main.task': metadata[m.group(1)]})))
+            result = CliRunner().invoke(cli, ['cromwell', '--no-cache', 'analytics', '-o', output.name],
+                                        env=dict(CROMWELL_SERVER=server.url))
+            self.assertEqual(result.exit_code, 0, result.output)
+            with open(output.name) as file:
+                lines = file.read().splitlines()
+            self.assertEqual(server.requests[0].query['includeSubworkflows'], ['false'])
+        self.assertEqual(lines[0], 'name,workflows,shards,attempts,p50,p95,max,failure_rate,cache_hit_rate,'
+                                   'cpu_hours,memory_hours')
+        self.assertEqual(lines[1], 'main.task,4,4,5,900.0,1710.0,1800.0,0.0,0.25,4.067,8.133')
@@ -0,0 +1,108 @@
+import json
+import threading
+import time
+from unittest import TestCase
+
+from click.testing import CliRunner
+
+from mock_server import MockServer
+from wftools.parallel import imap_streaming
+from wftools.scripts.batch import parse_request
+from wftools.scripts.wftools import cli
+
+
+def status(request, match):
+    if match.group(1) == 'missing':
+        return 404, dict(status='fail', message='Unrecognized workflow ID: missing')
+    return 200, dict(id=match.group(1), status='Running')
+
+
+class TestParseRequest(TestCase):
+
+    def test_command(self):
+        self.assertEqual(parse_request('status 1234\n', 'cromwell'),
+                         dict(service='cromwell', op='status', args=['1234']))
+        self.assertEqual(parse_request('tes status "a b"', 'cromwell'), dict(service='tes', op='status', args=['a b']))
+
+    def test_json(self):
+        request = parse_request('{"op": "metadata", "id": "1234", "include_key": ["status"]}', 'cromwell')
+        self.assertEqual(request, dict(service='cromwell', op='metadata', id='1234', include_key=['status']))
+
+    def test_invalid(self):
+        for line in ['', 'wes', 'close 1234', '{"id": "1234"}', '{"op": "status", "service": "ftp"}', '{"op":',
+                     '{"op": "status", "service": ["tes"]}', '{"op": "status", "service": null}']:
+            with self.assertRaises(ValueError):
+                parse_request(line, 'cromwell')
+
+
+class TestImapStreaming(TestCase):
+
+    def test_yields_before_input_ends(self):
+        received = threading.Event()
+
+        def items():
+            yield 1
+            # the result of the first item is consumed while the source is still blocked
+            self.assertTrue(received.wait(5))
+            yield 2
+
+        results = []
+        for item, result, error in imap_streaming(lambda i: i * 10, items(), 2):
+            results.append((item, result, error))
+            received.set()
+        self.assertEqual(results, [(1, 10, None), (2, 20, None)])
+
+    def test_order_and_errors(self):
+        def func(i):
+            time.sleep(0.01 * (5 - i))
+            if i == 3:
+                raise ValueError('three')
+            return i
+
+        results = list(imap_streaming(func, range(5), 1))
+        self.assertEqual([item for item, _, _ in results], [0, 1, 2, 3, 4])
+        self.assertEqual(str(results[3][2]), 'three')
+
+
+class TestBatchCommand(TestCase):
+
+    def setUp(self):
+        self.server = MockServer().start()
+        self.server.route('GET', r'/api/workflows/v1/(.+)/status', status)
+        self.server.route('GET', r'/v1/tasks/(.+)', lambda r, m: (200, dict(id=m.group(1), state='RUNNING')))
+        self.runner = CliRunner()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def invoke(self, lines, *args):
+        env = dict(CROMWELL_SERVER=self.server.url, TES_SERVER=self.server.url, WES_SERVER=None)
+        result = self.runner.invoke(cli, ['batch'] + list(args), input=''.join(line + '\n' for line in lines),
+                                    env=env)
+        return result, [json.loads(line) for line in result.output.splitlines()]
+
+    def test_batch(self):
+        lines = ['status w{}'.format(i) for i in range(20)]
+        lines.append('{"service": "tes", "op": "status", "id": "t1", "ref": 7}')
+        result, rows = self.invoke(lines, '-w', '4')
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual(len(rows), 21)
+        self.assertEqual([row['result'] for row in rows if row['service'] == 'cromwell'], ['Running'] * 20)
+        tes = [row for row in rows if row['service'] == 'tes'][0]
+        self.assertEqual((tes['ref'], tes['result']), (7, dict(id='t1', state='RUNNING')))
+        # connections of the shared session are reused across operations
+        self.assertLessEqual(len(self.server.connections), 4 + 1)
+
+    def test_errors(self):
+        result, rows = self.invoke(['status missing', 'drop w1', 'status w1', 'wes status r1'])
+        self.assertEqual(result.exit_code, 1)
+        self.assertEqual([row['result'] for row in rows], [None, None, 'Running', None])
+        self.assertIn('Unrecognized workflow ID', rows[0]['error'])
+        self.assertEqual(rows[1], dict(line='drop w1', result=None, error='Unknown cromwell operation drop'))
+        self.assertEqual(rows[3]['error'], 'No server address of wes given')
+
+    def test_malformed_line(self):
+        result, rows = self.invoke(['{"op": "status", "service": {"name": "tes"}}', 'status w1'])
+        self.assertEqual(result.exit_code, 1)
+        self.assertEqual(rows[0]['error'], 'Invalid service {"name": "tes"}')
+        self.assertEqual(rows[1]['result'], 'Running')
@@ -0,0 +1,136 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from click.testing import CliRunner
+
+from mock_server import MockServer
+from wftools.bulk import BATCH_LABEL, Ledger, inputs_hash, read_samples, submit_samples, wait_for_capacity
+from wftools.cromwell import CromwellClient
+from wftools.scripts.wftools import cli
+
+
+class Cromwell:
+    """Fake Cromwell that records workflows submitted in batches"""
+
+    def __init__(self, server):
+        self.workflows = []
+        self.running = 0
+        server.route('POST', r'/api/workflows/v1/batch', self.batch)
+        server.route('GET', r'/api/workflows/v1/query', self.query)
+        server.route('GET', r'/api/workflows/v1/(.+)/metadata', self.metadata)
+
+    def batch(self, request, match):
+        form = request.form()
+        labels = json.loads(form['labels'])
+        ids = []
+        for inputs in json.loads(form['workflowInputs']):
+            ids.append('wf{}'.format(len(self.workflows)))
+            self.workflows.append(dict(id=ids[-1], inputs=inputs, labels=labels))
+        return 201, [dict(id=workflow_id, status='Submitted') for workflow_id in ids]
+
+    def query(self, request, match):
+        if 'status' in request.query:
+            return 200, dict(results=[], totalResultsCount=self.running)
+        label = request.query['label'][0].split(':', 1)[1]
+        results = [dict(id=w['id']) for w in self.workflows if w['labels'][BATCH_LABEL] == label]
+        return 200, dict(results=results, totalResultsCount=len(results))
+
+    def metadata(self, request, match):
+        workflow = next(w for w in self.workflows if w['id'] == match.group(1))
+        return 200, dict(id=workflow['id'], submittedFiles=dict(inputs=json.dumps(workflow['inputs'])))
+
+
+class TestBulk(TestCase):
+
+    def setUp(self):
+        self.server = MockServer().start()
+        self.cromwell = Cromwell(self.server)
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.server.stop()
+        self.directory.cleanup()
+
+    def write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w') as file:
+            file.write(content)
+        return path
+
+    def test_read_samples(self):
+        path = self.write('samples.tsv', 'id\tmain.fastq\tmain.lanes\nS1\ta.fq\t[1, 2]\nS2\tb.fq\t\n')
+        self.assertEqual(list(read_samples(path)), [('S1', {'main.fastq': 'a.fq', 'main.lanes': [1, 2]}),
+                                                    ('S2', {'main.fastq': 'b.fq'})])
+        os.mkdir(os.path.join(self.directory.name, 'inputs'))
+        self.write('inputs/S3.json', '{"main.fastq": "c.fq"}')
+        self.assertEqual(list(read_samples(os.path.join(self.directory.name, 'inputs'))),
+                         [('S3', {'main.fastq': 'c.fq'})])
+
+    def test_submit_and_resume(self):
+        samples = [('S{}'.format(i), {'main.n': i}) for i in range(5)]
+        client = CromwellClient(self.server.url)
+        with Ledger(os.path.join(self.directory.name, 'ledger')) as ledger:
+            submitted = list(submit_samples(client, 'http://example.com/main.wdl', samples[:3], ledger, 2))
+            self.assertEqual(submitted, [('S0', 'wf0'), ('S1', 'wf1'), ('S2', 'wf2')])
+
+            # batch sent but interrupted before its response was recorded
+            ledger.add(samples[3:])
+            ledger.assign('lost', ['S3', 'S4'])
+            client.submit_batch('http://example.com/main.wdl', [{'main.n': 3}], labels={BATCH_LABEL: 'lost'})
+
+            submitted = list(submit_samples(client, 'http://example.com/main.wdl', samples, ledger, 2))
+            self.assertEqual(submitted, [('S3', 'wf3'), ('S4', 'wf4')])
+            self.assertEqual(len(self.cromwell.workflows), 5)
+            self.assertEqual(ledger.unconfirmed(), dict())
+            self.assertEqual([w['inputs'] for w in self.cromwell.workflows], [inputs for _, inputs in samples])
+
+    def test_changed_inputs(self):
+        with Ledger(os.path.join(self.directory.name, 'ledger')) as ledger:
+            self.assertEqual(ledger.add([('S0', {'main.n': 0}), ('S1', {'main.n': 1})]), 2)
+            ledger.assign('b0', ['S0'])
+            with self.assertWarnsRegex(RuntimeWarning, 'S0'):
+                self.assertEqual(ledger.add([('S0', {'main.n': 10}), ('S1', {'main.n': 11})]), 0)
+            self.assertEqual(ledger.unsubmitted(10), [('S1', {'main.n': 11})])
+
+    def test_recover_identical_inputs(self):
+        samples = [('S{}'.format(i), {'main.n': 1}) for i in range(3)]
+        client = CromwellClient(self.server.url)
+        with Ledger(os.path.join(self.directory.name, 'ledger')) as ledger:
+            ledger.add(samples)
+            ledger.assign('lost', ['S0', 'S1', 'S2'])
+            client.submit_batch('http://example.com/main.wdl', [{'main.n': 1}] * 2, labels={BATCH_LABEL: 'lost'})
+            self.assertEqual(ledger.unconfirmed(), dict(lost={inputs_hash({'main.n': 1}): ['S0', 'S1', 'S2']}))
+
+            submitted = list(submit_samples(client, 'http://example.com/main.wdl', samples, ledger, 2))
+            self.assertEqual(submitted, [('S0', 'wf0'), ('S1', 'wf1'), ('S2', 'wf2')])
+            self.assertEqual(len(self.cromwell.workflows), 3)
+
+    def test_max_in_flight(self):
+        self.cromwell.running = 3
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            self.cromwell.running = 0
+
+        wait_for_capacity(CromwellClient(self.server.url), 2, 4, 5, sleep)
+        self.assertEqual(sleeps, [5])
+        self.assertEqual(self.server.requests[0].query['status'], ['Submitted', 'Running'])
+
+    def test_inputs_hash(self):
+        self.assertEqual(inputs_hash({'a': 1, 'b': 2}), inputs_hash({'b': 2, 'a': 1}))
+
+    def test_command(self):
+        path = self.write('samples.csv', 'sample,main.n\nS0,0\nS1,1\n')
+        env = dict(CROMWELL_SERVER=self.server.url, WFTOOLS_CACHE_DIR=self.directory.name)
+        args = ['cromwell', 'submit-samples', '-f', 'csv', '--max-in-flight', '10', 'http://example.com/main.wdl', path]
+        result = CliRunner().invoke(cli, args, env=env)
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual(result.stdout.splitlines(), ['sample,id', 'S0,wf0', 'S1,wf1'])
+        self.assertTrue(os.path.exists(path + '.ledger'))
+
+        result = CliRunner().invoke(cli, args, env=env)
+        self.assertEqual(result.stdout.splitlines(), ['sample,id'])
+        self.assertEqual(len(self.cromwell.workflows), 2)
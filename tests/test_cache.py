@@ -0,0 +1,138 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from mock_server import MockServer
+from wftools.cache import ResponseCache
+from wftools.cromwell import CromwellClient
+
+
+class TestResponseCache(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_get_set(self):
+        cache = ResponseCache(self.tmp.name)
+        key = cache.key('http://localhost', '/path', dict(a=1))
+        self.assertIs(cache.get(key), ResponseCache.missing)
+        cache.set(key, dict(value=[1, 2]))
+        cache.set(cache.key('raw'), b'<html>')
+        self.assertEqual(cache.get(key), dict(value=[1, 2]))
+        self.assertEqual(ResponseCache(self.tmp.name).get(cache.key('raw')), b'<html>')
+        self.assertEqual(cache.stats(), dict(hits=1, misses=1))
+
+    def test_ttl(self):
+        cache = ResponseCache(self.tmp.name)
+        cache.set('a' * 64, 1, ttl=-1)
+        cache.set('b' * 64, 2, ttl=60)
+        self.assertIsNone(cache.get('a' * 64, None))
+        self.assertEqual(cache.get('b' * 64), 2)
+
+    def test_lru_eviction(self):
+        cache = ResponseCache(self.tmp.name)
+        keys = [cache.key(i) for i in range(10)]
+        for i, key in enumerate(keys):
+            cache.set(key, 'x' * 100)
+            os.utime(cache._path(key), (i, i))
+        cache.get(keys[0])
+        cache.max_size = 1000
+        cache.set(cache.key('new'), 'x' * 100)
+        self.assertEqual(cache.get(keys[0]), 'x' * 100)
+        self.assertIs(cache.get(keys[1]), ResponseCache.missing)
+        self.assertLessEqual(sum(e.stat().st_size for e in cache._entries()), 1000)
+
+    def test_clear(self):
+        cache = ResponseCache(self.tmp.name)
+        cache.set(cache.key(1), 1)
+        cache.clear()
+        self.assertIs(cache.get(cache.key(1)), ResponseCache.missing)
+
+    def test_unwritable_directory(self):
+        path = os.path.join(self.tmp.name, 'file')
+        open(path, 'w').close()
+        cache = ResponseCache(os.path.join(path, 'cache'))
+        with self.assertWarns(RuntimeWarning):
+            cache.set(cache.key(1), 1)
+        # warned once
+        cache.set(cache.key(2), 2)
+        self.assertIs(cache.get(cache.key(1)), ResponseCache.missing)
+
+
+class TestCromwellCache(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.status = 'Running'
+        self.server = MockServer().start()
+        self.server.route('GET', r'/api/workflows/v1/(.+)/metadata',
+                          lambda r, m: (200, dict(id=m.group(1), status=self.status, calls={})))
+        self.server.route('GET', r'/api/workflows/v1/(.+)/outputs', lambda r, m: (200, dict(outputs={})))
+        self.server.route('GET', r'/api/workflows/v1/missing/outputs',
+                          lambda r, m: (404, dict(status='fail', message='Unrecognized workflow ID')))
+
+    def tearDown(self):
+        self.server.stop()
+        self.tmp.cleanup()
+
+    def client(self, ttl=60):
+        return CromwellClient(self.server.url, cache=ResponseCache(self.tmp.name, ttl=ttl))
+
+    def count(self, endpoint):
+        return len([r for r in self.server.requests if r.path.endswith(endpoint)])
+
+    def test_non_terminal_ttl(self):
+        client = self.client(ttl=0)
+        client.metadata('abc', None, None, None)
+        client.metadata('abc', None, None, None)
+        self.assertEqual(self.count('metadata'), 2)
+
+    def test_terminal_permanent(self):
+        self.status = 'Succeeded'
+        self.client(ttl=0).metadata('abc', None, None, None)
+        client = self.client(ttl=0)
+        self.assertEqual(client.metadata('abc', None, None, None)['status'], 'Succeeded')
+        client.outputs('abc')
+        client.outputs('abc')
+        self.assertEqual(self.count('metadata'), 1)
+        self.assertEqual(self.count('outputs'), 1)
+        self.assertEqual(client.cache.stats(), dict(hits=2, misses=1))
+
+    def test_terminal_cold_cache(self):
+        self.server.route('GET', r'/api/workflows/v1/(.+)/status', lambda r, m: (200, dict(status='Succeeded')))
+        for _ in range(2):
+            self.client(ttl=0).outputs('abc')
+        self.assertEqual(self.count('outputs'), 1)
+        self.assertEqual(self.count('status'), 1)
+
+    def test_unwritable_cache(self):
+        self.status = 'Succeeded'
+        path = os.path.join(self.tmp.name, 'file')
+        open(path, 'w').close()
+        client = CromwellClient(self.server.url, cache=ResponseCache(os.path.join(path, 'cache')))
+        with self.assertWarns(RuntimeWarning):
+            self.assertEqual(client.metadata('abc')['status'], 'Succeeded')
+        self.assertEqual(client.outputs('abc'), dict())
+
+    def test_errors_not_cached(self):
+        client = self.client()
+        for _ in range(2):
+            with self.assertRaises(Exception):
+                client.outputs('missing')
+        self.assertEqual(self.count('outputs'), 2)
+
+    def test_describe(self):
+        self.server.route('POST', r'/api/womtool/v1/describe', lambda r, m: (200, dict(valid=True)))
+        workflow = os.path.join(self.tmp.name, 'hello.wdl')
+        with open(workflow, 'w') as f:
+            f.write('version 1.0\n')
+        client = self.client()
+        client.describe(workflow)
+        client.describe(workflow)
+        with open(workflow, 'a') as f:
+            f.write('workflow Hello {}\n')
+        client.describe(workflow)
+        self.assertEqual(self.count('describe'), 2)
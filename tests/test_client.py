@@ -0,0 +1,36 @@
+from unittest import TestCase
+
+from mock_server import MockServer
+from wftools.cromwell import CromwellClient
+
+
+class TestClient(TestCase):
+
+    def setUp(self):
+        self.server = MockServer().start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_connection_reuse(self):
+        self.server.route('GET', r'/api/workflows/v1/(.+)/status', lambda r, m: (200, dict(status='Running')))
+        with CromwellClient(self.server.url) as client:
+            for _ in range(5):
+                self.assertEqual(client.status('abc'), 'Running')
+        self.assertEqual(len(self.server.requests), 5)
+        self.assertEqual(len(self.server.connections), 1)
+
+    def test_retry_on_server_error(self):
+        responses = [(503, dict(status='fail', message='busy')), (200, dict(status='Succeeded'))]
+        self.server.route('GET', r'/api/workflows/v1/(.+)/status', lambda r, m: responses.pop(0))
+        with CromwellClient(self.server.url, backoff_factor=0) as client:
+            self.assertEqual(client.status('abc'), 'Succeeded')
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_no_retry(self):
+        self.server.route('GET', r'/api/workflows/v1/(.+)/status', lambda r, m: (503, dict(status='fail',
+                                                                                          message='busy')))
+        with CromwellClient(self.server.url, retries=0) as client:
+            with self.assertRaises(Exception):
+                client.status('abc')
+        self.assertEqual(len(self.server.requests), 1)
@@ -0,0 +1,64 @@
+from unittest import TestCase
+
+from mock_server import MockServer
+from wftools.cromwell import CromwellClient
+
+workflows = [dict(id='wf{:03}'.format(i), name='SayHello', status='Succeeded') for i in range(25)]
+
+
+def query(request, match):
+    page = int(request.query.get('page', ['1'])[0])
+    page_size = int(request.query.get('pageSize', [len(workflows)])[0])
+    results = workflows[(page - 1) * page_size:page * page_size]
+    return 200, dict(results=results, totalResultsCount=len(workflows))
+
+
+class TestCromwellClientOffline(TestCase):
+
+    def setUp(self):
+        self.server = MockServer().start()
+        self.server.route('GET', r'/api/workflows/v1/query', query)
+        self.client = CromwellClient(self.server.url)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+
+    def test_list(self):
+        self.assertEqual(self.client.list(), workflows)
+        self.assertEqual(self.client.list(page=3, page_size=10), workflows[20:])
+
+    def test_list_filters(self):
+        self.client.list(names=['SayHello'], labels=dict(project='x', sample='y'), include_subworkflows=False,
+                         submission='2020-01-01T00:00:00Z')
+        query = self.server.requests[-1].query
+        self.assertEqual(query['name'], ['SayHello'])
+        self.assertEqual(query['label'], ['project:x', 'sample:y'])
+        self.assertEqual(query['includeSubworkflows'], ['false'])
+        self.assertEqual(query['submission'], ['2020-01-01T00:00:00Z'])
+
+    def test_submit_batch_error(self):
+        self.server.route('POST', r'/api/workflows/v1/batch',
+                          lambda r, m: (500, dict(status='error', message='Injected error')))
+        client = CromwellClient(self.server.url, retries=0)
+        with self.assertRaisesRegex(Exception, 'Injected error'):
+            client.submit_batch('http://example.com/main.wdl', [{'main.n': 1}])
+
+    def test_iter_workflows(self):
+        self.assertEqual(list(self.client.iter_workflows(page_size=10)), workflows)
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_iter_workflows_limit(self):
+        self.assertEqual(list(self.client.iter_workflows(page_size=10, limit=12)), workflows[:12])
+        self.assertEqual([r.query['pageSize'] for r in self.server.requests], [['10'], ['2']])
+        self.assertEqual(list(self.client.iter_workflows(page_size=10, limit=3)), workflows[:3])
+        self.assertEqual(self.server.requests[-1].query['pageSize'], ['3'])
+
+    def test_iter_workflows_limit_at_page_boundary(self):
+        self.assertEqual(list(self.client.iter_workflows(page_size=10, limit=10)), workflows[:10])
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(list(self.client.iter_workflows(page_size=10, limit=23)), workflows[:23])
+
+    def test_iter_workflows_exact_pages(self):
+        self.assertEqual(list(self.client.iter_workflows(page_size=5)), workflows)
+        self.assertEqual(len(self.server.requests), 5)
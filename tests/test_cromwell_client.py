@@ -39,9 +39,7 @@ class TestCromwellClient(TestCase):
         workflow_id = client.submit(workflow)
         sleep(sleep_time)
 
-        status = client.status(workflow_id)
-        while status in ('Submitted', 'Running'):
-            status = client.status(workflow_id)
+        client.wait(workflow_id, interval=1)
 
         response = client.logs(workflow_id)
         self.assertIs(type(response), dict)
@@ -60,9 +58,7 @@ class TestCromwellClient(TestCase):
         workflow_id = client.submit(workflow, inputs)
         sleep(sleep_time)
 
-        status = client.status(workflow_id)
-        while status in ('Submitted', 'Running'):
-            status = client.status(workflow_id)
+        client.wait(workflow_id, interval=1)
 
         response = client.outputs(workflow_id)
         self.assertEqual(response.get('SayHello.msg'), 'Hello wftools!')
@@ -0,0 +1,131 @@
+import os
+import tempfile
+import threading
+from unittest import TestCase
+from unittest.mock import patch
+
+from click.testing import CliRunner
+
+from mock_server import MockServer, workflow_id
+from wftools.cromwell import CromwellClient
+from wftools.index import IndexLocked, WorkflowIndex, fcntl
+from wftools.profile import parse_time
+from wftools.scripts.wftools import cli
+
+
+def make_workflow(i, status='Succeeded'):
+    workflow = dict(id=workflow_id(i), name='main' if i % 2 else 'other', status=status,
+                    submission='2020-01-01T00:{:02}:00.000Z'.format(i), start='2020-01-01T00:{:02}:30.000Z'.format(i),
+                    labels={'cromwell-workflow-id': 'cromwell-' + workflow_id(i), 'sample': 's{}'.format(i)})
+    if status != 'Running':
+        workflow['end'] = '2020-01-01T01:{:02}:00.000Z'.format(i)
+    if i % 5 == 4:
+        workflow.update(parentWorkflowId=workflow_id(i - 1), rootWorkflowId=workflow_id(i - 1))
+    return workflow
+
+
+class TestWorkflowIndex(TestCase):
+
+    def setUp(self):
+        self.workflows = [make_workflow(i, 'Running' if i in (3, 7) else 'Succeeded') for i in range(20)]
+        self.server = MockServer().start()
+        self.server.route('GET', r'/api/workflows/v1/query', self.query)
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'index', 'workflows.sqlite')
+
+    def tearDown(self):
+        self.server.stop()
+        self.directory.cleanup()
+
+    def query(self, request, match):
+        selected = self.workflows
+        if 'submission' in request.query:
+            submission = parse_time(request.query['submission'][0])
+            selected = [w for w in selected if parse_time(w['submission']) >= submission]
+        if 'id' in request.query:
+            selected = [w for w in selected if w['id'] in request.query['id']]
+        if request.query.get('additionalQueryResultFields') != ['labels']:
+            selected = [{k: v for k, v in w.items() if k != 'labels'} for w in selected]
+        page, size = int(request.query['page'][0]), int(request.query['pageSize'][0])
+        return 200, dict(results=selected[(page - 1) * size:page * size], totalResultsCount=len(selected))
+
+    def test_sync(self):
+        client = CromwellClient(self.server.url)
+        with WorkflowIndex(self.path) as index:
+            self.assertEqual(index.sync(client, page_size=8), 20)
+            self.assertEqual(index.active(), [workflow_id(3), workflow_id(7)])
+
+            # workflow 7 finishes and 2 workflows are submitted
+            self.workflows[7] = make_workflow(7)
+            self.workflows += [make_workflow(20), make_workflow(21, 'Running')]
+            self.server.requests.clear()
+            # new workflows, submissions of the last minute again and unfinished workflows
+            self.assertEqual(index.sync(client, page_size=8), 4 + 2)
+            self.assertEqual(self.server.requests[0].query['submission'], ['2020-01-01T00:18:00.000Z'])
+            self.assertEqual(index.active(), [workflow_id(3), workflow_id(21)])
+
+            workflows = list(index.query())
+            self.assertEqual(len(workflows), 22)
+            self.assertEqual(workflows[-1], dict((k, v) for k, v in self.workflows[0].items() if k != 'labels'))
+            self.assertEqual(workflows[0]['id'], workflow_id(21))
+            self.assertEqual(workflows[-5]['parentWorkflowId'], workflow_id(3))
+
+    def test_query(self):
+        with WorkflowIndex(self.path) as index:
+            index.add(self.workflows)
+
+            def ids(**kwargs):
+                return sorted(int(w['id'][-4:]) for w in index.query(**kwargs))
+
+            self.assertEqual(ids(status=['Running']), [3, 7])
+            self.assertEqual(ids(names=['main'], status='Running'), [3, 7])
+            self.assertEqual(ids(names=['unknown']), [])
+            self.assertEqual(ids(labels=['sample:s5']), [5])
+            self.assertEqual(ids(labels={'sample': 's5', 'other': 'x'}), [])
+            self.assertEqual(ids(labels=['cromwell-workflow-id:cromwell-' + workflow_id(5)]), [])
+            self.assertEqual(ids(submission='2020-01-01T00:17:00Z'), [17, 18, 19])
+            self.assertEqual(ids(end='2020-01-01T01:02:00.000Z'), [0, 1, 2])
+            self.assertEqual(ids(workflow_ids=[workflow_id(1), workflow_id(2)], include_subworkflows=False), [1, 2])
+            self.assertEqual(len(ids(include_subworkflows=False)), 16)
+            self.assertEqual(ids(limit=2), [18, 19])
+
+    def test_lock(self):
+        if fcntl is None:
+            self.skipTest('file locks are not supported')
+        entered, release = threading.Event(), threading.Event()
+
+        def blocking_iter_workflows(*args, **kwargs):
+            entered.set()
+            release.wait(5)
+            return iter([])
+
+        def sync():
+            client = CromwellClient(self.server.url)
+            client.iter_workflows = blocking_iter_workflows
+            with WorkflowIndex(self.path) as index:
+                index.sync(client)
+
+        thread = threading.Thread(target=sync)
+        thread.start()
+        entered.wait(5)
+        try:
+            with WorkflowIndex(self.path) as other, self.assertRaises(IndexLocked):
+                other.sync(CromwellClient(self.server.url))
+        finally:
+            release.set()
+            thread.join()
+
+    def test_commands(self):
+        runner = CliRunner()
+        env = dict(CROMWELL_SERVER=self.server.url, WFTOOLS_INDEX=self.path)
+        result = runner.invoke(cli, ['cromwell', '--no-cache', 'sync'], env=env)
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('20 workflows synced', result.stderr)
+        self.server.requests.clear()
+        with patch.object(WorkflowIndex, 'close', autospec=True, side_effect=WorkflowIndex.close) as close:
+            result = runner.invoke(cli, ['cromwell', '--no-cache', 'list', '--local', '-s', 'Running', '-f', 'ndjson'],
+                                   env=env)
+        self.assertEqual(result.exit_code, 0, result.output)
+        close.assert_called_once()
+        self.assertEqual(len(result.output.splitlines()), 2)
+        self.assertEqual(self.server.requests, [])
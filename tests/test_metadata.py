@@ -0,0 +1,81 @@
+import json
+from unittest import TestCase
+
+from mock_server import MockServer
+from wftools.cromwell import CromwellClient
+from wftools.metadata import CALL_KEYS, CallRecord, calls_from_metadata, iter_calls
+
+
+def shard(index, status='Done', **kwargs):
+    return dict(shardIndex=index, attempt=1, executionStatus=status, backend='Local', start='2020-01-01T00:00:00Z',
+                end='2020-01-01T01:00:00Z', returnCode=0, **kwargs)
+
+
+metadata = {
+    'workflowName': 'Main',
+    'inputs': {'Main.text': 'escaped \\"quote\\" ]}', 'Main.list': [1, 2.5, None, True, {'a': []}]},
+    'calls': {
+        'Main.Scatter': [shard(i, callCaching=dict(hit=i % 2 == 0, hashes=dict(x='é中'))) for i in range(20)],
+        'Main.Sub': [shard(-1, subWorkflowMetadata=dict(id='sub', calls={'Sub.Task': [shard(-1, 'Failed')]}))],
+        'Main.Empty': [],
+    },
+    'outputs': {},
+    'id': 'wf',
+    'status': 'Succeeded',
+}
+
+
+class TestMetadata(TestCase):
+
+    def test_calls_from_metadata(self):
+        records = list(calls_from_metadata(metadata))
+        self.assertEqual(len(records), 22)
+        self.assertEqual(records[0], CallRecord('wf', 'Main.Scatter', 0, 1, 'Done', 'Local', '2020-01-01T00:00:00Z',
+                                                '2020-01-01T01:00:00Z', True, 0, None))
+        self.assertEqual(records[20].workflow_id, 'sub')
+        self.assertEqual(records[20].status, 'Failed')
+        self.assertEqual(records[21].subworkflow_id, 'sub')
+
+    def test_iter_calls_chunks(self):
+        expected = list(calls_from_metadata(metadata))
+        document = json.dumps(metadata, ensure_ascii=False, indent=1).encode()
+        for size in (1, 3, 17, 256, len(document)):
+            chunks = (document[i:i + size] for i in range(0, len(document), size))
+            self.assertEqual(list(iter_calls(chunks, 'wf')), expected)
+
+    def test_iter_calls_no_calls(self):
+        self.assertEqual(list(iter_calls([b'{"id": "wf", "calls": {}}'])), [])
+        self.assertEqual(list(iter_calls([b'{"id": "wf"}'])), [])
+
+    def test_iter_calls_truncated(self):
+        with self.assertRaises(ValueError):
+            list(iter_calls([json.dumps(metadata).encode()[:200]]))
+
+
+class TestCromwellIterCalls(TestCase):
+
+    def setUp(self):
+        self.server = MockServer().start()
+        self.server.route('GET', r'/api/workflows/v1/wf/metadata', lambda r, m: (200, metadata))
+        self.client = CromwellClient(self.server.url)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+
+    def test_iter_calls(self):
+        records = list(self.client.iter_calls('wf', expand_sub_workflows=True))
+        self.assertEqual(records, list(calls_from_metadata(metadata)))
+        query = self.server.requests[0].query
+        self.assertEqual(query['includeKey'], CALL_KEYS)
+        self.assertEqual(query['expandSubWorkflows'], ['true'])
+
+    def test_iter_calls_exclude(self):
+        list(self.client.iter_calls('wf', exclude_key=['inputs']))
+        query = self.server.requests[0].query
+        self.assertEqual(query['excludeKey'], ['inputs'])
+        self.assertNotIn('includeKey', query)
+
+    def test_iter_calls_error(self):
+        with self.assertRaisesRegex(Exception, 'Not found'):
+            list(self.client.iter_calls('missing'))
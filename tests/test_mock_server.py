@@ -0,0 +1,42 @@
+import time
+from unittest import TestCase
+
+from mock_server import ServiceStub, workflow_id
+from wftools.cromwell import CromwellClient
+from wftools.tes import TesClient
+from wftools.wes import WesClient
+
+
+class TestServiceStub(TestCase):
+
+    def test_clients(self):
+        with ServiceStub(workflows=25, calls=3, shards=4, padding=10) as stub:
+            with CromwellClient(stub.url) as client:
+                self.assertEqual(len(list(client.iter_workflows(page_size=10))), 25)
+                self.assertEqual(client.count(), 25)
+                self.assertEqual(client.status(workflow_id(3)), 'Succeeded')
+                self.assertEqual(len(list(client.iter_calls(workflow_id(3)))), 12)
+                self.assertEqual(len(client.outputs(workflow_id(3))), 3)
+                self.assertEqual(client.submit_batch('tests/hello.wdl', [dict(a=1), dict(a=2)]),
+                                 [workflow_id(26), workflow_id(27)])
+                self.assertEqual(client.abort(workflow_id(3)), 'Aborting')
+            with TesClient(stub.url) as client:
+                self.assertEqual(len(list(client.iter_tasks(page_size=10))), 25)
+                self.assertEqual(client.status('t1')['state'], 'COMPLETE')
+            with WesClient(stub.url) as client:
+                self.assertEqual(len(list(client.iter_runs(page_size=10))), 25)
+                self.assertEqual(client.status('r1')['state'], 'COMPLETE')
+
+    def test_latency_and_errors(self):
+        with ServiceStub(latency=0.05, error_rate=0.5, error_status=400, seed=1) as stub:
+            client = CromwellClient(stub.url, retries=0)
+            start = time.perf_counter()
+            results = []
+            for i in range(10):
+                try:
+                    results.append(client.status(workflow_id(i)))
+                except Exception as e:
+                    results.append(str(e))
+            self.assertGreaterEqual(time.perf_counter() - start, 0.5)
+            self.assertIn('Injected error', results)
+            self.assertIn('Succeeded', results)
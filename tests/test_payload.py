@@ -0,0 +1,84 @@
+import io
+import os
+import tempfile
+import zipfile
+from unittest import TestCase
+
+from mock_server import MockServer
+from wftools.cromwell import CromwellClient
+from wftools.payload import Payload, SubmissionContext, zip_directory
+
+
+class TestPayload(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as file:
+            file.write(content)
+        return path
+
+    def test_read(self):
+        path = self.write('main.wdl', b'workflow main {}')
+        payload = Payload.read(path)
+        self.assertEqual(payload.part, ('main.wdl', b'workflow main {}'))
+
+        mapped = Payload.read(path, mmap_threshold=1)
+        self.assertIsInstance(mapped.data, memoryview)
+        self.assertEqual(bytes(mapped.data), b'workflow main {}')
+        self.assertEqual(mapped.digest, payload.digest)
+        mapped.close()
+
+    def test_context_reuse(self):
+        path = self.write('inputs.json', b'{}')
+        with SubmissionContext() as context:
+            payload = context.file(path)
+            self.assertIs(context.file(path), payload)
+            self.write('inputs.json', b'{"main.n": 1}')
+            self.assertEqual(context.file(path).data, b'{"main.n": 1}')
+
+    def test_zip_directory(self):
+        self.write('imports/tasks/align.wdl', b'task align {}')
+        self.write('imports/structs.wdl', b'struct Sample {}')
+        self.write('imports/.hidden', b'')
+        directory = os.path.join(self.directory.name, 'imports')
+        payload = zip_directory(directory)
+        self.assertEqual(payload.name, 'imports.zip')
+        with zipfile.ZipFile(io.BytesIO(payload.data)) as archive:
+            self.assertEqual(archive.namelist(), ['structs.wdl', 'tasks/align.wdl'])
+        os.utime(os.path.join(directory, 'structs.wdl'), (0, 0))
+        self.assertEqual(zip_directory(directory).digest, payload.digest)
+
+        with SubmissionContext() as context:
+            self.assertIs(context.dependencies(directory), context.dependencies(directory))
+
+    def test_submit(self):
+        workflow = self.write('main.wdl', b'workflow main {}')
+        self.write('imports/tasks.wdl', b'task align {}')
+        with MockServer() as server, CromwellClient(server.url) as client:
+            server.route('POST', r'/api/workflows/v1', lambda r, m: (201, dict(id='wf', status='Submitted')))
+            for _ in range(2):
+                client.submit(workflow, dependencies=os.path.join(self.directory.name, 'imports'))
+            forms = [request.form() for request in server.requests]
+        self.assertEqual(forms[0]['workflowSource'], b'workflow main {}')
+        self.assertEqual(forms[0]['workflowDependencies'], forms[1]['workflowDependencies'])
+        with zipfile.ZipFile(io.BytesIO(forms[0]['workflowDependencies'])) as archive:
+            self.assertEqual(archive.read('tasks.wdl'), b'task align {}')
+
+    def test_submit_mapped(self):
+        workflow = self.write('main.wdl', b'workflow main {}')
+        inputs = self.write('inputs.json', b'{"main.n": 1}')
+        with MockServer() as server, CromwellClient(server.url, payloads=SubmissionContext(mmap_threshold=1)) as client:
+            server.route('POST', r'/api/workflows/v1', lambda r, m: (201, dict(id='wf', status='Submitted')))
+            client.submit(workflow, inputs, hold=True)
+            form = server.requests[0].form()
+        self.assertEqual(form['workflowSource'], b'workflow main {}')
+        self.assertEqual(form['workflowInputs'], b'{"main.n": 1}')
+        self.assertEqual(form['workflowOnHold'], b'True')
+        self.assertNotIn('workflowRoot', form)
@@ -0,0 +1,56 @@
+from unittest import TestCase
+
+from wftools.metadata import shards_from_metadata
+from wftools.profile import critical_path, profile_calls, profile_shards, shard_profile, summarize
+
+
+def time(minute, second=0):
+    return '2020-01-01T00:{:02}:{:02}.000Z'.format(minute, second)
+
+
+def shard(start, end, index=-1, attempt=1, status='Done', running=None, hit=False, failures=None):
+    events = [dict(description='RunningJob', startTime=time(*running[0]), endTime=time(*running[1]))] if running else []
+    return dict(start=time(*start), end=time(*end), shardIndex=index, attempt=attempt, executionStatus=status,
+                executionEvents=events, callCaching=dict(hit=hit), failures=failures)
+
+
+metadata = dict(id='wf', calls={
+    'main.prepare': [shard((0,), (2,), running=((1,), (2,)))],
+    'main.scatter': [shard((2,), (10,), 0, running=((3,), (10,))),
+                     shard((2,), (4,), 1, status='RetryableFailure', running=((2, 30), (4,)),
+                           failures=[dict(message='Task was preempted by the cloud provider')]),
+                     shard((4,), (9,), 1, attempt=2, running=((5,), (9,))),
+                     shard((2,), (2, 5), 2, hit=True)],
+    'main.report': [shard((0,), (1,), running=((0,), (1,)))],
+    'main.merge': [shard((10,), (12,), running=((10, 30), (12,)))],
+})
+
+
+class TestProfile(TestCase):
+
+    def test_shard_profile(self):
+        profile = shard_profile('wf', 'main.merge', metadata['calls']['main.merge'][0])
+        self.assertEqual((profile.duration, profile.queue, profile.run), (120, 30, 90))
+        profile = shard_profile('wf', 'main.scatter', metadata['calls']['main.scatter'][3])
+        self.assertEqual((profile.duration, profile.queue, profile.run, profile.cache_hit), (5, None, None, True))
+
+    def test_profile_calls(self):
+        calls = {c.name: c for c in profile_calls(profile_shards(shards_from_metadata(metadata)))}
+        scatter = calls['main.scatter']
+        self.assertEqual((scatter.shards, scatter.attempts, scatter.retries, scatter.preemptions), (3, 4, 1, 1))
+        self.assertEqual((scatter.wall, scatter.run, scatter.queue, scatter.max_run), (480, 750, 150, 420))
+        # median run time of shards that ran (420, 90, 240)
+        self.assertEqual((scatter.cache_hits, scatter.cache_savings), (1, 240))
+
+    def test_critical_path(self):
+        calls = profile_calls(profile_shards(shards_from_metadata(metadata)))
+        self.assertEqual(critical_path(calls), ['main.prepare', 'main.scatter', 'main.merge'])
+        self.assertEqual(critical_path([]), [])
+
+    def test_summarize(self):
+        summary = summarize(shards_from_metadata(metadata), 'wf', sort='run')
+        self.assertEqual(summary['wall'], 720)
+        self.assertEqual([c.name for c in summary['calls']][0], 'main.scatter')
+        self.assertEqual([c.name for c in summary['calls'] if c.critical],
+                         ['main.scatter', 'main.merge', 'main.prepare'])
+        self.assertEqual((summary['retries'], summary['preemptions'], summary['cache_hits']), (1, 1, 1))
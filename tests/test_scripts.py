@@ -0,0 +1,237 @@
+import io
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from click.testing import CliRunner
+
+from mock_server import MockServer
+from wftools.scripts import write_as_csv, write_rows
+from wftools.scripts.wftools import cli
+from wftools.transfer import Manifest
+
+
+def status(request, match):
+    if match.group(1) == 'missing':
+        return 404, dict(status='fail', message='Unrecognized workflow ID: missing')
+    return 200, dict(id=match.group(1), status='Running')
+
+
+class TestWriters(TestCase):
+
+    def test_csv_columns(self):
+        rows = iter([dict(b=1, a=2), dict(c=3, a=4), dict(b=5, d=6)])
+        file = io.StringIO()
+        write_as_csv(rows, file, sample_size=2)
+        self.assertEqual(file.getvalue().splitlines(), ['b,a,c', '1,2,', ',4,3', '5,,'])
+
+    def test_csv_dict(self):
+        file = io.StringIO()
+        write_as_csv(dict(a=1, b=2), file)
+        self.assertEqual(file.getvalue().splitlines(), ['a,b', '1,2'])
+
+    def test_formats(self):
+        rows = [dict(a=1), dict(a=2, b='x')]
+        for output_format, expected in [('csv', 'a,b\r\n1,\r\n2,x\r\n'),
+                                        ('json', '[{"a": 1},{"a": 2, "b": "x"}]\n'),
+                                        ('ndjson', '{"a": 1}\n{"a": 2, "b": "x"}\n')]:
+            file = io.StringIO()
+            write_rows(iter(rows), output_format, ['a', 'b'], file)
+            self.assertEqual(file.getvalue(), expected)
+
+
+class TestCromwellCommands(TestCase):
+
+    def setUp(self):
+        self.server = MockServer().start()
+        self.server.route('GET', r'/api/workflows/v1/(.+)/status', status)
+        self.runner = CliRunner()
+        self.cache_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.server.stop()
+        self.cache_dir.cleanup()
+
+    def invoke(self, *args, **kwargs):
+        env = dict(CROMWELL_SERVER=self.server.url, WFTOOLS_CACHE_DIR=self.cache_dir.name)
+        return self.runner.invoke(cli, ['cromwell'] + list(args), env=env, **kwargs)
+
+    def test_status(self):
+        result = self.invoke('status', 'abc')
+        self.assertEqual(result.exit_code, 0)
+        self.assertEqual(result.output, 'Running\n')
+
+    def test_status_bulk(self):
+        result = self.invoke('status', '--format', 'ndjson', '-', input='a\nb\n\nmissing\nc\n')
+        self.assertEqual(result.exit_code, 1)
+        rows = {row['id']: row for row in map(json.loads, result.stdout.splitlines())}
+        self.assertEqual(sorted(rows), ['a', 'b', 'c', 'missing'])
+        self.assertEqual(rows['a']['status'], 'Running')
+        self.assertIsNone(rows['a']['error'])
+        self.assertIn('missing', rows['missing']['error'])
+
+    def test_status_bulk_csv(self):
+        result = self.invoke('status', '--format', 'csv', 'a', 'b')
+        self.assertEqual(result.exit_code, 0)
+        lines = result.stdout.splitlines()
+        self.assertEqual(lines[0], 'id,status,error')
+        self.assertEqual(sorted(lines[1:]), ['a,Running,', 'b,Running,'])
+
+    def test_list(self):
+        workflows = [dict(id='wf{}'.format(i), status='Running', name='SayHello') for i in range(5)]
+        self.server.route('GET', r'/api/workflows/v1/query',
+                          lambda r, m: (200, dict(results=workflows, totalResultsCount=len(workflows))))
+        result = self.invoke('list', '--format', 'json', '--limit', '3')
+        self.assertEqual(result.exit_code, 0)
+        self.assertEqual(json.loads(result.stdout), workflows[:3])
+
+        result = self.invoke('list', '--format', 'csv')
+        self.assertEqual(result.exit_code, 0)
+        lines = result.stdout.splitlines()
+        self.assertEqual(lines[0], 'id,name,status,submission,start,end,parentWorkflowId,rootWorkflowId,'
+                                   'metadataArchiveStatus')
+        self.assertEqual(lines[1], 'wf0,SayHello,Running,,,,,,')
+        self.assertEqual(len(lines), 6)
+
+    def test_outputs(self):
+        outputs = {'Call.vcf': ['a.vcf', 'b.vcf'], 'Call.count': 3}
+        self.server.route('GET', r'/api/workflows/v1/(.+)/outputs', lambda r, m: (200, dict(outputs=outputs)))
+        result = self.invoke('outputs', '--format', 'ndjson', 'abc')
+        self.assertEqual(result.exit_code, 0)
+        self.assertEqual(list(map(json.loads, result.stdout.splitlines())),
+                         [dict(task='Call.vcf', shardIndex=0, file='a.vcf'),
+                          dict(task='Call.vcf', shardIndex=1, file='b.vcf'),
+                          dict(task='Call.count', shardIndex=0, file=3)])
+
+    def test_cache(self):
+        outputs = {'Call.vcf': ['a.vcf', 'b.vcf']}
+        self.server.route('GET', r'/api/workflows/v1/(.+)/outputs', lambda r, m: (200, dict(outputs=outputs)))
+        self.server.route('GET', r'/api/workflows/v1/(.+)/status', lambda r, m: (200, dict(status='Succeeded')))
+
+        result = self.invoke('--cache-stats', 'outputs', 'abc')
+        self.assertIn('Cache: 0 hits, 1 misses', result.stderr)
+        self.invoke('status', 'abc')
+        result = self.invoke('--cache-stats', 'outputs', 'abc')
+        self.assertIn('Cache: 1 hits, 0 misses', result.stderr)
+        result = self.invoke('--no-cache', 'outputs', 'abc')
+        self.assertEqual(result.stdout.split(), ['Call.vcf', 'a.vcf', 'b.vcf'])
+        self.assertEqual(len([r for r in self.server.requests if r.path.endswith('outputs')]), 2)
+
+    def test_logs(self):
+        logs = {'Call': [dict(stdout='out0', stderr='err0', attempt=1, shardIndex=0),
+                         dict(stdout='out1', stderr='err1', attempt=2, shardIndex=1)]}
+        self.server.route('GET', r'/api/workflows/v1/(.+)/logs', lambda r, m: (200, dict(calls=logs)))
+        result = self.invoke('logs', '--format', 'csv', 'abc')
+        self.assertEqual(result.exit_code, 0)
+        self.assertEqual(result.stdout.splitlines(), ['task,shardIndex,attempt,stdout,stderr',
+                                                      'Call,0,1,out0,err0', 'Call,1,2,out1,err1'])
+
+    def test_metadata(self):
+        shard = dict(executionStatus='Done', shardIndex=-1, attempt=1, callCaching=dict(hit=True),
+                     runtimeAttributes=dict(cpu='2', memory='4 GB'))
+        metadata = dict(id='wf', status='Succeeded', calls={'main.task': [shard, dict(shard, attempt=2)]})
+        self.server.route('GET', r'/api/workflows/v1/(.+)/metadata', lambda r, m: (200, metadata))
+
+        result = self.invoke('metadata', 'wf', '-i', 'status')
+        self.assertEqual(result.exit_code, 0)
+        self.assertEqual(json.loads(result.stdout), metadata)
+        self.assertEqual(self.server.requests[-1].query['includeKey'], ['status'])
+
+        result = self.invoke('metadata', 'wf', '-f', 'csv', '-i', 'runtimeAttributes', '--expand-subworkflows')
+        self.assertEqual(result.exit_code, 0)
+        lines = result.stdout.splitlines()
+        self.assertEqual(lines[0], 'workflow_id,name,shard,attempt,status,backend,start,end,cache_hit,return_code,'
+                                   'subworkflow_id,runtimeAttributes.cpu,runtimeAttributes.memory')
+        self.assertEqual(lines[2], 'wf,main.task,-1,2,Done,,,,True,,,2,4 GB')
+        query = self.server.requests[-1].query
+        self.assertIn('executionStatus', query['includeKey'])
+        self.assertIn('runtimeAttributes', query['includeKey'])
+        self.assertEqual(query['expandSubWorkflows'], ['true'])
+
+        result = self.invoke('metadata', 'wf', '-f', 'csv', '-i', 'runtimeAttributes.cpu')
+        self.assertEqual(result.exit_code, 0)
+        lines = result.stdout.splitlines()
+        self.assertTrue(lines[0].endswith(',subworkflow_id,runtimeAttributes.cpu'))
+        self.assertEqual(lines[1], 'wf,main.task,-1,1,Done,,,,True,,,2')
+        self.assertIn('runtimeAttributes', self.server.requests[-1].query['includeKey'])
+
+        result = self.invoke('metadata', 'wf', '-f', 'ndjson')
+        self.assertEqual([json.loads(line)['attempt'] for line in result.stdout.splitlines()], [1, 2])
+
+    def test_profile(self):
+        events = [dict(description='RunningJob', startTime='2020-01-01T00:01:00Z', endTime='2020-01-01T01:00:00Z')]
+        shard = dict(executionStatus='Done', shardIndex=-1, attempt=1, start='2020-01-01T00:00:00Z',
+                     end='2020-01-01T01:00:00Z', executionEvents=events)
+        metadata = dict(id='wf', calls={'main.task': [shard]})
+        self.server.route('GET', r'/api/workflows/v1/(.+)/metadata', lambda r, m: (200, metadata))
+
+        result = self.invoke('profile', 'wf')
+        self.assertEqual(result.exit_code, 0)
+        self.assertEqual(result.stdout.splitlines()[1].split(), ['*', 'main.task', '1', '1', '0', '1:00:00',
+                                                                 '0:01:00', '0:59:00', '-'])
+        self.assertIn('executionEvents', self.server.requests[-1].query['includeKey'])
+
+        result = self.invoke('profile', 'wf', '-f', 'json')
+        summary = json.loads(result.stdout)
+        self.assertEqual((summary['wall'], summary['run'], summary['critical_path']), (3600, 3540, ['main.task']))
+
+        result = self.invoke('profile', 'wf', '--shards', '-f', 'ndjson')
+        self.assertEqual(json.loads(result.stdout)['queue'], 60)
+
+    def test_wait(self):
+        self.server.route('POST', r'/api/workflows/v1/query',
+                          lambda r, m: (200, dict(results=[dict(id='a', status='Succeeded'),
+                                                           dict(id='b', status='Aborted')])))
+        result = self.invoke('wait', '--exit-code', '3', 'a', 'b')
+        self.assertEqual(result.exit_code, 3)
+        self.assertEqual(result.stdout.split(), ['a', '-', '->', 'Succeeded', 'b', '-', '->', 'Aborted'])
+
+    def test_wait_without_ids(self):
+        result = self.invoke('wait', '-', input='')
+        self.assertEqual(result.exit_code, 2)
+        self.assertIn('No workflow IDs given', result.output)
+
+    def test_collect(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            files = []
+            for i in range(3):
+                files.append(os.path.join(tmp, 'shard{}.vcf'.format(i)))
+                with open(files[-1], 'w') as f:
+                    f.write('variant {}\n'.format(i))
+            outputs = {'Call.vcf': files, 'Call.missing': os.path.join(tmp, 'missing.txt')}
+            self.server.route('GET', r'/api/workflows/v1/(.+)/outputs', lambda r, m: (200, dict(outputs=outputs)))
+
+            destination = os.path.join(tmp, 'results')
+            result = self.invoke('collect', '--workers', '2', 'abc', destination)
+            self.assertEqual(result.exit_code, 0)
+            self.assertIn('File not found: ' + outputs['Call.missing'], result.stderr)
+            self.assertEqual(sorted(os.listdir(os.path.join(destination, 'Call.vcf'))),
+                             ['shard0.vcf', 'shard1.vcf', 'shard2.vcf'])
+
+            result = self.invoke('collect', 'abc', destination)
+            self.assertEqual(result.exit_code, 0)
+            self.assertIn('3/4 files (3 up to date)', result.stderr)
+
+            with open(files[0], 'w') as f:
+                f.write('changed variant\n')
+            result = self.invoke('collect', 'abc', destination)
+            self.assertEqual(result.exit_code, 0)
+            self.assertIn('3/4 files (2 up to date)', result.stderr)
+            with open(os.path.join(destination, 'Call.vcf', 'shard0.vcf')) as f:
+                self.assertEqual(f.read(), 'changed variant\n')
+
+            flat_destination = os.path.join(tmp, 'flat')
+            result = self.invoke('collect', '--no-task-dir', 'abc', flat_destination)
+            self.assertEqual(result.exit_code, 0)
+            os.unlink(os.path.join(flat_destination, Manifest.file_name))
+            result = self.invoke('collect', '--no-task-dir', 'abc', flat_destination)
+            self.assertEqual(result.exit_code, 1)
+            self.assertIn('File already exists', result.stderr)
+
+            result = self.invoke('collect', '--move', 'abc', destination)
+            self.assertEqual(result.exit_code, 0)
+            self.assertFalse(any(os.path.exists(f) for f in files))
+            result = self.invoke('collect', '--move', 'abc', destination)
+            self.assertEqual(result.exit_code, 0)
+            self.assertIn('3/4 files (3 up to date)', result.stderr)
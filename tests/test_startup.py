@@ -0,0 +1,66 @@
+import os
+import subprocess
+import sys
+import time
+from unittest import TestCase
+
+from mock_server import MockServer
+
+# seconds allowed for a trivial invocation, including interpreter startup
+BUDGET = float(os.environ.get('WFTOOLS_STARTUP_BUDGET', 1.0))
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run(code, *args):
+    """Run code in a new interpreter, return elapsed seconds and stdout"""
+    start = time.monotonic()
+    result = subprocess.run([sys.executable, '-c', code] + list(args), cwd=ROOT, capture_output=True, text=True,
+                            check=True)
+    return time.monotonic() - start, result.stdout
+
+
+class TestStartup(TestCase):
+
+    def test_lazy_imports(self):
+        _, stdout = run('import sys, wftools.scripts.wftools; print(" ".join(sorted(sys.modules)))')
+        modules = stdout.split()
+        for module in ['requests', 'wftools.cromwell', 'wftools.tes', 'wftools.wes', 'wftools.scripts.cromwell',
+                       'concurrent.futures', 'sqlite3']:
+            self.assertNotIn(module, modules)
+
+    def test_help_time(self):
+        for args in [['--help'], ['tes', '--help']]:
+            elapsed = min(run('from wftools.scripts.wftools import cli; cli()', *args)[0] for _ in range(3))
+            self.assertLess(elapsed, BUDGET, 'wftools {} took {:.3f}s'.format(' '.join(args), elapsed))
+
+    def test_command_time(self):
+        with MockServer() as server:
+            server.route('GET', r'/api/workflows/v1/(.+)/status',
+                         lambda r, m: (200, dict(id=m.group(1), status='Running')))
+            args = ['cromwell', '--no-cache', 'status', '-h', server.url, 'abc']
+            elapsed = min(run('from wftools.scripts.wftools import cli; cli()', *args)[0] for _ in range(3))
+        self.assertLess(elapsed, BUDGET, 'wftools cromwell status took {:.3f}s'.format(elapsed))
+
+    def test_subcommand_modules(self):
+        _, stdout = run('import sys; from wftools.scripts.wftools import cli; '
+                        'cli(["tes", "--help"], standalone_mode=False); '
+                        'print(" ".join(sorted(sys.modules)))')
+        self.assertIn('wftools.scripts.tes', stdout.split())
+        self.assertNotIn('wftools.scripts.cromwell', stdout.split())
+
+    def test_status_modules(self):
+        server = MockServer().start()
+        server.route('GET', r'/api/workflows/v1/(.+)/status', lambda r, m: (200, dict(id=m.group(1), status='Running')))
+        try:
+            _, stdout = run('import sys; from wftools.scripts.wftools import cli; '
+                            'cli(sys.argv[1:], standalone_mode=False); '
+                            'print(" ".join(sorted(sys.modules)))',
+                            'cromwell', '--no-cache', 'status', '-h', server.url, 'abc')
+        finally:
+            server.stop()
+        output, modules = stdout.rstrip('\n').rsplit('\n', 1)
+        self.assertIn('Running', output)
+        for module in ['pyarrow', 'sqlite3', 'wftools.analytics', 'wftools.bulk', 'wftools.index', 'wftools.profile',
+                       'wftools.transfer']:
+            self.assertNotIn(module, modules.split())
@@ -0,0 +1,167 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from click.testing import CliRunner
+
+from mock_server import MockServer
+from wftools.scripts.wftools import cli
+from wftools.tes import TesClient, yaml
+
+tasks = [dict(id='task{:02}'.format(i), state='COMPLETE' if i % 2 else 'RUNNING', name='align-{}'.format(i),
+              creation_time='2020-01-01T00:00:{:02}Z'.format(i), resources=dict(cpu_cores=2, ram_gb=4.0))
+         for i in range(25)]
+
+
+def list_tasks(request, match):
+    view = request.query['view'][0]
+    prefix = request.query.get('name_prefix', [''])[0]
+    page_size = int(request.query.get('page_size', ['10'])[0])
+    start = int(request.query.get('page_token', ['0'])[0])
+    selected = [t for t in tasks if t['name'].startswith(prefix)]
+    page = selected[start:start + page_size]
+    if view == 'MINIMAL':
+        page = [dict(id=t['id'], state=t['state']) for t in page]
+    response = dict(tasks=page)
+    if start + page_size < len(selected):
+        response['next_page_token'] = str(start + page_size)
+    return 200, response
+
+
+def create_task(request, match):
+    task = json.loads(request.body)
+    if not task.get('executors'):
+        return 400, dict(message='Task has no executors')
+    return 200, dict(id='created-' + task['name'])
+
+
+class TestTesClient(TestCase):
+
+    def setUp(self):
+        self.server = MockServer().start()
+        self.server.route('GET', r'/v1/tasks', list_tasks)
+        self.server.route('POST', r'/v1/tasks', create_task)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_iter_tasks(self):
+        with TesClient(self.server.url) as client:
+            result = list(client.iter_tasks())
+        self.assertEqual([t['id'] for t in result], [t['id'] for t in tasks])
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(self.server.requests[1].query['page_token'], ['10'])
+
+    def test_iter_tasks_limit(self):
+        with TesClient(self.server.url) as client:
+            result = list(client.iter_tasks('BASIC', page_size=5, limit=7))
+        self.assertEqual(result, tasks[:7])
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_list_command(self):
+        runner = CliRunner()
+        env = dict(TES_SERVER=self.server.url)
+
+        result = runner.invoke(cli, ['tes', 'list', '-f', 'csv', '-c', 'id', '-c', 'state', '-s', 'complete'], env=env)
+        self.assertEqual(result.exit_code, 0)
+        lines = result.stdout.splitlines()
+        self.assertEqual(lines[0], 'id,state')
+        self.assertEqual(lines[1:], ['{},COMPLETE'.format(t['id']) for t in tasks if t['state'] == 'COMPLETE'])
+        self.assertTrue(all(r.query['view'] == ['MINIMAL'] for r in self.server.requests))
+
+        result = runner.invoke(cli, ['tes', 'list', '-f', 'json', '-n', 'align-11', '-n', 'align-12'], env=env)
+        self.assertEqual(result.exit_code, 0)
+        self.assertEqual(json.loads(result.stdout), tasks[11:13])
+        self.assertEqual(self.server.requests[-1].query['name_prefix'], ['align-1'])
+        self.assertEqual(self.server.requests[-1].query['view'], ['BASIC'])
+
+        result = runner.invoke(cli, ['tes', 'list', '--limit', '2'], env=env)
+        self.assertEqual(result.exit_code, 0)
+        lines = result.stdout.splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(lines[2].split(), ['task01', 'COMPLETE', '2020-01-01T00:00:01Z', '2', '4.00', '0.00'])
+
+    def test_create_task(self):
+        task = dict(name='echo', executors=[dict(image='alpine', command=['echo', 'hello'])])
+        with TesClient(self.server.url) as client:
+            self.assertEqual(client.create_task(task), dict(id='created-echo'))
+            with self.assertRaisesRegex(Exception, 'no executors'):
+                client.create_task(dict(name='empty'))
+        self.assertEqual(self.server.requests[0].headers['Content-Type'], 'application/json')
+
+    def test_submit_command(self):
+        executors = [dict(image='alpine', command=['true'])]
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, 'a.json'), 'w') as file:
+                json.dump([dict(name='a1', executors=executors), dict(name='a2', executors=executors)], file)
+            with open(os.path.join(directory, 'b.ndjson'), 'w') as file:
+                file.write(json.dumps(dict(name='b1', executors=executors)) + '\n\n')
+                file.write(json.dumps(dict(name='bad')) + '\n')
+            if yaml is not None:
+                with open(os.path.join(directory, 'c.yaml'), 'w') as file:
+                    file.write('name: c1\nexecutors:\n  - image: alpine\n    command: ["true"]\n')
+            result = CliRunner().invoke(cli, ['tes', 'submit', '-f', 'csv', directory],
+                                        env=dict(TES_SERVER=self.server.url))
+        self.assertEqual(result.exit_code, 1)
+        lines = result.stdout.splitlines()
+        self.assertEqual(lines[0], 'name,id,error')
+        expected = ['a1,created-a1,', 'a2,created-a2,', 'b1,created-b1,', 'bad,,Task has no executors']
+        self.assertEqual(sorted(lines[1:]), expected + (['c1,created-c1,'] if yaml is not None else []))
+
+        result = CliRunner().invoke(cli, ['tes', 'submit'], input=json.dumps(dict(name='s', executors=executors)),
+                                    env=dict(TES_SERVER=self.server.url))
+        self.assertEqual(result.exit_code, 0)
+        self.assertEqual(result.stdout, 'created-s\ts\n')
+
+        with patch('wftools.scripts.tes.sys') as mock_sys:
+            mock_sys.stdin.isatty.return_value = True
+            result = CliRunner().invoke(cli, ['tes', 'submit'], env=dict(TES_SERVER=self.server.url))
+        self.assertEqual(result.exit_code, 2)
+        self.assertIn('Missing tasks', result.output)
+
+    def test_watch(self):
+        polls = []
+
+        def list_states(request, match):
+            if 'page_token' not in request.query:
+                polls.append(1)
+            start = int(request.query.get('page_token', ['0'])[0])
+            page = [dict(id='t{}'.format(i), state='COMPLETE' if len(polls) > i else 'RUNNING')
+                    for i in range(start, min(start + 10, 30))]
+            return 200, dict(tasks=page, next_page_token=str(start + 10) if start + 10 < 30 else '')
+
+        self.server.route('GET', r'/v1/tasks', list_states)
+        self.server.route('GET', r'/v1/tasks/(.+)', lambda r, m: (200, dict(id=m.group(1), state='COMPLETE')))
+        watched = ['t0', 't1', 't2', 't12', 'unlisted']
+        with TesClient(self.server.url) as client:
+            events = list(client.watch(watched, interval=0, status_threshold=1))
+        self.assertEqual({e.id for e in events if e.state == 'COMPLETE'}, set(watched))
+        self.assertEqual(len([e for e in events if e.id == 't12']), 2)
+        # listed until a single task remains, which is then requested on its own
+        self.assertEqual(len(polls), 3)
+        status_requests = [r.path for r in self.server.requests if r.path != '/v1/tasks']
+        self.assertEqual(status_requests, ['/v1/tasks/unlisted', '/v1/tasks/t12'])
+
+        result = CliRunner().invoke(cli, ['tes', 'watch', '-f', 'ndjson', '--interval', '0', 't0'],
+                                    env=dict(TES_SERVER=self.server.url))
+        self.assertEqual(result.exit_code, 0)
+        self.assertEqual(json.loads(result.stdout), dict(id='t0', previous=None, state='COMPLETE'))
+
+    def test_watch_missing_task(self):
+        self.server.route('GET', r'/v1/tasks/(.+)', lambda r, m: (404, dict(msg='task not found')))
+        with TesClient(self.server.url) as client, self.assertRaisesRegex(Exception, 'Unknown task missing'):
+            list(client.watch(['missing'], interval=0))
+        result = CliRunner().invoke(cli, ['tes', 'watch', '--interval', '0', 'missing'],
+                                    env=dict(TES_SERVER=self.server.url))
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn('task not found', result.output)
+
+    def test_watch_without_ids(self):
+        with self.assertRaises(ValueError):
+            TesClient(self.server.url).watch([])
+        result = CliRunner().invoke(cli, ['tes', 'watch', '-'], input='', env=dict(TES_SERVER=self.server.url))
+        self.assertEqual(result.exit_code, 2)
+        self.assertIn('No task IDs or name prefix given', result.output)
+        self.assertEqual(self.server.requests, [])
@@ -0,0 +1,93 @@
+import io
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from click.testing import CliRunner
+
+from mock_server import MockServer
+from wftools.client import Client
+from wftools.scripts.wftools import cli
+from wftools.trace import RequestEvent, Tracer, path_template, percentile
+
+
+class TestPathTemplate(TestCase):
+
+    def test_path_template(self):
+        self.assertEqual(path_template('/api/workflows/v1/0f3c9a2e-1b2c-4d5e-8f90-123456789abc/status'),
+                         '/api/workflows/v1/{id}/status')
+        self.assertEqual(path_template('/ga4gh/tes/v1/tasks/task01:cancel'), '/ga4gh/tes/v1/tasks/{id}:cancel')
+        self.assertEqual(path_template('/api/workflows/v1/query'), '/api/workflows/v1/query')
+        self.assertEqual(path_template('/api/w1/v1/tasks/t1'), '/api/w1/v1/tasks/{id}')
+
+
+class TestTracer(TestCase):
+
+    def test_percentile(self):
+        self.assertEqual(percentile([1, 2, 3, 4], 50), 2.5)
+        self.assertEqual(percentile([1, 2, 3, 4], 100), 4)
+        self.assertIsNone(percentile([], 50))
+
+    def test_stats(self):
+        file = io.StringIO()
+        tracer = Tracer(file)
+        for i in range(10):
+            tracer(RequestEvent('GET', 'http://x/a/1', '/a/{id}', 200, 100, 0.001, 0.01 * (i + 1), 0.001, None))
+        tracer(RequestEvent('POST', 'http://x/b', '/b', 500, 10, 0.001, 1.0, None, None))
+        stats = tracer.stats()
+        self.assertEqual([(s.method, s.template, s.count, s.errors) for s in stats],
+                         [('POST', '/b', 1, 1), ('GET', '/a/{id}', 10, 0)])
+        self.assertAlmostEqual(stats[1].p50, 0.055)
+        self.assertAlmostEqual(stats[1].max, 0.1)
+        self.assertEqual(stats[1].bytes, 1000)
+        self.assertEqual(len(file.getvalue().splitlines()), 11)
+        report = io.StringIO()
+        tracer.report(report)
+        self.assertEqual(len(report.getvalue().splitlines()), 3)
+
+
+class TestRequestHooks(TestCase):
+
+    def setUp(self):
+        self.server = MockServer().start()
+        self.server.route('GET', r'/api/(.+)', lambda r, m: (200, dict(id=m.group(1))))
+        self.server.route('POST', r'/api/(.+)', lambda r, m: (404, dict(status='fail', message='Not found')))
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_hooks(self):
+        before, after = [], []
+        with Client(self.server.url, pre_request=[lambda *args: before.append(args)],
+                    post_request=[after.append]) as client:
+            client.get('/api/v1/w1')
+            client.post('/api/v1/w2', json=dict(a=1))
+            self.assertEqual(b''.join(client.get_stream('/api/v1/w3')), b'{"id": "v1/w3"}')
+        self.assertEqual(before, [('GET', '/api/v1/{id}'), ('POST', '/api/v1/{id}'), ('GET', '/api/v1/{id}')])
+        self.assertEqual([(e.method, e.status, e.bytes) for e in after], [('GET', 200, 15), ('POST', 404, 42),
+                                                                          ('GET', 200, 15)])
+        self.assertTrue(all(e.elapsed >= e.wait >= 0 for e in after))
+        self.assertIsNotNone(after[0].decode)
+        self.assertIsNone(after[2].decode)
+
+    def test_connection_error(self):
+        events = []
+        client = Client('http://127.0.0.1:1', retries=0, post_request=[events.append])
+        with self.assertRaises(Exception):
+            client.get('/api/v1/w1')
+        self.assertEqual((events[0].status, events[0].template), (None, '/api/v1/{id}'))
+        self.assertTrue(events[0].error)
+
+    def test_trace_option(self):
+        self.server.route('GET', r'/api/workflows/v1/(.+)/status', lambda r, m: (200, dict(status='Running')))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'trace.ndjson')
+            result = CliRunner().invoke(cli, ['--trace', '--trace-file', path, 'cromwell', '--no-cache', 'status',
+                                              '-h', self.server.url, 'w1', 'w2'])
+            self.assertEqual(result.exit_code, 0, result.output)
+            with open(path) as file:
+                events = [json.loads(line) for line in file]
+        self.assertEqual([e['template'] for e in events], ['/api/workflows/v1/{id}/status'] * 2)
+        self.assertIn('/api/workflows/v1/{id}/status', result.stderr)
+        self.assertEqual(Client.post_request_hooks, [])
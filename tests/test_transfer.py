@@ -0,0 +1,127 @@
+import errno
+import os
+import tempfile
+from time import monotonic
+from unittest import TestCase, skipUnless
+from unittest.mock import patch
+
+from wftools.transfer import Manifest, Progress, RateLimiter, copy_file, link_file, move_file
+
+
+class TestTransfer(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self.tmp.name, 'src.txt')
+        self.dst = os.path.join(self.tmp.name, 'dst.txt')
+        with open(self.src, 'wb') as f:
+            f.write(b'ACGT' * 1000)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read(self, path):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def test_copy(self):
+        progress = Progress(1)
+        copy_file(self.src, self.dst, progress=progress)
+        self.assertEqual(self.read(self.dst), b'ACGT' * 1000)
+        self.assertEqual(progress.bytes, 4000)
+        self.assertTrue(os.path.exists(self.src))
+
+    def test_copy_exists(self):
+        open(self.dst, 'w').close()
+        with self.assertRaises(FileExistsError):
+            copy_file(self.src, self.dst)
+        copy_file(self.src, self.dst, overwrite=True)
+        self.assertEqual(self.read(self.dst), b'ACGT' * 1000)
+
+    def test_copy_without_hard_links(self):
+        def link(src, dst):
+            raise PermissionError(errno.EPERM, 'Operation not permitted')
+
+        with patch('os.link', link):
+            copy_file(self.src, self.dst)
+            self.assertEqual(self.read(self.dst), b'ACGT' * 1000)
+            with self.assertRaises(FileExistsError):
+                copy_file(self.src, self.dst)
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), ['dst.txt', 'src.txt'])
+
+    @skipUnless(hasattr(os, 'copy_file_range'), 'copy_file_range not available')
+    def test_copy_truncated_source(self):
+        copy_file_range = os.copy_file_range
+        calls = []
+
+        def shrinking(src, dst, count, *args):
+            calls.append(count)
+            # source shrank after its size was read: nothing left after the first block
+            return copy_file_range(src, dst, 1000) if len(calls) == 1 else 0
+
+        with patch('wftools.transfer._reflink', return_value=False), patch('os.copy_file_range', shrinking):
+            with self.assertRaisesRegex(OSError, '1000 of 4000 bytes'):
+                copy_file(self.src, self.dst)
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), ['src.txt'])
+
+    def test_copy_over_link(self):
+        link_file(self.src, self.dst)
+        copy_file(self.src, self.dst, overwrite=True)
+        self.assertEqual(self.read(self.src), b'ACGT' * 1000)
+        self.assertNotEqual(os.stat(self.src).st_ino, os.stat(self.dst).st_ino)
+
+    def test_link(self):
+        link_file(self.src, self.dst)
+        self.assertEqual(os.stat(self.src).st_ino, os.stat(self.dst).st_ino)
+
+    def test_move(self):
+        move_file(self.src, self.dst)
+        self.assertFalse(os.path.exists(self.src))
+        self.assertEqual(self.read(self.dst), b'ACGT' * 1000)
+
+    def test_move_exists(self):
+        open(self.dst, 'w').close()
+        with self.assertRaises(FileExistsError):
+            move_file(self.src, self.dst)
+        self.assertTrue(os.path.exists(self.src))
+
+    def test_rate_limiter(self):
+        limiter = RateLimiter(10000)
+        start = monotonic()
+        copy_file(self.src, self.dst, limiter=limiter)
+        copy_file(self.src, self.dst, overwrite=True, limiter=limiter)
+        copy_file(self.src, self.dst, overwrite=True, limiter=limiter)
+        self.assertGreaterEqual(monotonic() - start, 0.15)
+
+    def test_copy_leaves_no_partial_file(self):
+        os.mkdir(self.dst)
+        with self.assertRaises(OSError):
+            copy_file(self.src, os.path.join(self.dst, 'missing', 'file.txt'))
+        with self.assertRaises(IsADirectoryError):
+            copy_file(self.tmp.name, os.path.join(self.dst, 'file.txt'))
+        self.assertEqual(os.listdir(self.dst), [])
+
+    def test_manifest(self):
+        with Manifest(self.tmp.name) as manifest:
+            self.assertFalse(manifest.is_current(self.src, self.dst, os.stat(self.src)))
+            copy_file(self.src, self.dst)
+            manifest.add(self.src, self.dst, os.stat(self.src), checksum=True)
+            self.assertTrue(manifest.is_current(self.src, self.dst, os.stat(self.src), checksum=True))
+
+        manifest = Manifest(self.tmp.name)
+        self.assertTrue(manifest.is_current(self.src, self.dst, os.stat(self.src), checksum=True))
+        with open(self.dst, 'wb') as f:
+            f.write(b'TGCA' * 1000)
+        self.assertTrue(manifest.is_current(self.src, self.dst, os.stat(self.src)))
+        self.assertFalse(manifest.is_current(self.src, self.dst, os.stat(self.src), checksum=True))
+        with open(self.dst, 'wb') as f:
+            f.write(b'partial')
+        self.assertFalse(manifest.is_current(self.src, self.dst, os.stat(self.src)))
+
+    def test_manifest_compaction(self):
+        with Manifest(self.tmp.name) as manifest:
+            for _ in range(3):
+                copy_file(self.src, self.dst, overwrite=True)
+                manifest.add(self.src, self.dst, os.stat(self.src))
+        with open(os.path.join(self.tmp.name, Manifest.file_name)) as f:
+            self.assertEqual(len(f.readlines()), 1)
@@ -0,0 +1,78 @@
+import json
+from unittest import TestCase
+from unittest.mock import patch
+
+from mock_server import MockServer
+from wftools.cromwell import CromwellClient
+from wftools.watch import Event, watch
+
+
+class TestWatch(TestCase):
+
+    def test_events(self):
+        polls = iter([dict(a='Submitted', b='Running'), dict(a='Running', b='Running'),
+                      dict(a='Running', b='Succeeded'), dict(a='Failed')])
+        requested = []
+
+        def fetch(active):
+            requested.append(sorted(active))
+            return next(polls)
+
+        with patch('time.sleep') as sleep:
+            events = list(watch(fetch, ['a', 'b'], ('Succeeded', 'Failed'), interval=1, max_interval=10, jitter=0))
+
+        self.assertEqual(events, [Event('a', None, 'Submitted'), Event('b', None, 'Running'),
+                                  Event('a', 'Submitted', 'Running'), Event('b', 'Running', 'Succeeded'),
+                                  Event('a', 'Running', 'Failed')])
+        self.assertEqual(requested, [['a', 'b'], ['a', 'b'], ['a', 'b'], ['a']])
+        self.assertEqual([c.args[0] for c in sleep.call_args_list], [1, 1, 1])
+
+    def test_backoff(self):
+        polls = iter([dict(a='Running')] * 5 + [dict(a='Succeeded')])
+        with patch('time.sleep') as sleep:
+            list(watch(lambda active: next(polls), ['a'], ('Succeeded',), interval=1, max_interval=3, backoff=2,
+                       jitter=0))
+        self.assertEqual([c.args[0] for c in sleep.call_args_list], [1, 2, 3, 3, 3])
+
+    def test_nothing_to_watch(self):
+        requested = []
+        with patch('time.sleep') as sleep:
+            events = list(watch(lambda active: requested.append(active) or dict(), [], ('Succeeded',)))
+        self.assertEqual((events, requested), ([], [set()]))
+        sleep.assert_not_called()
+
+    def test_timeout(self):
+        with self.assertRaises(TimeoutError):
+            list(watch(lambda active: dict(a='Running'), ['a'], ('Succeeded',), interval=0.01, timeout=0.05))
+
+
+class TestCromwellWatch(TestCase):
+
+    def setUp(self):
+        self.states = dict(a=['Submitted', 'Running', 'Succeeded'], b=['Running', 'Failed'])
+        self.server = MockServer().start()
+        self.server.route('POST', r'/api/workflows/v1/query', self.query)
+        self.server.route('GET', r'/api/workflows/v1/(.+)/status',
+                          lambda r, m: (404, dict(status='fail', message='Unrecognized workflow ID: ' + m.group(1))))
+
+    def tearDown(self):
+        self.server.stop()
+
+    def query(self, request, match):
+        results = []
+        for workflow_id in (f['id'] for f in json.loads(request.body)):
+            if workflow_id in self.states:
+                states = self.states[workflow_id]
+                results.append(dict(id=workflow_id, status=states.pop(0) if len(states) > 1 else states[0]))
+        return 200, dict(results=results, totalResultsCount=len(results))
+
+    def test_wait(self):
+        with CromwellClient(self.server.url) as client:
+            states = client.wait(['a', 'b'], interval=0.01)
+        self.assertEqual(states, dict(a='Succeeded', b='Failed'))
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_unknown_workflow(self):
+        with CromwellClient(self.server.url) as client:
+            with self.assertRaisesRegex(Exception, 'Unrecognized workflow ID: c'):
+                client.wait(['a', 'c'], interval=0.01)
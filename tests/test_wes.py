@@ -0,0 +1,114 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from click.testing import CliRunner
+
+from mock_server import MockServer
+from wftools.scripts.wftools import cli
+from wftools.multipart import MultipartEncoder
+from wftools.wes import WesClient
+
+runs = [dict(run_id='run{:02}'.format(i), state='COMPLETE' if i % 3 else 'RUNNING') for i in range(25)]
+
+
+def list_runs(request, match):
+    page_size = int(request.query.get('page_size', ['10'])[0])
+    start = int(request.query.get('page_token', ['0'])[0])
+    end = start + page_size
+    return 200, dict(runs=runs[start:end], next_page_token=str(end) if end < len(runs) else '')
+
+
+class TestWesClient(TestCase):
+
+    def setUp(self):
+        self.server = MockServer().start()
+        self.server.route('GET', r'/ga4gh/wes/v1/runs', list_runs)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_iter_runs(self):
+        with WesClient(self.server.url) as client:
+            self.assertEqual(list(client.iter_runs()), runs)
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_iter_runs_limit(self):
+        with WesClient(self.server.url) as client:
+            self.assertEqual(list(client.iter_runs(page_size=4, limit=6)), runs[:6])
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_list_command(self):
+        runner = CliRunner()
+        env = dict(WES_SERVER=self.server.url)
+
+        result = runner.invoke(cli, ['wes', 'list', '-f', 'csv', '-s', 'running', '--limit', '3'], env=env)
+        self.assertEqual(result.exit_code, 0)
+        self.assertEqual(result.stdout.splitlines(), ['run_id,state', 'run00,RUNNING', 'run03,RUNNING',
+                                                      'run06,RUNNING'])
+        self.assertEqual(len(self.server.requests), 1)
+
+        result = runner.invoke(cli, ['wes', 'list', '-f', 'json'], env=env)
+        self.assertEqual(result.exit_code, 0)
+        self.assertEqual(json.loads(result.stdout), runs)
+
+    def test_submit(self):
+        self.server.route('POST', r'/ga4gh/wes/v1/runs', lambda r, m: (200, dict(run_id='run99')))
+        with tempfile.TemporaryDirectory() as directory:
+            os.makedirs(os.path.join(directory, 'bundle', 'tasks'))
+            path = dict(main='bundle/main.wdl', tasks='bundle/tasks/align.wdl', inputs='inputs.json')
+            for name, content in [('main', b'workflow main {}'), ('tasks', b'task align {}'),
+                                  ('inputs', b'{"main.n": 1}')]:
+                path[name] = os.path.join(directory, path[name])
+                with open(path[name], 'wb') as file:
+                    file.write(content)
+
+            with WesClient(self.server.url) as client:
+                response = client.submit(path['main'], path['inputs'], 'WDL', '1.0',
+                                         [os.path.join(directory, 'bundle')], tags=dict(project='x'))
+            self.assertEqual(response, dict(run_id='run99'))
+            parts = self.server.requests[-1].parts()
+            form = {name: content for name, _, content in parts}
+            self.assertEqual(json.loads(form['workflow_params']), {'main.n': 1})
+            self.assertEqual(json.loads(form['tags']), dict(project='x'))
+            self.assertEqual(form['workflow_url'], b'main.wdl')
+            self.assertEqual([(filename, content) for name, filename, content in parts
+                              if name == 'workflow_attachment'],
+                             [('main.wdl', b'workflow main {}'), ('tasks/align.wdl', b'task align {}')])
+
+            result = CliRunner().invoke(cli, ['wes', 'submit', '-i', path['inputs'], '-l', 'WDL', '-v', '1.0',
+                                              path['tasks']], env=dict(WES_SERVER=self.server.url))
+            self.assertEqual(result.exit_code, 0, result.output)
+            form = self.server.requests[-1].form()
+            self.assertEqual((form['workflow_url'], form['workflow_type']), (b'align.wdl', b'WDL'))
+            self.assertEqual(form['workflow_attachment'], b'task align {}')
+
+
+class TestMultipartEncoder(TestCase):
+
+    def test_read(self):
+        with tempfile.NamedTemporaryFile() as file:
+            file.write(b'x' * 100000)
+            file.flush()
+            encoder = MultipartEncoder([('a', '1'), ('b', ('data.bin', file.name))], boundary='b0undary')
+            chunks = iter(lambda: encoder.read(8192), b'')
+            body = b''.join(chunks)
+        self.assertEqual(len(body), len(encoder))
+        self.assertTrue(body.startswith(b'--b0undary\r\nContent-Disposition: form-data; name="a"\r\n\r\n1\r\n'))
+        self.assertTrue(body.endswith(b'x' * 10 + b'\r\n--b0undary--\r\n'))
+        self.assertEqual(encoder.read(), b'')
+
+    def test_read_memory(self):
+        content = memoryview(b'y' * 100000)
+        encoder = MultipartEncoder([('b', ('data.bin', content))], boundary='b0undary')
+        body = b''.join(iter(lambda: encoder.read(8192), b''))
+        self.assertEqual(len(body), len(encoder))
+        self.assertIn(b'filename="data.bin"', body)
+        self.assertTrue(body.endswith(b'y' * 10 + b'\r\n--b0undary--\r\n'))
+
+    def test_read_empty(self):
+        encoder = MultipartEncoder([], boundary='b0undary')
+        body = encoder.read()
+        self.assertEqual(body, b'--b0undary--\r\n')
+        self.assertEqual(len(body), len(encoder))
@@ -0,0 +1,164 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, wraps
+
+from .cromwell import CromwellClient
+from .tes import TesClient
+from .wes import WesClient
+
+
+def _coroutine(method):
+    """
+    Create a coroutine method that runs a blocking client method in the executor of AsyncClient
+    :param method: blocking client method (function defined in Client subclass)
+    :return: coroutine function
+    """
+
+    @wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        return await self.run(method, self.client, *args, **kwargs)
+
+    return wrapper
+
+
+async def as_completed(func, items, concurrency=10):
+    """
+    Call a coroutine function for every item running at most `concurrency` calls at once
+    :param func: coroutine function that receives one item
+    :param items: iterable of items
+    :param concurrency: maximum number of simultaneous calls
+    :return: async generator of (item, result, error) tuples in order of completion; error is None on success
+    """
+    items = iter(items)
+    pending = dict()
+
+    def schedule():
+        for item in items:
+            pending[asyncio.ensure_future(func(item))] = item
+            return
+
+    try:
+        for _ in range(concurrency):
+            schedule()
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                item = pending.pop(task)
+                schedule()
+                if task.exception() is None:
+                    yield item, task.result(), None
+                else:
+                    yield item, None, task.exception()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+class AsyncClient:
+    """
+    Base class of asyncio API clients.
+    Blocking calls of the wrapped client are run in a thread pool sharing the same pool of HTTP connections.
+    """
+    client_class = None
+
+    def __init__(self, host, *args, concurrency=10, **kwargs):
+        """
+        Initializes AsyncClient
+        :param host: server URL
+        :param args: positional arguments passed to client class
+        :param concurrency: maximum number of simultaneous requests
+        :param kwargs: keyword arguments passed to client class
+        """
+        kwargs.setdefault('pool_size', concurrency)
+        self.client = self.client_class(host, *args, **kwargs)
+        self.concurrency = concurrency
+        self.executor = ThreadPoolExecutor(max_workers=concurrency)
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Run a blocking function in the executor
+        :param func: function to be called
+        :return: result of function
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(func, *args, **kwargs))
+
+    def as_completed(self, func, items, concurrency=None):
+        """
+        Call a coroutine method for every item, see as_completed
+        :param func: coroutine function that receives one item, e.g. client.status
+        :param items: iterable of items, e.g. workflow IDs
+        :param concurrency: maximum number of simultaneous calls (concurrency of client by default)
+        :return: async generator of (item, result, error) tuples in order of completion
+        """
+        return as_completed(func, items, concurrency or self.concurrency)
+
+    def close(self):
+        """
+        Wait running calls and close all pooled connections
+        """
+        self.executor.shutdown(wait=True)
+        self.client.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+
+
+class AsyncCromwellClient(AsyncClient):
+    """
+    Cromwell API asyncio client.
+    Provides the same methods of CromwellClient as coroutines
+    """
+    client_class = CromwellClient
+
+    abort = _coroutine(CromwellClient.abort)
+    describe = _coroutine(CromwellClient.describe)
+    diff = _coroutine(CromwellClient.diff)
+    health_status = _coroutine(CromwellClient.health_status)
+    info = _coroutine(CromwellClient.info)
+    labels = _coroutine(CromwellClient.labels)
+    list = _coroutine(CromwellClient.list)
+    logs = _coroutine(CromwellClient.logs)
+    metadata = _coroutine(CromwellClient.metadata)
+    outputs = _coroutine(CromwellClient.outputs)
+    query = _coroutine(CromwellClient.query)
+    release = _coroutine(CromwellClient.release)
+    status = _coroutine(CromwellClient.status)
+    submit = _coroutine(CromwellClient.submit)
+    submit_batch = _coroutine(CromwellClient.submit_batch)
+    timing = _coroutine(CromwellClient.timing)
+    update_labels = _coroutine(CromwellClient.update_labels)
+    version = _coroutine(CromwellClient.version)
+    wait = _coroutine(CromwellClient.wait)
+
+
+class AsyncTesClient(AsyncClient):
+    """
+    TES API asyncio client.
+    Provides the same methods of TesClient as coroutines
+    """
+    client_class = TesClient
+
+    abort = _coroutine(TesClient.abort)
+    create_task = _coroutine(TesClient.create_task)
+    info = _coroutine(TesClient.info)
+    list = _coroutine(TesClient.list)
+    status = _coroutine(TesClient.status)
+
+
+class AsyncWesClient(AsyncClient):
+    """
+    WES API asyncio client.
+    Provides the same methods of WesClient as coroutines
+    """
+    client_class = WesClient
+
+    abort = _coroutine(WesClient.abort)
+    info = _coroutine(WesClient.info)
+    list = _coroutine(WesClient.list)
+    logs = _coroutine(WesClient.logs)
+    status = _coroutine(WesClient.status)
+    submit = _coroutine(WesClient.submit)
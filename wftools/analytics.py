@@ -0,0 +1,216 @@
+import csv
+import re
+import sys
+from array import array
+from collections import OrderedDict, namedtuple
+
+from .constants import TABLE_FORMATS
+from .parallel import imap_unordered
+from .profile import PROFILE_KEYS, shard_profile
+from .trace import percentile
+
+# metadata keys needed to aggregate calls across workflows, used as includeKey projection
+ANALYTICS_KEYS = PROFILE_KEYS + ['runtimeAttributes']
+
+CallStats = namedtuple('CallStats', ['name', 'workflows', 'shards', 'attempts', 'p50', 'p95', 'max', 'failure_rate',
+                                     'cache_hit_rate', 'cpu_hours', 'memory_hours'])
+CallStats.__doc__ = 'Statistics of a call across workflows, durations in seconds and memory in GB'
+
+Usage = namedtuple('Usage', ['name', 'shard', 'attempt', 'status', 'cache_hit', 'seconds', 'cpu', 'memory'])
+Usage.__doc__ = 'Duration and resources of one attempt of one shard of a call'
+
+_MEMORY = re.compile(r'^\s*([\d.]+)\s*([KMGT]?i?B?)\s*$', re.IGNORECASE)
+_MEMORY_UNITS = dict(B=1 / 1024 ** 3, K=1 / 1024 ** 2, M=1 / 1024, G=1, T=1024)
+
+
+def parse_memory(value):
+    """
+    Parse memory runtime attribute, e.g. '4 GB', '3500 MiB' or 2.5 (GB)
+    :param value: str or number
+    :return: size in GB or None
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _MEMORY.match(str(value))
+    if not match:
+        return None
+    unit = (match.group(2) or 'G')[0].upper()
+    return float(match.group(1)) * _MEMORY_UNITS[unit]
+
+
+def parse_cpu(value):
+    """
+    Parse cpu runtime attribute
+    :param value: str or number
+    :return: number of cores as float or None
+    """
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def workflow_usage(shards):
+    """
+    Reduce shards of calls of one workflow to compact Usage records
+    :param shards: iterable of (workflow_id, call_name, shard) tuples, see wftools.metadata.iter_shards
+    :return: list of Usage
+    """
+    usage = []
+    for workflow_id, name, shard in shards:
+        if shard.get('subWorkflowMetadata'):
+            # calls of expanded subworkflows are reported instead
+            continue
+        profile = shard_profile(workflow_id, name, shard)
+        attributes = shard.get('runtimeAttributes') or dict()
+        seconds = profile.run if profile.run is not None else profile.duration
+        usage.append(Usage(name, (workflow_id, profile.shard), profile.attempt, profile.status,
+                           bool(profile.cache_hit), seconds, parse_cpu(attributes.get('cpu')),
+                           parse_memory(attributes.get('memory'))))
+    return usage
+
+
+class _Call:
+    """Running totals of a call, durations are kept in a compact array of doubles"""
+
+    def __init__(self):
+        self.workflows = 0
+        self.shards = 0
+        self.attempts = 0
+        self.failures = 0
+        self.cache_hits = 0
+        self.cpu_hours = 0.0
+        self.memory_hours = 0.0
+        self.durations = array('d')
+
+
+class CallAggregator:
+    """
+    Aggregate Usage of calls of many workflows by fully qualified call name.
+    Only durations are kept per attempt, so memory does not grow with the size of metadata.
+    """
+
+    def __init__(self):
+        self.calls = OrderedDict()
+        self.workflows = 0
+
+    def add(self, usage):
+        """
+        Add Usage records of one workflow
+        :param usage: list of Usage, see workflow_usage
+        """
+        self.workflows += 1
+        final = dict()
+        for record in usage:
+            call = self.calls.setdefault(record.name, _Call())
+            call.attempts += 1
+            if record.seconds is not None and not record.cache_hit:
+                call.durations.append(record.seconds)
+                hours = record.seconds / 3600
+                call.cpu_hours += hours * (record.cpu or 0)
+                call.memory_hours += hours * (record.memory or 0)
+            key = (record.name, record.shard)
+            if key not in final or (record.attempt or 0) >= (final[key].attempt or 0):
+                final[key] = record
+        for name in {record.name for record in usage}:
+            self.calls[name].workflows += 1
+        for record in final.values():
+            call = self.calls[record.name]
+            call.shards += 1
+            call.failures += record.status == 'Failed'
+            call.cache_hits += record.cache_hit
+
+    def results(self):
+        """
+        :return: list of CallStats in order of first appearance
+        """
+        stats = []
+        for name, call in self.calls.items():
+            durations = sorted(call.durations)
+            stats.append(CallStats(name, call.workflows, call.shards, call.attempts, percentile(durations, 50),
+                                   percentile(durations, 95), durations[-1] if durations else None,
+                                   call.failures / call.shards if call.shards else None,
+                                   call.cache_hits / call.shards if call.shards else None,
+                                   round(call.cpu_hours, 3), round(call.memory_hours, 3)))
+        return stats
+
+
+def analyze(client, workflow_ids, workers=10, expand_sub_workflows=True, errors=None):
+    """
+    Fetch metadata of workflows concurrently and aggregate their calls.
+    Metadata is streamed and reduced to Usage records by each worker, so only one workflow per worker is in memory.
+    :param client: CromwellClient
+    :param workflow_ids: iterable of workflow IDs, e.g. from CromwellClient.iter_workflows
+    :param workers: number of concurrent metadata requests
+    :param expand_sub_workflows: aggregate calls of subworkflows instead of subworkflow calls
+    :param errors: function called with workflow ID and exception of workflows whose metadata failed
+    :return: CallAggregator
+    """
+    aggregator = CallAggregator()
+
+    def fetch(workflow_id):
+        return workflow_usage(client.iter_shards(workflow_id, ANALYTICS_KEYS,
+                                                 expand_sub_workflows=expand_sub_workflows))
+
+    for workflow_id, usage, error in imap_unordered(fetch, workflow_ids, workers):
+        if error is not None:
+            if errors is None:
+                raise error
+            errors(workflow_id, error)
+            continue
+        aggregator.add(usage)
+    return aggregator
+
+
+def write_table(rows, fieldnames, path=None, table_format='csv'):
+    """
+    Write rows as a columnar file (Parquet or Arrow IPC, requires pyarrow) or CSV
+    :param rows: list of dict objects
+    :param fieldnames: columns
+    :param path: destination file, stdout for CSV if None
+    :param table_format: one of TABLE_FORMATS
+    """
+    if table_format not in TABLE_FORMATS:
+        raise ValueError('Unknown table format {}'.format(table_format))
+    if table_format == 'csv':
+        file = open(path, 'w', newline='') if path else sys.stdout
+        try:
+            writer = csv.DictWriter(file, fieldnames, extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(rows)
+        finally:
+            if path:
+                file.close()
+        return
+
+    try:
+        import pyarrow
+    except ImportError:
+        raise Exception('{} output requires pyarrow, install wftools[arrow] or use csv'.format(table_format))
+    if not path:
+        raise Exception('{} output requires a destination file'.format(table_format))
+    table = pyarrow.table({name: [row.get(name) for row in rows] for name in fieldnames})
+    if table_format == 'parquet':
+        import pyarrow.parquet
+        pyarrow.parquet.write_table(table, path)
+    else:
+        import pyarrow.ipc
+        with pyarrow.ipc.new_file(path, table.schema) as writer:
+            writer.write_table(table)
+
+
+def table_format_of(path):
+    """
+    Guess table format from file extension: .parquet is Parquet, .arrow, .feather and .ipc are Arrow IPC,
+    any other extension (or no file) is CSV
+    :param path: file path or None
+    :return: one of TABLE_FORMATS
+    """
+    extension = (path or '').rsplit('.', 1)[-1].lower()
+    if extension == 'parquet':
+        return 'parquet'
+    if extension in ('arrow', 'feather', 'ipc'):
+        return 'arrow'
+    return 'csv'
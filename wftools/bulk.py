@@ -0,0 +1,251 @@
+import csv
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import uuid
+import warnings
+
+from .transfer import RateLimiter
+
+# label added to workflows of a batch, used to find them when the response of /batch was lost
+BATCH_LABEL = 'wftools-batch'
+
+IN_FLIGHT_STATES = ['Submitted', 'Running']
+
+
+def inputs_hash(inputs):
+    """
+    Hash inputs independently of key order
+    :param inputs: dict of inputs
+    :return: hexadecimal SHA-256
+    """
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+
+def _parse_value(value):
+    """Decode JSON arrays and objects of sample sheet cells, other values are kept as strings"""
+    if value[:1] in ('[', '{'):
+        try:
+            return json.loads(value)
+        except ValueError:
+            pass
+    return value
+
+
+def read_samples(path, id_column=None):
+    """
+    Read inputs of samples from a sample sheet or a directory of inputs JSON files.
+    In a sample sheet (TSV with .tsv or .txt extension, CSV otherwise) each row is a sample, columns are fully
+    qualified input names (e.g. main.fastq) and cells holding JSON arrays or objects are decoded.
+    In a directory, each .json file holds the inputs of the sample named after the file.
+    :param path: sample sheet or directory
+    :param id_column: column of sample sheet with sample IDs (first column by default), not sent as input
+    :return: generator of (sample_id, inputs) tuples
+    """
+    if os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            if name.endswith('.json'):
+                with open(os.path.join(path, name)) as file:
+                    yield name[:-len('.json')], json.load(file)
+        return
+
+    delimiter = '\t' if path.endswith(('.tsv', '.txt')) else ','
+    with open(path, newline='') as file:
+        reader = csv.DictReader(file, delimiter=delimiter)
+        id_column = id_column or reader.fieldnames[0]
+        if id_column not in reader.fieldnames:
+            raise Exception('Column {} not found in {}'.format(id_column, path))
+        for row in reader:
+            sample = row.pop(id_column)
+            yield sample, {key: _parse_value(value) for key, value in row.items() if value != ''}
+
+
+class Ledger:
+    """
+    SQLite record of samples, the batch they were sent in and the workflow IDs returned, so that an interrupted
+    submission can resume without submitting samples twice.
+    A batch is recorded before it is sent: samples with a batch but no workflow ID are unconfirmed.
+    """
+
+    def __init__(self, path):
+        """
+        Initializes Ledger, creating the database if needed
+        :param path: SQLite database file
+        """
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('CREATE TABLE IF NOT EXISTS samples (sample TEXT PRIMARY KEY, inputs TEXT NOT NULL, '
+                                'hash TEXT NOT NULL, batch TEXT, workflow_id TEXT, submitted REAL)')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS samples_batch ON samples (batch)')
+        self.connection.commit()
+
+    def add(self, samples):
+        """
+        Record samples not yet in the ledger.
+        Inputs of samples not yet sent are updated when they changed; samples already sent are not submitted again,
+        a warning lists those whose inputs changed.
+        :param samples: iterable of (sample_id, inputs) tuples
+        :return: number of new samples
+        """
+        new, changed = 0, []
+        with self.connection:
+            for sample, inputs in samples:
+                digest = inputs_hash(inputs)
+                row = self.connection.execute('SELECT hash, batch FROM samples WHERE sample = ?', (sample,)).fetchone()
+                if row is None:
+                    self.connection.execute('INSERT INTO samples (sample, inputs, hash) VALUES (?, ?, ?)',
+                                            (sample, json.dumps(inputs), digest))
+                    new += 1
+                elif row[0] != digest:
+                    if row[1] is None:
+                        self.connection.execute('UPDATE samples SET inputs = ?, hash = ? WHERE sample = ?',
+                                                (json.dumps(inputs), digest, sample))
+                    else:
+                        changed.append(sample)
+        if changed:
+            warnings.warn('Inputs of samples already submitted changed, they are not submitted again: {}'.format(
+                ', '.join(changed)), RuntimeWarning)
+        return new
+
+    def unsubmitted(self, limit):
+        """
+        :param limit: maximum number of samples
+        :return: list of (sample_id, inputs) tuples of samples not sent in any batch
+        """
+        rows = self.connection.execute('SELECT sample, inputs FROM samples WHERE batch IS NULL ORDER BY rowid LIMIT ?',
+                                       (limit,))
+        return [(sample, json.loads(inputs)) for sample, inputs in rows]
+
+    def assign(self, batch, samples):
+        """
+        Record that samples are about to be sent in a batch
+        :param batch: batch ID
+        :param samples: list of sample IDs
+        """
+        with self.connection:
+            self.connection.executemany('UPDATE samples SET batch = ? WHERE sample = ?',
+                                        ((batch, sample) for sample in samples))
+
+    def record(self, mapping):
+        """
+        Record workflow IDs of samples
+        :param mapping: list of (sample_id, workflow_id) tuples
+        """
+        now = time.time()
+        with self.connection:
+            self.connection.executemany('UPDATE samples SET workflow_id = ?, submitted = ? WHERE sample = ?',
+                                        ((workflow_id, now, sample) for sample, workflow_id in mapping))
+
+    def unconfirmed(self):
+        """
+        :return: dict of batch ID to dict of inputs hash to list of sample IDs of samples sent without recorded
+            workflow ID, samples with identical inputs have the same hash
+        """
+        batches = dict()
+        rows = self.connection.execute('SELECT batch, hash, sample FROM samples '
+                                       'WHERE batch IS NOT NULL AND workflow_id IS NULL ORDER BY rowid')
+        for batch, digest, sample in rows:
+            batches.setdefault(batch, dict()).setdefault(digest, []).append(sample)
+        return batches
+
+    def reset(self, batch):
+        """
+        Mark samples of a batch without workflow ID as not submitted
+        :param batch: batch ID
+        """
+        with self.connection:
+            self.connection.execute('UPDATE samples SET batch = NULL WHERE batch = ? AND workflow_id IS NULL',
+                                    (batch,))
+
+    def workflows(self):
+        """
+        :return: list of (sample_id, workflow_id) tuples of submitted samples
+        """
+        return list(self.connection.execute('SELECT sample, workflow_id FROM samples WHERE workflow_id IS NOT NULL '
+                                            'ORDER BY rowid'))
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def recover(client, ledger):
+    """
+    Find workflows of batches sent without recorded response, matching them to samples by hash of submitted inputs.
+    Samples with identical inputs are interchangeable, each workflow is matched to one of them.
+    Samples without workflow are marked to be submitted again.
+    :param client: CromwellClient
+    :param ledger: Ledger
+    :return: generator of (sample_id, workflow_id) tuples of recovered samples
+    """
+    for batch, samples in ledger.unconfirmed().items():
+        mapping = []
+        for workflow in client.iter_workflows(labels={BATCH_LABEL: batch}):
+            metadata = client.metadata(workflow['id'], include_key=['submittedFiles'])
+            submitted = (metadata.get('submittedFiles') or dict()).get('inputs')
+            candidates = samples.get(inputs_hash(json.loads(submitted))) if submitted else None
+            if candidates:
+                mapping.append((candidates.pop(0), workflow['id']))
+        ledger.record(mapping)
+        ledger.reset(batch)
+        yield from mapping
+
+
+def wait_for_capacity(client, size, max_in_flight, interval=30, sleep=time.sleep):
+    """
+    Block until Cromwell has room for more workflows
+    :param client: CromwellClient
+    :param size: number of workflows to be submitted
+    :param max_in_flight: maximum number of submitted and running workflows
+    :param interval: seconds between checks
+    :param sleep: function used to wait
+    """
+    while client.count(IN_FLIGHT_STATES) + size > max_in_flight:
+        sleep(interval)
+
+
+def submit_samples(client, workflow, samples, ledger, batch_size=100, max_in_flight=None, max_per_second=None,
+                   interval=30, labels=None, **kwargs):
+    """
+    Submit samples in batches, recording them in a ledger.
+    Samples already in the ledger are not submitted again and batches interrupted in a previous run are recovered.
+    :param client: CromwellClient
+    :param workflow: Workflow source file path (or URL)
+    :param samples: iterable of (sample_id, inputs) tuples, see read_samples
+    :param ledger: Ledger
+    :param batch_size: maximum number of workflows per request to /batch
+    :param max_in_flight: maximum number of submitted and running workflows in Cromwell (smaller batches are not
+        sent while it would be exceeded)
+    :param max_per_second: maximum number of workflows submitted per second
+    :param interval: seconds between checks of running workflows
+    :param labels: dict of labels to apply to all workflows
+    :param kwargs: other arguments of CromwellClient.submit_batch
+    :return: generator of (sample_id, workflow_id) tuples of submitted samples
+    """
+    yield from recover(client, ledger)
+    ledger.add(samples)
+    if max_in_flight is not None:
+        batch_size = min(batch_size, max_in_flight)
+    limiter = RateLimiter(max_per_second) if max_per_second else None
+    while True:
+        chunk = ledger.unsubmitted(batch_size)
+        if not chunk:
+            return
+        if max_in_flight is not None:
+            wait_for_capacity(client, len(chunk), max_in_flight, interval)
+        if limiter is not None:
+            limiter.consume(len(chunk))
+        batch = uuid.uuid4().hex
+        ledger.assign(batch, [sample for sample, _ in chunk])
+        workflow_ids = client.submit_batch(workflow, [inputs for _, inputs in chunk],
+                                           labels=dict(labels or dict(), **{BATCH_LABEL: batch}), **kwargs)
+        mapping = [(sample, workflow_id) for (sample, _), workflow_id in zip(chunk, workflow_ids)]
+        ledger.record(mapping)
+        yield from mapping
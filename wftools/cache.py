@@ -0,0 +1,191 @@
+import base64
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import warnings
+
+
+def default_cache_dir():
+    """
+    :return: wftools directory inside XDG_CACHE_HOME (~/.cache by default)
+    """
+    return os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'wftools')
+
+
+class ResponseCache:
+    """
+    On-disk cache of API responses.
+    Entries are JSON files named by key that either never expire or expire after a TTL.
+    When the total size exceeds max_size the least recently used entries are deleted.
+    """
+    missing = object()
+
+    def __init__(self, directory=None, max_size=1024 ** 3, ttl=60):
+        """
+        Initializes ResponseCache
+        :param directory: directory of cache files (see default_cache_dir)
+        :param max_size: maximum total size of cache files in bytes
+        :param ttl: default seconds until entries of non-terminal resources expire
+        """
+        self.directory = directory or default_cache_dir()
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._size = None
+        self._warned = False
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(*parts):
+        """
+        Build cache key from parts, e.g. host, endpoint and parameters
+        :param parts: JSON serializable objects
+        :return: key as hexadecimal string
+        """
+        return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.json')
+
+    def get(self, key, default=missing, record=True):
+        """
+        Get cached value
+        :param key: cache key
+        :param default: value returned when key is not cached or expired (ResponseCache.missing by default)
+        :param record: count hit or miss in statistics
+        :return: cached value or default
+        """
+        path = self._path(key)
+        try:
+            with open(path) as file:
+                entry = json.load(file)
+        except (OSError, ValueError):
+            entry = None
+        if entry is not None and entry.get('expires') is not None and entry['expires'] < time.time():
+            entry = None
+        if record:
+            with self.lock:
+                if entry is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+        if entry is None:
+            return default
+        try:
+            # modification time tracks last use for LRU eviction
+            os.utime(path)
+        except OSError:
+            pass
+        return base64.b64decode(entry['raw']) if 'raw' in entry else entry['value']
+
+    def set(self, key, value, ttl=None):
+        """
+        Store value
+        :param key: cache key
+        :param value: JSON serializable object or bytes
+        :param ttl: seconds until entry expires, None never expires
+        """
+        entry = dict(expires=None if ttl is None else time.time() + ttl)
+        if isinstance(value, bytes):
+            entry['raw'] = base64.b64encode(value).decode()
+        else:
+            entry['value'] = value
+        content = json.dumps(entry).encode()
+
+        path = self._path(key)
+        tmp_path = None
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.part')
+            with os.fdopen(fd, 'wb') as file:
+                file.write(content)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            # the cache must never fail a request, e.g. on a read-only or missing directory
+            self._warn(e)
+            if tmp_path is not None:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+            return
+
+        with self.lock:
+            try:
+                if self._size is None:
+                    self._size = sum(entry.stat().st_size for entry in self._entries())
+                else:
+                    self._size += len(content)
+                if self._size > self.max_size:
+                    self._evict()
+            except OSError as e:
+                self._size = None
+                self._warn(e)
+
+    def _warn(self, error):
+        """Warn once that responses are not cached"""
+        if not self._warned:
+            self._warned = True
+            warnings.warn('Responses are not cached in {}: {}'.format(self.directory, error), RuntimeWarning)
+
+    def delete(self, key):
+        """
+        Remove cached value
+        :param key: cache key
+        """
+        try:
+            os.unlink(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        """
+        Remove all cached values
+        """
+        with self.lock:
+            for entry in self._entries():
+                os.unlink(entry.path)
+            self._size = 0
+
+    def stats(self):
+        """
+        :return: dict with number of hits and misses
+        """
+        return dict(hits=self.hits, misses=self.misses)
+
+    def _entries(self):
+        if not os.path.isdir(self.directory):
+            return
+        for subdir in os.scandir(self.directory):
+            if subdir.is_dir():
+                for entry in os.scandir(subdir.path):
+                    if entry.name.endswith('.json'):
+                        yield entry
+
+    def _evict(self):
+        """Delete least recently used entries until cache uses 80% of max_size"""
+        entries = []
+        for entry in self._entries():
+            try:
+                stat = entry.stat()
+            except OSError:
+                # deleted by another process
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+        self._size = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self._size <= self.max_size * 0.8:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                self._warn(e)
+                break
+            self._size -= size
@@ -1,10 +1,68 @@
+import time
+
 import requests
-from urllib.parse import urljoin
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib.parse import urljoin, urlsplit
+
+from .trace import RequestEvent, path_template
 
 
 class Client:
-    def __init__(self, host):
+    # hooks called by all clients, e.g. installed by the --trace option of the command line
+    pre_request_hooks = []
+    post_request_hooks = []
+
+    def __init__(self, host, pool_size=10, connect_timeout=5, read_timeout=60, retries=3, backoff_factor=0.5,
+                 session=None, cache=None, pre_request=None, post_request=None):
+        """
+        Initializes Client with a persistent pool of HTTP connections
+        :param host: server URL
+        :param pool_size: maximum number of connections kept alive to the server
+        :param connect_timeout: seconds to wait for a connection to be established
+        :param read_timeout: seconds to wait for the server to send a response
+        :param retries: number of retries on connection errors and 429/5xx responses (0 disables it)
+        :param backoff_factor: exponential backoff factor in seconds between retries
+        :param session: use an existing requests.Session instead of creating a new one
+        :param cache: wftools.cache.ResponseCache used by cached_get (disabled by default)
+        :param pre_request: list of functions called with (method, path template) before every request
+        :param post_request: list of functions called with a wftools.trace.RequestEvent after every request
+        """
         self.host = host
+        self.cache = cache
+        self.pre_request = list(pre_request or [])
+        self.post_request = list(post_request or [])
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = session if session is not None else self._create_session(pool_size, retries, backoff_factor)
+
+    @staticmethod
+    def _create_session(pool_size, retries, backoff_factor):
+        """
+        Create a requests.Session that reuses connections and retries failed requests
+        :param pool_size: maximum number of connections kept alive per host
+        :param retries: number of retries
+        :param backoff_factor: exponential backoff factor in seconds
+        :return: requests.Session object
+        """
+        retry = Retry(total=retries, backoff_factor=backoff_factor, status_forcelist=(429, 500, 502, 503, 504),
+                      raise_on_status=False, respect_retry_after_header=True)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def close(self):
+        """
+        Close all pooled connections
+        """
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
 
     def get(self, path, data=None, raw_response_content=False):
         """
@@ -14,8 +72,71 @@ class Client:
         :param raw_response_content: return raw response content instead of parsing as JSON to dict
         :return: dic object or content of response in bytes
         """
-        response = requests.get(self.url(path), params=data)
-        return response.content if raw_response_content else response.json()
+        return self.request('GET', path, raw_response_content, params=data)[1]
+
+    def cached_get(self, path, data=None, ttl=None, raw_response_content=False, key=None):
+        """
+        GET API endpoint returning cached response if available.
+        Only successful responses are cached.
+        :param path: API endpoint
+        :param data: query parameters
+        :param ttl: seconds until cached response expires, None never expires
+        :param raw_response_content: return raw response content instead of parsing as JSON to dict
+        :param key: cache key, by default it is built from host, endpoint and parameters (see cache_key)
+        :return: dic object or content of response in bytes
+        """
+        if self.cache is None:
+            return self.get(path, data, raw_response_content)
+        key = key or self.cache_key(path, data, raw_response_content)
+        value = self.cache.get(key)
+        if value is not self.cache.missing:
+            return value
+        response, value = self.request('GET', path, raw_response_content, params=data)
+        if response.ok:
+            self.cache.set(key, value, ttl)
+        return value
+
+    def cache_key(self, path, data=None, raw_response_content=False):
+        """
+        Build the key of a GET response in cache
+        :param path: API endpoint
+        :param data: query parameters
+        :param raw_response_content: key of raw response content instead of parsed JSON
+        :return: cache key
+        """
+        return self.cache.key(self.host, path, data, raw_response_content)
+
+    def get_stream(self, path, data=None, chunk_size=1024 ** 2):
+        """
+        GET API endpoint reading response content incrementally
+        :param path: API endpoint
+        :param data: query parameters
+        :param chunk_size: maximum number of bytes per chunk
+        :return: generator of response content chunks in bytes
+        """
+        hooks = self._hooks()
+        template = self._before(hooks, 'GET', path)
+        start = time.perf_counter()
+        status = error = None
+        wait = size = 0
+        try:
+            with self.session.get(self.url(path), params=data, timeout=self.timeout, stream=True) as response:
+                status, wait = response.status_code, response.elapsed.total_seconds()
+                if not response.ok:
+                    try:
+                        message = response.json().get('message')
+                    except ValueError:
+                        message = response.text
+                    raise Exception(message or '{} {}'.format(response.status_code, response.reason))
+                for chunk in response.iter_content(chunk_size):
+                    size += len(chunk)
+                    yield chunk
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            self._after(hooks, RequestEvent('GET', self.url(path), template, status, size, wait,
+                                            time.perf_counter() - start, None, error))
 
     def patch(self, path, data, raw_response_content=False):
         """
@@ -25,19 +146,75 @@ class Client:
         :param raw_response_content: return raw response content instead of parsing as JSON to dict
         :return: dic object or content of response in bytes
         """
-        response = requests.patch(self.url(path), data=data)
-        return response.content if raw_response_content else response.json()
+        return self.request('PATCH', path, raw_response_content, data=data)[1]
 
-    def post(self, path, data=None, raw_response_content=False):
+    def post(self, path, data=None, raw_response_content=False, json=None, body=None, content_type=None):
         """
         POST API endpoint
         :param path: API endpoint
         :param data: multipart/form-data parameters
         :param raw_response_content: return raw response content instead of parsing as JSON to dict
+        :param json: object to send as JSON body instead of multipart/form-data
+        :param body: bytes or file-like object sent as is, e.g. wftools.multipart.MultipartEncoder
+        :param content_type: Content-Type of body
         :return: dic object or content of response in bytes
         """
-        response = requests.post(self.url(path), files=data)
-        return response.content if raw_response_content else response.json()
+        headers = {'Content-Type': content_type} if content_type else None
+        return self.request('POST', path, raw_response_content, files=data, data=body, json=json, headers=headers)[1]
+
+    def request(self, method, path, raw_response_content=False, **kwargs):
+        """
+        Send a request to API endpoint calling request hooks
+        :param method: HTTP method
+        :param path: API endpoint
+        :param raw_response_content: return raw response content instead of parsing as JSON to dict
+        :param kwargs: arguments of requests.Session.request
+        :return: (requests.Response, dict object or content of response in bytes) tuple
+        """
+        hooks = self._hooks()
+        template = self._before(hooks, method, path)
+        start = time.perf_counter()
+        response = None
+        decode = None
+        try:
+            response = self.session.request(method, self.url(path), timeout=self.timeout, **kwargs)
+            if raw_response_content:
+                value = response.content
+            else:
+                decoding = time.perf_counter()
+                value = response.json()
+                decode = time.perf_counter() - decoding
+        except Exception as e:
+            self._after(hooks, self._event(method, path, template, response, start, decode, str(e)))
+            raise
+        self._after(hooks, self._event(method, path, template, response, start, decode))
+        return response, value
+
+    def _hooks(self):
+        """Pre and post request hooks of all clients and of this client"""
+        return Client.pre_request_hooks + self.pre_request, Client.post_request_hooks + self.post_request
+
+    @staticmethod
+    def _before(hooks, method, path):
+        """Call pre request hooks, returning path template if there are hooks"""
+        if not hooks[0] and not hooks[1]:
+            return None
+        template = path_template(urlsplit(path).path)
+        for hook in hooks[0]:
+            hook(method, template)
+        return template
+
+    @staticmethod
+    def _after(hooks, event):
+        for hook in hooks[1]:
+            hook(event)
+
+    def _event(self, method, path, template, response, start, decode=None, error=None):
+        elapsed = time.perf_counter() - start - (decode or 0)
+        if response is None:
+            return RequestEvent(method, self.url(path), template, None, 0, None, elapsed, decode, error)
+        return RequestEvent(method, self.url(path), template, response.status_code, len(response.content),
+                            response.elapsed.total_seconds(), elapsed, decode, error)
 
     def url(self, path):
         """
@@ -0,0 +1,7 @@
+# values shared by modules and the command line without importing them, so that commands load only what they use
+
+# formats of tables written by wftools.analytics.write_table
+TABLE_FORMATS = ['csv', 'parquet', 'arrow']
+
+# fields of wftools.profile.CallProfile by which calls can be ranked
+SORT_KEYS = ['wall', 'run', 'queue', 'attempts', 'cache_savings']
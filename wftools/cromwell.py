@@ -1,5 +1,22 @@
+import json
+
 from . import is_url
 from .client import Client
+from .metadata import CALL_KEYS, call_record, iter_shards
+from .multipart import MultipartEncoder
+from .payload import Payload, SubmissionContext
+from .watch import watch
+
+
+def _last_page_size(offset, remaining):
+    """
+    Smallest page size of at least remaining workflows starting at offset, pages start at multiples of their size
+    :param offset: number of workflows already fetched, a multiple of previous page sizes
+    :param remaining: number of workflows still wanted
+    """
+    if offset == 0:
+        return remaining
+    return next(size for size in range(remaining, offset + 1) if offset % size == 0)
 
 
 class CromwellClient(Client):
@@ -7,15 +24,30 @@ class CromwellClient(Client):
     Cromwell API client.
     Provides all methods available of this API
     """
+    terminal_states = ('Succeeded', 'Failed', 'Aborted')
 
-    def __init__(self, host, api_version='v1'):
+    def __init__(self, host, api_version='v1', payloads=None, **kwargs):
         """
         Initializes CromwellClient
         :param host: Cromwell server URL
         :param api_version: Cromwell API version
+        :param payloads: SubmissionContext caching uploaded files, shared with other clients
+            (by default the client has its own, released by close)
+        :param kwargs: connection pool, timeout and retry options passed to Client
         """
-        super().__init__(host)
+        super().__init__(host, **kwargs)
         self.api_version = api_version
+        self._terminal = set()
+        self._own_payloads = payloads is None
+        self.payloads = SubmissionContext() if payloads is None else payloads
+
+    def close(self):
+        """
+        Close all pooled connections and release cached payloads
+        """
+        super().close()
+        if self._own_payloads:
+            self.payloads.close()
 
     def abort(self, workflow_id):
         """
@@ -29,6 +61,17 @@ class CromwellClient(Client):
             raise Exception(response.get('message'))
         return response.get('status')
 
+    def count(self, status=None, labels=None, include_subworkflows=False):
+        """
+        Count workflows matching some criteria without fetching them
+        :param status: Count only workflows with the specified status
+        :param labels: Count only workflows with all labels, dict or list of 'key:value' strings
+        :param include_subworkflows: Include subworkflows in count
+        :return: number of workflows
+        """
+        response = self._query(None, None, status, None, None, None, labels, include_subworkflows, 1, 1)
+        return response.get('totalResultsCount', len(response.get('results') or []))
+
     def describe(self, workflow, inputs=None, language=None, language_version=None):
         """
         Machine-readable description of a workflow, including inputs and outputs
@@ -42,15 +85,26 @@ class CromwellClient(Client):
         if is_url(workflow):
             data['workflowUrl'] = workflow
         else:
-            data['workflowSource'] = open(workflow, 'rb')
+            data['workflowSource'] = self.payloads.file(workflow)
 
         if inputs is not None:
-            data['workflowInputs'] = open(inputs, 'rb')
+            data['workflowInputs'] = self.payloads.file(inputs)
 
         path = '/api/womtool/{version}/describe'.format(version=self.api_version)
-        response = super().post(path, data)
+        key = None
+        if self.cache is not None:
+            # keyed by content so that edited files are described again
+            key = self.cache.key(self.host, path, data.get('workflowUrl') or data['workflowSource'].digest,
+                                 inputs and data['workflowInputs'].digest, language, language_version)
+            response = self.cache.get(key)
+            if response is not self.cache.missing:
+                return response
+
+        response = self._post_form(path, data)
         if response.get('status') in ('fail', 'error'):
             raise Exception(response.get('message'))
+        if key is not None:
+            self.cache.set(key, response, self.cache.ttl if is_url(workflow) else None)
         return response
 
     def diff(self, workflow_id_a, workflow_id_b, call_a, call_b, index_a, index_b):
@@ -95,6 +149,63 @@ class CromwellClient(Client):
             raise Exception(response.get('message'))
         return response
 
+    def iter_calls(self, workflow_id, include_key=None, exclude_key=None, expand_sub_workflows=False):
+        """
+        Stream call-level metadata of a workflow as compact records, one shard and attempt at a time,
+        without loading the whole metadata document in memory
+        :param workflow_id: Workflow ID
+        :param include_key: metadata keys to be retrieved, wftools.metadata.CALL_KEYS by default
+            (unless exclude_key is given)
+        :param exclude_key: metadata keys to be excluded
+        :param expand_sub_workflows: include calls of subworkflows
+        :return: generator of wftools.metadata.CallRecord
+        """
+        return (call_record(*shard) for shard in self.iter_shards(workflow_id, include_key, exclude_key,
+                                                                  expand_sub_workflows))
+
+    def iter_shards(self, workflow_id, include_key=None, exclude_key=None, expand_sub_workflows=False):
+        """
+        Stream call-level metadata of a workflow, one shard and attempt at a time, see iter_calls
+        :return: generator of (workflow_id, call_name, shard) tuples, where shard is a dict of call metadata
+        """
+        if include_key is None and exclude_key is None:
+            include_key = CALL_KEYS
+        path = '/api/workflows/{version}/{id}/metadata'.format(id=workflow_id, version=self.api_version)
+        data = dict(includeKey=include_key, excludeKey=exclude_key,
+                    expandSubWorkflows=str(bool(expand_sub_workflows)).lower())
+        return iter_shards(super().get_stream(path, data), workflow_id)
+
+    def iter_workflows(self, workflow_ids=None, names=None, status=None, submission=None, start=None, end=None,
+                       labels=None, include_subworkflows=None, page_size=1000, limit=None, additional_fields=None):
+        """
+        Iterate over workflows matching some criteria fetching one page at a time
+        :param workflow_ids: Returns only workflows with the specified workflow IDs
+        :param names: Returns only workflows with the specified name
+        :param status: Returns only workflows with the specified status
+        :param submission: Returns only workflows submitted on or after this date-time
+        :param start: Returns only workflows started on or after this date-time
+        :param end: Returns only workflows ended on or before this date-time
+        :param labels: Returns only workflows with all labels, dict or list of 'key:value' strings
+        :param include_subworkflows: Include subworkflows in results (Cromwell default is True)
+        :param page_size: Number of workflows requested per page
+        :param limit: Stop after this many workflows
+        :param additional_fields: other fields of workflows to return, e.g. ['labels']
+        :return: generator of workflows
+        """
+        count = 0
+        while limit is None or count < limit:
+            size = page_size if limit is None else _last_page_size(count, min(page_size, limit - count))
+            page = count // size + 1
+            response = self._query(workflow_ids, names, status, submission, start, end, labels, include_subworkflows,
+                                   page, size, additional_fields)
+            results = response.get('results') or []
+            for workflow in results[:None if limit is None else limit - count]:
+                count += 1
+                yield workflow
+            total = response.get('totalResultsCount')
+            if len(results) < size or (total is not None and page * size >= total):
+                return
+
     def labels(self, workflow_id):
         """
         Retrieves the current labels for a workflow
@@ -106,20 +217,40 @@ class CromwellClient(Client):
             raise Exception(response.get('message'))
         return response
 
-    def list(self, workflow_ids=None, names=None, status=None):
+    def list(self, workflow_ids=None, names=None, status=None, submission=None, start=None, end=None, labels=None,
+             include_subworkflows=None, page=None, page_size=None):
         """
         Get workflows matching some criteria
         :param workflow_ids: Returns only workflows with the specified workflow IDs
         :param names: Returns only workflows with the specified name
         :param status: Returns only workflows with the specified status
+        :param submission: Returns only workflows submitted on or after this date-time
+        :param start: Returns only workflows started on or after this date-time
+        :param end: Returns only workflows ended on or before this date-time
+        :param labels: Returns only workflows with all labels, dict or list of 'key:value' strings
+        :param include_subworkflows: Include subworkflows in results (Cromwell default is True)
+        :param page: Page of results to return, starting at 1 (all results by default)
+        :param page_size: Number of workflows per page
         :return:
         """
+        response = self._query(workflow_ids, names, status, submission, start, end, labels, include_subworkflows,
+                               page, page_size)
+        return response.get('results')
+
+    def _query(self, workflow_ids, names, status, submission, start, end, labels, include_subworkflows, page,
+               page_size, additional_fields=None):
         path = '/api/workflows/{version}/query'.format(version=self.api_version)
-        data = dict(id=workflow_ids, name=names, status=status)
+        if isinstance(labels, dict):
+            labels = ['{}:{}'.format(key, value) for key, value in labels.items()]
+        if include_subworkflows is not None:
+            include_subworkflows = str(bool(include_subworkflows)).lower()
+        data = dict(id=workflow_ids, name=names, status=status, submission=submission, start=start, end=end,
+                    label=labels, includeSubworkflows=include_subworkflows, page=page, pageSize=page_size,
+                    additionalQueryResultFields=additional_fields)
         response = super().get(path, data)
         if response.get('status') in ('fail', 'error'):
             raise Exception(response.get('message'))
-        return response.get('results')
+        return response
 
     def logs(self, workflow_id):
         """
@@ -127,23 +258,61 @@ class CromwellClient(Client):
         :return:
         """
         path = '/api/workflows/{version}/{id}/logs'.format(id=workflow_id, version=self.api_version)
-        response = super().get(path)
+        response = self._cached_get(workflow_id, path)
         if response.get('status') in ('fail', 'error'):
             raise Exception(response.get('message'))
         return response.get('calls')
 
-    def metadata(self, workflow_id, exclude_key, expand_sub_workflows, include_key):
+    def metadata(self, workflow_id, exclude_key=None, expand_sub_workflows=None, include_key=None):
         """
         Get workflow and call-level metadata for a specified workflow
-        :return:
+        :param workflow_id: Workflow ID
+        :param exclude_key: metadata keys to be excluded
+        :param expand_sub_workflows: include metadata of subworkflows
+        :param include_key: metadata keys to be retrieved, all keys by default
+        :return: dict of metadata
         """
         path = '/api/workflows/{version}/{id}/metadata'.format(id=workflow_id, version=self.api_version)
+        if expand_sub_workflows is not None:
+            expand_sub_workflows = str(bool(expand_sub_workflows)).lower()
         data = dict(excludeKey=exclude_key, expandSubWorkflows=expand_sub_workflows, includeKey=include_key)
-        response = super().get(path, data)
+        # metadata holds the status of the workflow, remembered below
+        response = self._cached_get(workflow_id, path, data, resolve_status=False)
         if response.get('status') in ('fail', 'error'):
             raise Exception(response.get('message'))
+        if self._remember_status(workflow_id, response.get('status')):
+            # cached with TTL before workflow status was known
+            self.cache.set(self.cache_key(path, data), response)
         return response
 
+    def profile(self, workflow_id, expand_sub_workflows=False, sort='wall'):
+        """
+        Profile queue time, run time, cache hits, retries and critical path of calls of a workflow,
+        streaming its metadata one call at a time
+        :param workflow_id: Workflow ID
+        :param expand_sub_workflows: profile calls of subworkflows instead of subworkflow calls
+        :param sort: field of wftools.profile.CallProfile by which calls are ranked
+        :return: dict of summary, see wftools.profile.summarize
+        """
+        # imported here so that other requests do not load wftools.profile
+        from .profile import PROFILE_KEYS, summarize
+        shards = self.iter_shards(workflow_id, PROFILE_KEYS, expand_sub_workflows=expand_sub_workflows)
+        return summarize(shards, workflow_id, sort)
+
+    def query(self, filters):
+        """
+        Get workflows matching some criteria sent as JSON body, which is not limited by URL length
+        :param filters: list of single-key dicts, e.g. [{'id': workflow_id}, {'status': 'Running'}]
+        :return: list of workflows
+        """
+        path = '/api/workflows/{version}/query'.format(version=self.api_version)
+        response = super().post(path, json=filters)
+        if response.get('status') in ('fail', 'error'):
+            raise Exception(response.get('message'))
+        for workflow in response.get('results') or []:
+            self._remember_status(workflow.get('id'), workflow.get('status'))
+        return response.get('results')
+
     def release(self, workflow_id):
         """
         Switch a workflow from 'On Hold' to 'Submitted' status
@@ -165,6 +334,7 @@ class CromwellClient(Client):
         response = super().get(path)
         if response.get('status') in ('fail', 'error'):
             raise Exception(response.get('message'))
+        self._remember_status(workflow_id, response.get('status'))
         return response.get('status')
 
     def submit(self, workflow, inputs=None, options=None, dependencies=None, labels=None, language=None,
@@ -174,7 +344,8 @@ class CromwellClient(Client):
         :param workflow: Workflow source file path (or URL)
         :param inputs: JSON or YAML file path containing the inputs
         :param options: JSON file path containing configuration options for the execution of this workflow
-        :param dependencies: ZIP file containing workflow source files that are used to resolve local imports
+        :param dependencies: ZIP file or directory containing workflow source files that are used to resolve local
+            imports
         :param labels: JSON file containing labels to apply to this workflow
         :param language: Workflow language (WDL or CWL)
         :param language_version: Workflow language version (draft-2, 1.0 for WDL or v1.0 for CWL)
@@ -186,20 +357,20 @@ class CromwellClient(Client):
         if is_url(workflow):
             data['workflowUrl'] = workflow
         else:
-            data['workflowSource'] = open(workflow, 'rb')
+            data['workflowSource'] = self.payloads.file(workflow)
 
         if inputs is not None:
-            data['workflowInputs'] = open(inputs, 'rb')
+            data['workflowInputs'] = self.payloads.file(inputs)
 
         if dependencies is not None:
-            data['workflowDependencies'] = open(dependencies, 'rb')
+            data['workflowDependencies'] = self.payloads.dependencies(dependencies)
         if options is not None:
-            data['workflowOptions'] = open(options, 'rb')
+            data['workflowOptions'] = self.payloads.file(options)
         if labels is not None:
-            data['labels'] = open(labels, 'rb')
+            data['labels'] = self.payloads.file(labels)
 
         path = '/api/workflows/{version}'.format(version=self.api_version)
-        response = super().post(path, data)
+        response = self._post_form(path, data)
         if response.get('status') in ('fail', 'error'):
             raise Exception(response.get('message'))
         return response.get('id')
@@ -209,10 +380,11 @@ class CromwellClient(Client):
         """
         Submit a batch of workflows for execution
         :param workflow: Workflow source file path (or URL)
-        :param inputs: List of JSON or YAML file paths containing the inputs
+        :param inputs: JSON file path containing an array of inputs, or list of dicts of inputs, one per workflow
         :param options: JSON file path containing configuration options for the execution of this workflow
-        :param dependencies: ZIP file containing workflow source files that are used to resolve local imports
-        :param labels: JSON file containing labels to apply to this workflow
+        :param dependencies: ZIP file or directory containing workflow source files that are used to resolve local
+            imports
+        :param labels: JSON file path or dict of labels to apply to these workflows
         :param language: Workflow language (WDL or CWL)
         :param language_version: Workflow language version (draft-2, 1.0 for WDL or v1.0 for CWL)
         :param hold: Put workflow on hold upon submission. By default, it is taken as false
@@ -222,21 +394,21 @@ class CromwellClient(Client):
         if is_url(workflow):
             data['workflowUrl'] = workflow
         else:
-            data['workflowSource'] = open(workflow, 'rb')
+            data['workflowSource'] = self.payloads.file(workflow)
 
-        data['workflowInputs'] = open(inputs, 'rb')
+        data['workflowInputs'] = json.dumps(inputs).encode() if isinstance(inputs, list) else self.payloads.file(inputs)
 
         if dependencies is not None:
-            data['workflowDependencies'] = open(dependencies, 'rb')
+            data['workflowDependencies'] = self.payloads.dependencies(dependencies)
         if options is not None:
-            data['workflowOptions'] = open(options, 'rb')
+            data['workflowOptions'] = self.payloads.file(options)
         if labels is not None:
-            data['labels'] = open(labels, 'rb')
+            data['labels'] = json.dumps(labels).encode() if isinstance(labels, dict) else self.payloads.file(labels)
 
         path = '/api/workflows/{version}/batch'.format(version=self.api_version)
-        response = super().post(path, data)
-        if isinstance(response, dict) and response.get('status') == 'fail':
-            raise Exception(response.get('message'))
+        response = self._post_form(path, data)
+        if not isinstance(response, list):
+            raise Exception(response.get('message') if isinstance(response, dict) else response)
         return [workflow.get('id') for workflow in response]
 
     def timing(self, workflow_id, html=False):
@@ -247,7 +419,7 @@ class CromwellClient(Client):
         :return: URL to web page or HTML data
         """
         path = '/api/workflows/{version}/{id}/timing'.format(id=workflow_id, version=self.api_version)
-        return super().get(path, raw_response_content=True).decode() if html else super().url(path)
+        return self._cached_get(workflow_id, path, raw_response_content=True).decode() if html else super().url(path)
 
     def update_labels(self, workflow_id, labels):
         """
@@ -267,7 +439,7 @@ class CromwellClient(Client):
         :return:
         """
         path = '/api/workflows/{version}/{id}/outputs'.format(id=workflow_id, version=self.api_version)
-        response = super().get(path)
+        response = self._cached_get(workflow_id, path)
         if response.get('status') in ('fail', 'error'):
             raise Exception(response.get('message'))
         return response.get('outputs')
@@ -282,3 +454,105 @@ class CromwellClient(Client):
         if response.get('status') in ('fail', 'error'):
             raise Exception(response.get('message'))
         return response.get('cromwell')
+
+    def _post_form(self, path, data):
+        """
+        POST multipart/form-data parameters, streaming payloads so that memory-mapped files are not copied
+        :param path: API endpoint
+        :param data: dict of parameters, Payload, bytes or str values, None values are left out
+        """
+        fields = []
+        for key, value in data.items():
+            if isinstance(value, Payload):
+                fields.append((key, value.part))
+            elif value is not None:
+                fields.append((key, value if isinstance(value, bytes) else str(value)))
+        body = MultipartEncoder(fields)
+        try:
+            return super().post(path, body=body, content_type=body.content_type)
+        finally:
+            body.close()
+
+    def _cached_get(self, workflow_id, path, data=None, raw_response_content=False, resolve_status=True):
+        """
+        GET a workflow resource through cache.
+        Responses of workflows in a terminal state never expire, others expire after cache TTL.
+        :param resolve_status: when the resource is not cached, fetch the status of the workflow first unless it is
+            known to be terminal, so that resources of finished workflows are fetched only once
+        """
+        ttl = None
+        if self.cache is not None and not self._is_terminal(workflow_id):
+            key = self.cache_key(path, data, raw_response_content)
+            if resolve_status and self.cache.get(key, record=False) is self.cache.missing:
+                try:
+                    self.status(workflow_id)
+                except Exception:
+                    # errors, e.g. of unknown workflows, are reported by the request of the resource
+                    pass
+            if not self._is_terminal(workflow_id):
+                ttl = self.cache.ttl
+        return super().cached_get(path, data, ttl, raw_response_content)
+
+    def _is_terminal(self, workflow_id):
+        if workflow_id in self._terminal:
+            return True
+        status = self.cache.get(self.cache.key(self.host, 'status', workflow_id), None, record=False)
+        if status in self.terminal_states:
+            self._terminal.add(workflow_id)
+            return True
+        return False
+
+    def _remember_status(self, workflow_id, status):
+        """
+        Record in cache that a workflow reached a terminal state, so that its responses can be cached forever
+        :return: True if workflow was not known to be in a terminal state before
+        """
+        if self.cache is None or status not in self.terminal_states or self._is_terminal(workflow_id):
+            return False
+        self.cache.set(self.cache.key(self.host, 'status', workflow_id), status)
+        self._terminal.add(workflow_id)
+        return True
+
+    def wait(self, workflow_ids, **kwargs):
+        """
+        Wait until all workflows reach a terminal state
+        :param workflow_ids: one or more workflow IDs
+        :param kwargs: polling options, see watch
+        :return: dict of {workflow_id: final status}
+        """
+        if isinstance(workflow_ids, str):
+            workflow_ids = [workflow_ids]
+        states = dict()
+        for event in self.watch(workflow_ids, **kwargs):
+            states[event.id] = event.state
+        return states
+
+    def watch(self, workflow_ids, interval=5, max_interval=60, jitter=0.1, timeout=None, callback=None,
+              chunk_size=1000):
+        """
+        Poll status of many workflows with one query per interval (per chunk of workflows) and yield state transitions
+        until all workflows reach a terminal state (Succeeded, Failed or Aborted)
+        :param workflow_ids: workflow IDs
+        :param interval: initial seconds between polls, it grows while nothing changes
+        :param max_interval: maximum seconds between polls
+        :param jitter: fraction of interval randomly added or subtracted
+        :param timeout: raise TimeoutError after this many seconds
+        :param callback: function called with every Event
+        :param chunk_size: maximum number of workflows per query
+        :return: generator of wftools.watch.Event(id, previous, state)
+        """
+
+        def fetch(active):
+            active = sorted(active)
+            states = dict()
+            for i in range(0, len(active), chunk_size):
+                filters = [dict(id=workflow_id) for workflow_id in active[i:i + chunk_size]]
+                for workflow in self.query(filters):
+                    states[workflow.get('id')] = workflow.get('status')
+            for workflow_id in set(active).difference(states):
+                # raises an exception for unknown IDs
+                states[workflow_id] = self.status(workflow_id)
+            return states
+
+        return watch(fetch, workflow_ids, self.terminal_states, interval, max_interval, jitter=jitter,
+                     timeout=timeout, callback=callback)
@@ -0,0 +1,264 @@
+import hashlib
+import os
+import sqlite3
+import time
+import uuid
+from datetime import datetime, timezone
+
+from .cache import default_cache_dir
+from .profile import parse_time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# states of workflows that may still change, re-queried by every sync
+ACTIVE_STATES = ['Submitted', 'Running', 'Aborting', 'On Hold']
+
+# label set by Cromwell on every workflow, redundant with its ID
+ID_LABEL = 'cromwell-workflow-id'
+
+# seconds of submissions before the high-water mark queried again, in case of clock differences
+OVERLAP = 60
+
+
+class IndexLocked(Exception):
+    """Raised when another process is syncing the same index"""
+
+
+def default_index_path(host):
+    """
+    :param host: Cromwell server URL
+    :return: path of index of server in wftools cache directory (see wftools.cache.default_cache_dir)
+    """
+    return os.path.join(default_cache_dir(), 'index', hashlib.sha256(host.encode()).hexdigest()[:16] + '.sqlite')
+
+
+def _encode_id(workflow_id):
+    """Store UUIDs in 16 bytes instead of 36 characters"""
+    if workflow_id is None:
+        return None
+    try:
+        return uuid.UUID(workflow_id).bytes
+    except ValueError:
+        return workflow_id
+
+
+def _decode_id(value):
+    return str(uuid.UUID(bytes=value)) if isinstance(value, bytes) else value
+
+
+def _encode_time(value):
+    """Store timestamps as milliseconds since epoch, timestamps without time zone are UTC"""
+    timestamp = parse_time(value)
+    if timestamp is None:
+        return None
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return round(timestamp.timestamp() * 1000)
+
+
+def _decode_time(value):
+    if value is None:
+        return None
+    timestamp = datetime.fromtimestamp(value / 1000, timezone.utc)
+    return timestamp.isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+
+
+class WorkflowIndex:
+    """
+    SQLite index of workflows of a Cromwell server answering list queries locally.
+    Kept compact for millions of workflows: IDs are stored as 16 bytes, timestamps as integers and names, states
+    and label keys once in a table of strings.
+    Syncs fetch only workflows submitted since the last one and workflows that were not finished.
+    """
+
+    def __init__(self, path):
+        """
+        Initializes WorkflowIndex, creating the database if needed
+        :param path: SQLite database file
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        # readers are not blocked while a sync writes, and commits of pages of workflows do not wait for the disk
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        with self.connection:
+            self.connection.executescript('''
+                CREATE TABLE IF NOT EXISTS strings (id INTEGER PRIMARY KEY, value TEXT NOT NULL UNIQUE);
+                CREATE TABLE IF NOT EXISTS workflows (id BLOB PRIMARY KEY, name INTEGER, status INTEGER,
+                    submitted INTEGER, started INTEGER, ended INTEGER, parent BLOB, root BLOB) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS workflows_submitted ON workflows (submitted);
+                CREATE INDEX IF NOT EXISTS workflows_status ON workflows (status, submitted);
+                CREATE INDEX IF NOT EXISTS workflows_name ON workflows (name, submitted);
+                CREATE TABLE IF NOT EXISTS labels (workflow BLOB, key INTEGER, value TEXT,
+                    PRIMARY KEY (workflow, key)) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS labels_value ON labels (key, value);
+                CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value);
+            ''')
+        self._strings = {value: key for key, value in self.connection.execute('SELECT id, value FROM strings')}
+
+    def _string(self, value):
+        """ID of a name, state or label key, added to table of strings if new"""
+        if value is None:
+            return None
+        if value not in self._strings:
+            cursor = self.connection.execute('INSERT INTO strings (value) VALUES (?)', (value,))
+            self._strings[value] = cursor.lastrowid
+        return self._strings[value]
+
+    def _string_ids(self, values):
+        return [self._strings[value] for value in values if value in self._strings]
+
+    def add(self, workflows):
+        """
+        Add or update workflows, replacing their labels when included
+        :param workflows: iterable of workflows as returned by CromwellClient.iter_workflows
+        :return: number of workflows
+        """
+        rows, labelled, labels = [], [], []
+        for workflow in workflows:
+            workflow_id = _encode_id(workflow['id'])
+            rows.append((workflow_id, self._string(workflow.get('name')), self._string(workflow.get('status')),
+                         _encode_time(workflow.get('submission')), _encode_time(workflow.get('start')),
+                         _encode_time(workflow.get('end')), _encode_id(workflow.get('parentWorkflowId')),
+                         _encode_id(workflow.get('rootWorkflowId'))))
+            if 'labels' in workflow:
+                labelled.append((workflow_id,))
+                labels.extend((workflow_id, self._string(key), value)
+                              for key, value in (workflow['labels'] or dict()).items() if key != ID_LABEL)
+        with self.connection:
+            self.connection.executemany('INSERT OR REPLACE INTO workflows VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            self.connection.executemany('DELETE FROM labels WHERE workflow = ?', labelled)
+            self.connection.executemany('INSERT OR REPLACE INTO labels VALUES (?, ?, ?)', labels)
+        return len(rows)
+
+    def high_water(self):
+        """
+        :return: submission time of the last workflow synced in milliseconds since epoch, None if never synced
+        """
+        row = self.connection.execute("SELECT value FROM state WHERE key = 'high_water'").fetchone()
+        return row and row[0]
+
+    def active(self):
+        """
+        :return: list of IDs of workflows that were not finished when synced
+        """
+        statuses = self._string_ids(ACTIVE_STATES)
+        rows = self.connection.execute('SELECT id FROM workflows WHERE status IN ({})'.format(
+            ','.join('?' * len(statuses))), statuses)
+        return [_decode_id(workflow_id) for workflow_id, in rows]
+
+    def sync(self, client, page_size=1000, full=False, chunk_size=50):
+        """
+        Fetch workflows submitted since the last sync (all workflows the first time) and workflows that were not
+        finished. Only one process syncs an index at a time, others raise IndexLocked, so it can run from cron.
+        Changes of labels of finished workflows are not fetched, use full to fetch all workflows again.
+        :param client: CromwellClient
+        :param page_size: number of workflows requested at a time
+        :param full: fetch all workflows
+        :param chunk_size: number of workflow IDs per query of unfinished workflows
+        :return: number of workflows fetched
+        """
+        with open(self.path + '.lock', 'w') as lock:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    raise IndexLocked('Index {} is being synced by another process'.format(self.path))
+            high_water = None if full else self.high_water()
+            active = set(self.active())
+            submission = None
+            if high_water is not None:
+                submission = _decode_time(high_water - OVERLAP * 1000)
+
+            count = 0
+            pages = client.iter_workflows(submission=submission, page_size=page_size, additional_fields=['labels'])
+            page = []
+            for workflow in pages:
+                active.discard(workflow['id'])
+                page.append(workflow)
+                if len(page) == page_size:
+                    count += self.add(page)
+                    page = []
+            count += self.add(page)
+
+            active = sorted(active)
+            for i in range(0, len(active), chunk_size):
+                count += self.add(client.iter_workflows(active[i:i + chunk_size], page_size=page_size,
+                                                        additional_fields=['labels']))
+
+            with self.connection:
+                self.connection.execute("INSERT OR REPLACE INTO state VALUES ('high_water', "
+                                        "(SELECT MAX(submitted) FROM workflows))")
+                self.connection.execute("INSERT OR REPLACE INTO state VALUES ('synced', ?)", (time.time(),))
+        return count
+
+    def query(self, workflow_ids=None, names=None, status=None, submission=None, start=None, end=None, labels=None,
+              include_subworkflows=None, limit=None):
+        """
+        Get workflows matching some criteria from the index, most recently submitted first.
+        Filters are those of CromwellClient.list.
+        :param workflow_ids: Returns only workflows with the specified workflow IDs
+        :param names: Returns only workflows with the specified name
+        :param status: Returns only workflows with the specified status
+        :param submission: Returns only workflows submitted on or after this date-time
+        :param start: Returns only workflows started on or after this date-time
+        :param end: Returns only workflows ended on or before this date-time
+        :param labels: Returns only workflows with all labels, dict or list of 'key:value' strings
+        :param include_subworkflows: Include subworkflows in results (default is True)
+        :param limit: Maximum number of workflows
+        :return: generator of workflows with the fields of Cromwell query results
+        """
+        conditions, parameters = [], []
+
+        def add(condition, values):
+            conditions.append(condition.format(','.join('?' * len(values))))
+            parameters.extend(values)
+
+        if workflow_ids:
+            add('w.id IN ({})', [_encode_id(i) for i in workflow_ids])
+        if names:
+            add('w.name IN ({})', self._string_ids(names))
+        if status:
+            add('w.status IN ({})', self._string_ids([status] if isinstance(status, str) else status))
+        for column, operator, value in [('submitted', '>=', submission), ('started', '>=', start),
+                                        ('ended', '<=', end)]:
+            if value:
+                add('w.{} {} ?'.format(column, operator), [_encode_time(value)])
+        if isinstance(labels, dict):
+            labels = ['{}:{}'.format(key, value) for key, value in labels.items()]
+        for label in labels or []:
+            key, _, value = label.partition(':')
+            add('w.id IN (SELECT workflow FROM labels WHERE key = ? AND value = ?)',
+                [self._strings.get(key), value])
+        if include_subworkflows is False:
+            conditions.append('w.parent IS NULL')
+
+        sql = ('SELECT w.id, n.value, s.value, w.submitted, w.started, w.ended, w.parent, w.root FROM workflows w '
+               'LEFT JOIN strings n ON n.id = w.name LEFT JOIN strings s ON s.id = w.status')
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY w.submitted DESC'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            parameters.append(limit)
+        for row in self.connection.execute(sql, parameters):
+            workflow = dict(id=_decode_id(row[0]), name=row[1], status=row[2], submission=_decode_time(row[3]),
+                            start=_decode_time(row[4]), end=_decode_time(row[5]))
+            if row[6] is not None:
+                workflow.update(parentWorkflowId=_decode_id(row[6]), rootWorkflowId=_decode_id(row[7]))
+            yield workflow
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,262 @@
+import codecs
+import json
+import re
+from collections import namedtuple
+
+CallRecord = namedtuple('CallRecord', ['workflow_id', 'name', 'shard', 'attempt', 'status', 'backend', 'start', 'end',
+                                       'cache_hit', 'return_code', 'subworkflow_id'])
+CallRecord.__doc__ = 'Compact summary of one attempt of one shard of a call in workflow metadata'
+
+# metadata keys needed to build CallRecord objects, used as includeKey projection
+CALL_KEYS = ['executionStatus', 'backend', 'start', 'end', 'callCaching', 'returnCode', 'attempt', 'shardIndex',
+             'subWorkflowId', 'subWorkflowMetadata']
+
+_STRUCTURE = re.compile(r'["{}\[\]]')
+_STRING = re.compile(r'["\\]')
+_NON_SPACE = re.compile(r'\S')
+_SCALAR_END = re.compile(r'[\s,}\]]')
+
+
+class _Reader:
+    """
+    Incremental JSON reader over chunks of bytes.
+    It walks objects and arrays key by key, decoding only the values requested and skipping others
+    without building Python objects, so memory is bounded by the largest value decoded.
+    """
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.pos = 0
+
+    def _fill(self, keep_from):
+        """
+        Append next chunks to buffer discarding text before keep_from.
+        Reads at least as much text as is kept so that growing a large value is linear.
+        :return: number of characters discarded
+        """
+        needed = max(len(self.buffer) - keep_from, 1)
+        parts = []
+        size = 0
+        for chunk in self.chunks:
+            text = self.decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+            parts.append(text)
+            size += len(text)
+            if size >= needed:
+                break
+        if not size:
+            raise ValueError('Unexpected end of JSON document')
+        self.buffer = self.buffer[keep_from:] + ''.join(parts)
+        self.pos -= keep_from
+        return keep_from
+
+    def peek(self):
+        """
+        Skip whitespace
+        :return: next character
+        """
+        while True:
+            match = _NON_SPACE.search(self.buffer, self.pos)
+            if match is not None:
+                self.pos = match.start()
+                return match.group()
+            self.pos = len(self.buffer)
+            self._fill(self.pos)
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError('Expected {!r} at {!r}'.format(char, self.buffer[self.pos:self.pos + 20]))
+        self.pos += 1
+
+    def _scan(self, keep):
+        """Find the end of the value at current position, return its text if keep is True"""
+        start = self.pos
+        char = self.buffer[start]
+        if char not in '{["':
+            while True:
+                match = _SCALAR_END.search(self.buffer, start)
+                if match is not None:
+                    self.pos = match.start()
+                    return self.buffer[start:self.pos]
+                try:
+                    start -= self._fill(start)
+                except ValueError:
+                    # scalar at end of document
+                    self.pos = len(self.buffer)
+                    return self.buffer[start:]
+
+        i = start + 1
+        depth = 0 if char == '"' else 1
+        in_string = char == '"'
+        while True:
+            match = (_STRING if in_string else _STRUCTURE).search(self.buffer, i)
+            if match is None:
+                scanned = len(self.buffer)
+                shift = self._fill(start if keep else scanned)
+                start -= shift
+                i = scanned - shift
+                continue
+            char = match.group()
+            i = match.end()
+            if in_string:
+                if char == '\\':
+                    while i >= len(self.buffer):
+                        shift = self._fill(start if keep else i)
+                        start -= shift
+                        i -= shift
+                    i += 1
+                    continue
+                in_string = False
+                if depth == 0:
+                    break
+            elif char == '"':
+                in_string = True
+            elif char in '{[':
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    break
+        self.pos = i
+        return self.buffer[start:i] if keep else None
+
+    def read_value(self, keep=True):
+        """
+        Read the value at current position
+        :param keep: decode and return value, otherwise skip it
+        :return: decoded value or None
+        """
+        self.peek()
+        text = self._scan(keep)
+        return json.loads(text) if keep else None
+
+    def iter_object(self):
+        """
+        Iterate over keys of the object at current position.
+        Consumer must read or skip the value of each key before asking for the next one.
+        :return: generator of keys
+        """
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.read_value()
+            self.expect(':')
+            yield key
+            char = self.peek()
+            self.pos += 1
+            if char == '}':
+                return
+            if char != ',':
+                raise ValueError('Expected , or } in object')
+
+    def iter_array(self):
+        """
+        Iterate over items of the array at current position.
+        Consumer must read or skip each item before asking for the next one.
+        :return: generator of item indexes
+        """
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        index = 0
+        while True:
+            yield index
+            index += 1
+            char = self.peek()
+            self.pos += 1
+            if char == ']':
+                return
+            if char != ',':
+                raise ValueError('Expected , or ] in array')
+
+
+def iter_shards(chunks, workflow_id=None):
+    """
+    Stream shards of calls from a workflow metadata JSON document without loading it whole.
+    Only one shard of a call (including its expanded subworkflow metadata) is decoded at a time.
+    Shards of expanded subworkflows are yielded before the shard of the call that ran the subworkflow.
+    :param chunks: iterable of bytes or str, e.g. response content chunks or a file opened in binary mode
+    :param workflow_id: ID of workflow to set in shards of its calls
+    :return: generator of (workflow_id, call_name, shard) tuples, where shard is a dict of call metadata
+    """
+    reader = _Reader(chunks)
+    for key in reader.iter_object():
+        if key != 'calls':
+            reader.read_value(keep=False)
+            continue
+        for name in reader.iter_object():
+            for _ in reader.iter_array():
+                yield from _with_subworkflows(workflow_id, name, reader.read_value())
+
+
+def iter_calls(chunks, workflow_id=None):
+    """
+    Stream CallRecord objects from a workflow metadata JSON document without loading it whole, see iter_shards
+    :param chunks: iterable of bytes or str, e.g. response content chunks or a file opened in binary mode
+    :param workflow_id: ID of workflow to set in records of its calls
+    :return: generator of CallRecord
+    """
+    return (call_record(*shard) for shard in iter_shards(chunks, workflow_id))
+
+
+def shards_from_metadata(metadata):
+    """
+    Iterate over shards of calls of decoded workflow metadata, see iter_shards
+    :param metadata: dict of workflow metadata
+    :return: generator of (workflow_id, call_name, shard) tuples
+    """
+    for name, shards in (metadata.get('calls') or dict()).items():
+        for shard in shards:
+            yield from _with_subworkflows(metadata.get('id'), name, shard)
+
+
+def calls_from_metadata(metadata):
+    """
+    Build CallRecord objects from decoded workflow metadata
+    :param metadata: dict of workflow metadata
+    :return: generator of CallRecord
+    """
+    return (call_record(*shard) for shard in shards_from_metadata(metadata))
+
+
+def call_record(workflow_id, name, shard):
+    """
+    Build CallRecord from call metadata
+    :param workflow_id: ID of workflow that ran the call
+    :param name: fully qualified call name
+    :param shard: dict of metadata of one shard and attempt of the call
+    :return: CallRecord
+    """
+    subworkflow = shard.get('subWorkflowMetadata') or dict()
+    cache_hit = (shard.get('callCaching') or dict()).get('hit')
+    return CallRecord(workflow_id, name, shard.get('shardIndex'), shard.get('attempt'), shard.get('executionStatus'),
+                      shard.get('backend'), shard.get('start'), shard.get('end'), cache_hit, shard.get('returnCode'),
+                      shard.get('subWorkflowId') or subworkflow.get('id'))
+
+
+def flatten(data, prefix=''):
+    """
+    Flatten nested dicts to a single dict with keys joined by dots, e.g. {'a': {'b': 1}} to {'a.b': 1}.
+    Lists are kept as values.
+    :param data: dict
+    :param prefix: prefix of keys
+    :return: dict
+    """
+    flat = dict()
+    for key, value in data.items():
+        if isinstance(value, dict) and value:
+            flat.update(flatten(value, prefix + key + '.'))
+        else:
+            flat[prefix + key] = value
+    return flat
+
+
+def _with_subworkflows(workflow_id, name, shard):
+    subworkflow = shard.get('subWorkflowMetadata')
+    if subworkflow:
+        yield from shards_from_metadata(subworkflow)
+    yield workflow_id, name, shard
@@ -0,0 +1,96 @@
+import os
+import uuid
+
+CHUNK_SIZE = 1024 ** 2
+
+
+class MultipartEncoder:
+    """
+    File-like multipart/form-data body that streams file parts from disk or memory.
+    Its length is known in advance, so requests sends it with Content-Length reading one block at a time,
+    and only one file is open at a time; files are closed as soon as they are read.
+    Content in memory, e.g. a memory-mapped wftools.payload.Payload, is sent by slices without being copied.
+    """
+
+    def __init__(self, fields, boundary=None):
+        """
+        Initializes MultipartEncoder
+        :param fields: list of (name, value) tuples, value is str or bytes for regular fields
+            and (filename, path) or (filename, bytes or memoryview of content) tuple for file parts
+        :param boundary: multipart boundary (random by default)
+        """
+        self.boundary = boundary or uuid.uuid4().hex
+        self.parts = []
+        for name, value in fields:
+            if isinstance(value, tuple):
+                filename, content = value
+                header = self._header(name, filename)
+                size = os.path.getsize(content) if isinstance(content, str) else len(content)
+                self.parts.append((header, content, size))
+            else:
+                data = value.encode() if isinstance(value, str) else value
+                self.parts.append((self._header(name) + data, None, 0))
+        # parts are separated by line breaks, the closing boundary follows the last part (if any) on a new line
+        self.trailer = '{}--{}--\r\n'.format('\r\n' if self.parts else '', self.boundary).encode()
+        self.length = (sum(len(header) + size for header, _, size in self.parts) + 2 * max(len(self.parts) - 1, 0) +
+                       len(self.trailer))
+        self._iterator = self._chunks()
+        self._chunk = b''
+        self._position = 0
+
+    @property
+    def content_type(self):
+        return 'multipart/form-data; boundary={}'.format(self.boundary)
+
+    def _header(self, name, filename=None):
+        disposition = 'form-data; name="{}"'.format(name)
+        if filename is not None:
+            disposition += '; filename="{}"'.format(filename.replace('"', '%22'))
+        lines = ['--' + self.boundary, 'Content-Disposition: ' + disposition]
+        if filename is not None:
+            lines.append('Content-Type: application/octet-stream')
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode()
+
+    def _chunks(self):
+        for i, (header, content, size) in enumerate(self.parts):
+            yield (b'\r\n' if i else b'') + header
+            if isinstance(content, str):
+                with open(content, 'rb') as file:
+                    for chunk in iter(lambda: file.read(CHUNK_SIZE), b''):
+                        yield chunk
+            elif content is not None:
+                view = memoryview(content)
+                for start in range(0, size, CHUNK_SIZE):
+                    yield view[start:start + CHUNK_SIZE]
+        yield self.trailer
+
+    def read(self, size=-1):
+        """
+        Read next bytes of body
+        :param size: maximum number of bytes, all remaining bytes if negative
+        :return: bytes, empty at the end of body
+        """
+        parts = []
+        remaining = size
+        while remaining != 0:
+            if self._position >= len(self._chunk):
+                self._chunk = next(self._iterator, None)
+                self._position = 0
+                if self._chunk is None:
+                    self._chunk = b''
+                    break
+            end = len(self._chunk) if remaining < 0 else min(len(self._chunk), self._position + remaining)
+            parts.append(self._chunk[self._position:end])
+            if remaining > 0:
+                remaining -= end - self._position
+            self._position = end
+        return b''.join(parts)
+
+    def close(self):
+        """
+        Stop streaming, closing the file being read if any
+        """
+        self._iterator.close()
+
+    def __len__(self):
+        return self.length
@@ -0,0 +1,82 @@
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from queue import Queue
+from threading import BoundedSemaphore, Thread
+
+
+def imap_unordered(func, items, workers=10):
+    """
+    Call a function for every item using a pool of threads.
+    Items are consumed lazily so that long iterators (e.g. stdin) do not have to fit in memory.
+    :param func: function that receives one item
+    :param items: iterable of items
+    :param workers: number of threads
+    :return: generator of (item, result, error) tuples in order of completion; error is None on success
+    """
+    items = iter(items)
+    pending = dict()
+
+    def schedule(executor):
+        for item in items:
+            pending[executor.submit(func, item)] = item
+            return
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        try:
+            for _ in range(workers * 2):
+                schedule(executor)
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    item = pending.pop(future)
+                    schedule(executor)
+                    if future.exception() is None:
+                        yield item, future.result(), None
+                    else:
+                        yield item, None, future.exception()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def imap_streaming(func, items, workers=10):
+    """
+    Call a function for every item using a pool of threads, reading items in a background thread.
+    Unlike imap_unordered, results are yielded while the next items are still being waited for,
+    so a slow or interactive source (e.g. a coprocess writing to stdin) gets each result as soon as it is ready.
+    With one worker, results are yielded in order of items.
+    :param func: function that receives one item
+    :param items: iterable of items
+    :param workers: number of threads and maximum number of items in progress
+    :return: generator of (item, result, error) tuples in order of completion; error is None on success
+    """
+    done = Queue()
+    slots = BoundedSemaphore(workers)
+
+    def finished(item):
+        def callback(future):
+            slots.release()
+            done.put((item, future))
+        return callback
+
+    def read():
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for item in items:
+                    slots.acquire()
+                    executor.submit(func, item).add_done_callback(finished(item))
+        except Exception as e:
+            done.put((None, e))
+        done.put(None)
+
+    Thread(target=read, daemon=True).start()
+    while True:
+        entry = done.get()
+        if entry is None:
+            return
+        item, future = entry
+        if isinstance(future, Exception):
+            raise future
+        if future.exception() is None:
+            yield item, future.result(), None
+        else:
+            yield item, None, future.exception()
@@ -0,0 +1,173 @@
+import hashlib
+import io
+import mmap
+import os
+import threading
+import zipfile
+
+MMAP_THRESHOLD = 8 * 1024 ** 2
+
+# fixed timestamp of ZIP entries so that archives of the same files are identical
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+
+class Payload:
+    """
+    Content of a file read once and hashed, reused by every request that uploads it.
+    Files larger than mmap_threshold are memory-mapped instead of copied to memory.
+    """
+
+    def __init__(self, name, data, digest, mapped=None):
+        """
+        Initializes Payload, see Payload.read
+        :param name: file name sent in multipart requests
+        :param data: bytes or memoryview of content
+        :param digest: SHA-256 of content
+        :param mapped: mmap object to close with the payload
+        """
+        self.name = name
+        self.data = data
+        self.digest = digest
+        self._mapped = mapped
+
+    @classmethod
+    def read(cls, path, mmap_threshold=MMAP_THRESHOLD):
+        """
+        Read and hash a file. The file handle is closed before returning.
+        :param path: file path
+        :param mmap_threshold: minimum size in bytes of files that are memory-mapped
+        :return: Payload
+        """
+        with open(path, 'rb') as file:
+            size = os.fstat(file.fileno()).st_size
+            if size >= mmap_threshold:
+                # the mapping stays valid after the file is closed
+                mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+                data = memoryview(mapped)
+                return cls(os.path.basename(path), data, hashlib.sha256(data).hexdigest(), mapped)
+            data = file.read()
+        return cls(os.path.basename(path), data, hashlib.sha256(data).hexdigest())
+
+    @property
+    def part(self):
+        """
+        :return: (file name, content) tuple for multipart requests
+        """
+        return self.name, self.data
+
+    def close(self):
+        """
+        Release memory mapping, if any
+        """
+        if self._mapped is not None:
+            self.data.release()
+            self._mapped.close()
+            self._mapped = None
+
+    def __len__(self):
+        return len(self.data)
+
+
+def _directory_files(directory):
+    """List files of directory recursively as sorted (relative path, path) tuples, skipping hidden files"""
+    files = []
+    for root, dirs, names in os.walk(directory):
+        dirs[:] = [d for d in dirs if not d.startswith('.')]
+        for name in names:
+            if not name.startswith('.'):
+                path = os.path.join(root, name)
+                files.append((os.path.relpath(path, directory).replace(os.sep, '/'), path))
+    return sorted(files)
+
+
+def zip_directory(directory):
+    """
+    Build a ZIP archive of the files of a directory in memory, e.g. workflow imports.
+    Entries are sorted and timestamped alike, so the same files always give the same archive.
+    :param directory: directory path
+    :return: Payload named after the directory
+    """
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, path in _directory_files(directory):
+            with open(path, 'rb') as file:
+                archive.writestr(zipfile.ZipInfo(name, ZIP_DATE_TIME), file.read(), zipfile.ZIP_DEFLATED)
+    data = buffer.getvalue()
+    name = os.path.basename(os.path.normpath(directory)) + '.zip'
+    return Payload(name, data, hashlib.sha256(data).hexdigest())
+
+
+class SubmissionContext:
+    """
+    Cache of payloads of workflow sources, inputs, options, labels and dependencies shared by submissions.
+    Files are read once and read again only when their size or modification time change;
+    dependencies directories are zipped once per content. Payloads are released by close.
+    """
+
+    def __init__(self, mmap_threshold=MMAP_THRESHOLD):
+        """
+        Initializes SubmissionContext
+        :param mmap_threshold: minimum size in bytes of files that are memory-mapped
+        """
+        self.mmap_threshold = mmap_threshold
+        self._files = dict()
+        self._zips = dict()
+        self.lock = threading.Lock()
+
+    def file(self, path):
+        """
+        Get payload of a file
+        :param path: file path
+        :return: Payload
+        """
+        stat = os.stat(path)
+        key = os.path.abspath(path)
+        version = (stat.st_size, stat.st_mtime_ns)
+        with self.lock:
+            cached = self._files.get(key)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+            payload = Payload.read(path, self.mmap_threshold)
+            self._files[key] = (version, payload)
+        # a payload that may still be in use by another thread is left to the garbage collector
+        return payload
+
+    def dependencies(self, path):
+        """
+        Get payload of dependencies, a ZIP file or a directory of imports zipped on the fly
+        :param path: ZIP file or directory path
+        :return: Payload
+        """
+        if not os.path.isdir(path):
+            return self.file(path)
+        files = _directory_files(path)
+        version = tuple((name, os.stat(file).st_size, os.stat(file).st_mtime_ns) for name, file in files)
+        key = os.path.abspath(path)
+        with self.lock:
+            cached = self._zips.get(key)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+            payload = zip_directory(path)
+            # archives of identical content are shared
+            for _, other in self._zips.values():
+                if other.digest == payload.digest:
+                    payload = other
+                    break
+            self._zips[key] = (version, payload)
+        return payload
+
+    def close(self):
+        """
+        Release all payloads
+        """
+        with self.lock:
+            for _, payload in list(self._files.values()) + list(self._zips.values()):
+                payload.close()
+            self._files.clear()
+            self._zips.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
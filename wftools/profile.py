@@ -0,0 +1,158 @@
+import json
+from collections import OrderedDict, namedtuple
+from datetime import datetime
+from statistics import median
+
+from .constants import SORT_KEYS
+from .metadata import CALL_KEYS
+
+# metadata keys needed to profile calls, used as includeKey projection
+PROFILE_KEYS = CALL_KEYS + ['executionEvents', 'failures']
+
+ShardProfile = namedtuple('ShardProfile', ['workflow_id', 'name', 'shard', 'attempt', 'status', 'cache_hit',
+                                           'preempted', 'start', 'end', 'duration', 'queue', 'run'])
+ShardProfile.__doc__ = 'Timing of one attempt of one shard of a call, durations in seconds'
+
+CallProfile = namedtuple('CallProfile', ['name', 'shards', 'attempts', 'retries', 'preemptions', 'failures',
+                                         'cache_hits', 'start', 'end', 'wall', 'queue', 'run', 'max_run',
+                                         'cache_savings', 'critical'])
+CallProfile.__doc__ = 'Timing of all shards and attempts of a call, durations in seconds'
+
+
+def parse_time(value):
+    """
+    Parse a timestamp of Cromwell metadata, e.g. 2020-01-01T00:00:00.000Z
+    :param value: ISO 8601 string or None
+    :return: datetime or None
+    """
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def _seconds(start, end):
+    start, end = parse_time(start), parse_time(end)
+    if start is None or end is None:
+        return None
+    return round((end - start).total_seconds(), 3)
+
+
+def shard_profile(workflow_id, name, shard):
+    """
+    Time one attempt of one shard of a call.
+    Queue time goes from the start of the call to the start of the RunningJob execution event,
+    run time is the duration of the RunningJob event. Both are None when the job did not run, e.g. cache hits.
+    :param workflow_id: ID of workflow that ran the call
+    :param name: fully qualified call name
+    :param shard: dict of call metadata including PROFILE_KEYS
+    :return: ShardProfile
+    """
+    running = [e for e in shard.get('executionEvents') or [] if e.get('description') == 'RunningJob']
+    queue = run = None
+    if running:
+        queue = _seconds(shard.get('start'), running[0].get('startTime'))
+        run = _seconds(running[0].get('startTime'), running[-1].get('endTime'))
+    status = shard.get('executionStatus')
+    preempted = status == 'Preempted' or (status == 'RetryableFailure' and
+                                          'preempt' in json.dumps(shard.get('failures') or []).lower())
+    return ShardProfile(workflow_id, name, shard.get('shardIndex'), shard.get('attempt'), status,
+                        (shard.get('callCaching') or dict()).get('hit'), preempted, shard.get('start'),
+                        shard.get('end'), _seconds(shard.get('start'), shard.get('end')), queue, run)
+
+
+def profile_shards(shards):
+    """
+    Time shards of calls, skipping calls of subworkflows whose metadata was expanded (their calls are timed instead)
+    :param shards: iterable of (workflow_id, call_name, shard) tuples, see wftools.metadata.iter_shards
+    :return: generator of ShardProfile
+    """
+    for workflow_id, name, shard in shards:
+        if not shard.get('subWorkflowMetadata'):
+            yield shard_profile(workflow_id, name, shard)
+
+
+def profile_calls(shard_profiles):
+    """
+    Aggregate timing of shards by fully qualified call name.
+    Cache savings are estimated as the median run time of shards of the same call that did run, times cache hits.
+    :param shard_profiles: iterable of ShardProfile
+    :return: list of CallProfile in order of first appearance
+    """
+    groups = OrderedDict()
+    for shard in shard_profiles:
+        groups.setdefault(shard.name, []).append(shard)
+
+    calls = []
+    for name, shards in groups.items():
+        starts = [s.start for s in shards if s.start]
+        ends = [s.end for s in shards if s.end]
+        start = min(starts, key=parse_time) if starts else None
+        end = max(ends, key=parse_time) if ends and len(ends) == len(shards) else None
+        runs = [s.run for s in shards if s.run is not None]
+        queues = [s.queue for s in shards if s.queue is not None]
+        cache_hits = sum(1 for s in shards if s.cache_hit)
+        ran = [s.run for s in shards if s.run is not None and not s.cache_hit]
+        distinct = len({(s.workflow_id, s.shard) for s in shards})
+        last = dict()
+        for shard in shards:
+            key = (shard.workflow_id, shard.shard)
+            if key not in last or (shard.attempt or 0) >= (last[key].attempt or 0):
+                last[key] = shard
+        calls.append(CallProfile(name, distinct, len(shards), len(shards) - distinct,
+                                 sum(1 for s in shards if s.preempted),
+                                 sum(1 for s in last.values() if s.status == 'Failed'), cache_hits, start, end,
+                                 _seconds(start, end), round(sum(queues), 3) if queues else None,
+                                 round(sum(runs), 3) if runs else None, max(runs) if runs else None,
+                                 round(median(ran) * cache_hits, 3) if ran and cache_hits else None, False))
+    return calls
+
+
+def critical_path(calls, tolerance=1.0):
+    """
+    Estimate the critical path from the timeline of calls, as metadata does not record the call graph.
+    Starting from the call that ended last, the predecessor of each call is taken to be the call that ended last
+    before it started (within tolerance seconds), i.e. the dependency that most likely held it back.
+    :param calls: iterable of CallProfile
+    :param tolerance: seconds a call may end after the start of its successor
+    :return: list of call names from first to last
+    """
+    timed = [(parse_time(c.start), parse_time(c.end), c.name) for c in calls if c.start and c.end]
+    if not timed:
+        return []
+    current = max(timed, key=lambda c: c[1])
+    path = [current[2]]
+    while True:
+        candidates = [c for c in timed if c[2] not in path and (c[1] - current[0]).total_seconds() <= tolerance
+                      and c[0] <= current[0]]
+        if not candidates:
+            break
+        current = max(candidates, key=lambda c: c[1])
+        path.append(current[2])
+    return path[::-1]
+
+
+def summarize(shards, workflow_id=None, sort='wall'):
+    """
+    Profile a workflow from shards of its calls
+    :param shards: iterable of (workflow_id, call_name, shard) tuples, see wftools.metadata.iter_shards
+    :param workflow_id: Workflow ID reported in summary
+    :param sort: field of CallProfile by which calls are ranked (descending), one of SORT_KEYS
+    :return: dict with workflow totals, critical path and list of CallProfile
+    """
+    if sort not in SORT_KEYS:
+        raise ValueError('Unknown sort key {}'.format(sort))
+    calls = profile_calls(profile_shards(shards))
+    path = critical_path(calls)
+    calls = [c._replace(critical=c.name in path) for c in calls]
+    calls.sort(key=lambda c: getattr(c, sort) or 0, reverse=True)
+
+    starts = [c.start for c in calls if c.start]
+    ends = [c.end for c in calls if c.end]
+    start = min(starts, key=parse_time) if starts else None
+    end = max(ends, key=parse_time) if ends else None
+    return dict(workflow_id=workflow_id, start=start, end=end, wall=_seconds(start, end),
+                queue=round(sum(c.queue or 0 for c in calls), 3), run=round(sum(c.run or 0 for c in calls), 3),
+                cache_hits=sum(c.cache_hits for c in calls),
+                cache_savings=round(sum(c.cache_savings or 0 for c in calls), 3),
+                retries=sum(c.retries for c in calls), preemptions=sum(c.preemptions for c in calls),
+                critical_path=path, calls=calls)
@@ -1,23 +1,160 @@
 from csv import DictWriter
-from json import dump
+from itertools import chain, islice
+from json import dump, dumps
 import sys
 
+import click
 
-def write_as_csv(data, file=sys.stdout):
-    """Write a dict or list of dictionaries as CSV to stdout (default)"""
-    is_list = isinstance(data, list)
-    writer = DictWriter(file, frozenset().union(*data) if is_list else data.keys())
+OUTPUT_FORMATS = ['csv', 'json', 'ndjson']
+
+
+def write_as_csv(data, file=None, fieldnames=None, sample_size=100):
+    """
+    Write a dict or an iterable of dictionaries as CSV to stdout (default) as soon as rows are generated
+    :param data: dict or iterable of dict objects (list, generator)
+    :param file: destination file (stdout by default)
+    :param fieldnames: columns of CSV, other keys are ignored.
+        By default, columns are the keys of the first `sample_size` rows in order of appearance.
+    :param sample_size: number of rows inspected to find columns when fieldnames is not given
+    """
+    file = file or sys.stdout
+    rows = iter([data] if isinstance(data, dict) else data)
+    if fieldnames is None:
+        sample = list(islice(rows, sample_size))
+        fieldnames = list(dict.fromkeys(chain.from_iterable(sample)))
+        rows = chain(sample, rows)
+    writer = DictWriter(file, fieldnames, extrasaction='ignore')
     writer.writeheader()
-    if is_list:
-        writer.writerows(data)
-    else:
-        writer.writerow(data)
+    for row in rows:
+        writer.writerow(row)
+        file.flush()
 
 
-def write_as_json(data, destination=sys.stdout):
+def write_as_json(data, destination=None):
     """
     Writes data as JSON format to file
     :param data: object to be serialized as JSON
     :param destination: destination file (stdout by default)
     """
-    dump(data, destination)
+    dump(data, destination or sys.stdout)
+
+
+def write_rows_as_json(rows, destination=None):
+    """
+    Write objects as a JSON array one item at a time
+    :param rows: iterable of objects to be serialized as JSON
+    :param destination: destination file (stdout by default)
+    """
+    destination = destination or sys.stdout
+    destination.write('[')
+    for i, row in enumerate(rows):
+        destination.write(',' if i else '')
+        dump(row, destination)
+        destination.flush()
+    destination.write(']\n')
+
+
+def write_as_ndjson(rows, destination=None):
+    """
+    Write objects as newline-delimited JSON, one object per line
+    :param rows: iterable of objects to be serialized as JSON
+    :param destination: destination file (stdout by default)
+    """
+    destination = destination or sys.stdout
+    for row in rows:
+        destination.write(dumps(row) + '\n')
+        destination.flush()
+
+
+def write_rows(rows, output_format, fieldnames=None, file=None):
+    """
+    Write rows in one of OUTPUT_FORMATS as soon as they are generated
+    :param rows: iterable of dict objects
+    :param output_format: csv, json (array) or ndjson (one object per line)
+    :param fieldnames: columns of CSV output, see write_as_csv
+    :param file: destination file (stdout by default)
+    """
+    if output_format == 'csv':
+        write_as_csv(rows, file, fieldnames)
+    elif output_format == 'ndjson':
+        write_as_ndjson(rows, file)
+    else:
+        write_rows_as_json(rows, file)
+
+
+def call_client_method(method, *args):
+    """
+    Given a API client method and its arguments try to call or exit program
+    :param method: API client method
+    :param args: Arguments for method
+    :return: object from method call
+    """
+    try:
+        return method(*args)
+    except Exception as e:
+        click.echo(str(e), err=True)
+        exit(1)
+
+
+def read_ids(ids, ids_file):
+    """
+    Iterate over IDs given as arguments and/or read from a file, one per line.
+    "-" as argument reads IDs from stdin, as does omitting both arguments and file.
+    :param ids: IDs given as command arguments
+    :param ids_file: opened file containing IDs
+    :return: generator of IDs
+    """
+    if not ids and ids_file is None:
+        if sys.stdin.isatty():
+            raise click.UsageError('Missing IDs: give them as arguments, --file or stdin.')
+        ids = ['-']
+    sources = [sys.stdin if i == '-' else [i] for i in ids]
+    if ids_file is not None:
+        sources.append(ids_file)
+    for line in chain.from_iterable(sources):
+        line = line.strip()
+        if line:
+            yield line
+
+
+def call_client_method_bulk(method, ids, workers, output_format, field='status'):
+    """
+    Call an API client method for many IDs concurrently and print one result per ID as soon as it is available.
+    Exit with status 1 if any call failed.
+    :param method: API client method that receives one ID
+    :param ids: iterable of IDs
+    :param workers: number of simultaneous calls
+    :param output_format: console, csv, json or ndjson
+    :param field: name of the result field
+    """
+    ids = iter(ids)
+    head = list(islice(ids, 2))
+    if not head:
+        return
+    if len(head) == 1 and output_format == 'console':
+        click.echo(call_client_method(method, head[0]))
+        return
+
+    # imported here to keep startup of commands that do not need a thread pool fast
+    from ..parallel import imap_unordered
+    failed = []
+
+    def results():
+        for item, result, error in imap_unordered(method, chain(head, ids), workers):
+            if error is not None:
+                failed.append(item)
+            yield item, result, error
+
+    if output_format == 'console':
+        for item, result, error in results():
+            if error is None:
+                click.echo('{:36}  {}'.format(item, result))
+            else:
+                click.echo('{}: {}'.format(item, error), err=True)
+    else:
+        rows = ({'id': item, field: result, 'error': None if error is None else str(error)}
+                for item, result, error in results())
+        write_rows(rows, output_format, ['id', field, 'error'])
+
+    if failed:
+        exit(1)
@@ -0,0 +1,166 @@
+import json
+import shlex
+import sys
+import threading
+
+import click
+
+from . import write_as_ndjson
+from ..parallel import imap_streaming
+
+# client methods that can be called in batch mode, by service
+OPERATIONS = {
+    'cromwell': ['abort', 'count', 'describe', 'health_status', 'info', 'labels', 'logs', 'metadata', 'outputs',
+                 'profile', 'query', 'release', 'status', 'submit', 'submit_batch', 'timing', 'update_labels',
+                 'version'],
+    'tes': ['abort', 'create_task', 'info', 'list', 'status'],
+    'wes': ['abort', 'info', 'list', 'logs', 'status', 'submit'],
+}
+
+# keys of a request that are not passed to the client method
+REQUEST_KEYS = ('service', 'op', 'id', 'args', 'ref')
+
+
+def parse_request(line, service):
+    """
+    Parse a line of batch input.
+    A JSON object holds the operation (op), optionally the service, the ID and positional args, other keys are
+    keyword arguments of the client method, e.g. {"op": "metadata", "id": "...", "include_key": ["status"]}.
+    A ref key is not passed to the method, it is written back with the result to match results to requests.
+    Any other line is a command with shell quoting: [service] op [args...], e.g. "status 1234" or "tes status abc".
+    :param line: line of input
+    :param service: service of requests that do not name one
+    :return: dict of request with at least service and op
+    """
+    line = line.strip()
+    if line.startswith('{'):
+        request = json.loads(line)
+        if not isinstance(request.get('op'), str):
+            raise ValueError('Missing op')
+        request.setdefault('service', service)
+        if not isinstance(request['service'], str):
+            raise ValueError('Invalid service {}'.format(json.dumps(request['service'])))
+    else:
+        words = shlex.split(line)
+        if words and words[0] in OPERATIONS:
+            service = words.pop(0)
+        if not words:
+            raise ValueError('Missing op')
+        request = dict(service=service, op=words[0], args=words[1:])
+    if request['service'] not in OPERATIONS:
+        raise ValueError('Unknown service {}'.format(request['service']))
+    if request['op'] not in OPERATIONS[request['service']]:
+        raise ValueError('Unknown {} operation {}'.format(request['service'], request['op']))
+    return request
+
+
+def _jsonable(value):
+    """Convert records (namedtuples) in results to dicts so that they are written as JSON objects"""
+    if hasattr(value, '_asdict'):
+        return {key: _jsonable(item) for key, item in value._asdict().items()}
+    if isinstance(value, dict):
+        return {key: _jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    return value
+
+
+class Clients:
+    """
+    Clients of services created on first use and shared by all requests, so that connections are reused
+    """
+
+    def __init__(self, hosts, pool_size):
+        """
+        Initializes Clients
+        :param hosts: dict of service name to server URL
+        :param pool_size: number of connections kept open per service
+        """
+        self.hosts = hosts
+        self.pool_size = pool_size
+        self.clients = dict()
+        self.lock = threading.Lock()
+
+    def get(self, service):
+        """
+        :param service: cromwell, tes or wes
+        :return: client of service
+        """
+        with self.lock:
+            if service not in self.clients:
+                if not self.hosts.get(service):
+                    raise Exception('No server address of {} given'.format(service))
+                # imported here so that only clients of services in use are loaded
+                if service == 'cromwell':
+                    from ..cromwell import CromwellClient as client_class
+                elif service == 'tes':
+                    from ..tes import TesClient as client_class
+                else:
+                    from ..wes import WesClient as client_class
+                self.clients[service] = client_class(self.hosts[service], pool_size=self.pool_size)
+            return self.clients[service]
+
+    def call(self, request):
+        """
+        Call the client method of a request
+        :param request: dict of request, see parse_request
+        :return: result of method
+        """
+        method = getattr(self.get(request['service']), request['op'])
+        args = ([request['id']] if 'id' in request else []) + list(request.get('args') or [])
+        kwargs = {key: value for key, value in request.items() if key not in REQUEST_KEYS}
+        return _jsonable(method(*args, **kwargs))
+
+    def close(self):
+        for client in self.clients.values():
+            client.close()
+
+
+@click.command('batch')
+@click.option('--cromwell-host', help='Cromwell server address', envvar='CROMWELL_SERVER')
+@click.option('--tes-host', help='TES server address', envvar='TES_SERVER')
+@click.option('--wes-host', help='WES server address', envvar='WES_SERVER')
+@click.option('-s', '--service', default='cromwell', show_default=True, type=click.Choice(list(OPERATIONS)),
+              help='Service of requests that do not name one')
+@click.option('-w', '--workers', default=1, show_default=True,
+              help='Number of simultaneous requests, results are written in order of input only with 1')
+@click.argument('requests_file', type=click.File(), default='-')
+def batch(cromwell_host, tes_host, wes_host, service, workers, requests_file):
+    """Run operations read from stdin
+
+    Every line is an operation, either a command such as "status ID" or "tes status ID",
+    or a JSON object such as {"op": "metadata", "id": "ID", "include_key": ["status"]}.
+    One JSON object is written per operation as soon as it is done, with the request and its result or error,
+    so that wftools can run as a coprocess reusing its connections.
+    """
+    clients = Clients(dict(cromwell=cromwell_host, tes=tes_host, wes=wes_host), workers)
+    failed = []
+
+    def parse(line):
+        try:
+            return line.strip(), parse_request(line, service), None
+        except (ValueError, TypeError, KeyError) as e:
+            return line.strip(), None, e
+
+    def run(item):
+        _, request, error = item
+        if error is not None:
+            raise error
+        return clients.call(request)
+
+    def results():
+        requests = (parse(line) for line in requests_file if line.strip())
+        for (line, request, _), result, error in imap_streaming(run, requests, workers):
+            if error is not None:
+                failed.append(line)
+            if request is None:
+                yield dict(line=line, result=None, error=str(error))
+            else:
+                yield dict(request, result=result, error=None if error is None else str(error))
+
+    try:
+        write_as_ndjson(results(), sys.stdout)
+    finally:
+        clients.close()
+    if failed:
+        exit(1)
@@ -0,0 +1,659 @@
+import itertools
+import os
+import threading
+from json import dumps, load
+
+import click
+
+from . import OUTPUT_FORMATS, call_client_method, call_client_method_bulk, read_ids, write_as_json, write_rows
+from ..cache import ResponseCache
+from ..constants import SORT_KEYS, TABLE_FORMATS
+from ..cromwell import CromwellClient
+from ..metadata import CALL_KEYS, CallRecord, call_record, flatten
+from ..parallel import imap_unordered
+
+# modules of analytics, bulk submission, index, profile and transfer of files are imported by the commands using
+# them, so that other commands do not load them (and pyarrow or sqlite3)
+
+WORKFLOW_FIELDS = ['id', 'name', 'status', 'submission', 'start', 'end', 'parentWorkflowId', 'rootWorkflowId',
+                   'metadataArchiveStatus']
+LOG_FIELDS = ['task', 'shardIndex', 'attempt', 'stdout', 'stderr']
+OUTPUT_FIELDS = ['task', 'shardIndex', 'file']
+
+
+def output_rows(outputs):
+    """
+    Flatten workflow outputs to one row per task and shard
+    :param outputs: dict of {task: output or list of outputs}
+    :return: generator of dict with keys listed in OUTPUT_FIELDS
+    """
+    for task_name, task_outputs in outputs.items():
+        if not isinstance(task_outputs, list):
+            task_outputs = [task_outputs]
+        for i, output in enumerate(task_outputs):
+            yield dict(task=task_name, shardIndex=i, file=output)
+
+
+def call_row(shard, extra_keys, encode=False):
+    """
+    Build a row of a shard of a call, see cromwell_metadata
+    :param shard: (workflow_id, call_name, shard) tuple, see CromwellClient.iter_shards
+    :param extra_keys: other metadata keys of the shard to be flattened in the row, dotted keys select nested
+        values, e.g. runtimeAttributes.cpu
+    :param encode: encode lists as JSON, e.g. for CSV
+    :return: dict with CallRecord fields and flattened extra keys
+    """
+    row = call_record(*shard)._asdict()
+    top_keys = dict.fromkeys(key.split('.')[0] for key in extra_keys)
+    extra = flatten({key: shard[2][key] for key in top_keys if key in shard[2]})
+    for key, value in extra.items():
+        if any(key == k or key.startswith(k + '.') for k in extra_keys):
+            row[key] = dumps(value) if encode and isinstance(value, (list, dict)) else value
+    return row
+
+
+def format_duration(seconds):
+    """
+    Format seconds as H:MM:SS
+    :param seconds: number of seconds or None
+    :return: str, - if seconds is None
+    """
+    if seconds is None:
+        return '-'
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    return '{}:{:02}:{:02}'.format(*divmod(minutes, 60), seconds)
+
+
+@click.group()
+@click.option('--no-cache', is_flag=True, default=False, help='Do not read or write cached responses')
+@click.option('--cache-dir', envvar='WFTOOLS_CACHE_DIR', help='Directory of cached responses')
+@click.option('--cache-size', default=1024, show_default=True, help='Maximum size of cache in MB')
+@click.option('--cache-ttl', default=60, show_default=True,
+              help='Seconds responses of non-terminal workflows are cached for')
+@click.option('--cache-stats', is_flag=True, default=False, help='Print cache hits and misses on exit')
+@click.pass_context
+def cromwell(ctx, no_cache, cache_dir, cache_size, cache_ttl, cache_stats):
+    """Cromwell
+
+    Metadata, outputs, logs and timing of finished workflows are cached on disk.
+    """
+    ctx.obj = None if no_cache else ResponseCache(cache_dir, cache_size * 1024 ** 2, cache_ttl)
+    if cache_stats and ctx.obj is not None:
+        ctx.call_on_close(lambda: click.echo('Cache: {hits} hits, {misses} misses'.format(**ctx.obj.stats()),
+                                             err=True))
+
+
+def cromwell_client(host, **kwargs):
+    """
+    Create CromwellClient using the response cache configured in cromwell command group
+    :param host: Cromwell server URL
+    :param kwargs: options passed to CromwellClient
+    :return: CromwellClient
+    """
+    return CromwellClient(host, cache=click.get_current_context().find_object(ResponseCache), **kwargs)
+
+
+@cromwell.command('abort')
+@click.option('-h', '--host', help='Server address', required=True, envvar='CROMWELL_SERVER')
+@click.option('-F', '--file', 'ids_file', type=click.File(), help='File containing workflow IDs, one per line')
+@click.option('-w', '--workers', default=10, show_default=True, help='Number of simultaneous requests')
+@click.option('-f', '--format', 'output_format', default='console', type=click.Choice(['console'] + OUTPUT_FORMATS),
+              help='Format of output')
+@click.argument('workflow_ids', nargs=-1)
+def cromwell_abort(host, workflow_ids, ids_file, workers, output_format):
+    """Abort running workflows"""
+    with cromwell_client(host, pool_size=workers) as client:
+        call_client_method_bulk(client.abort, read_ids(workflow_ids, ids_file), workers, output_format)
+
+
+@cromwell.command('analytics')
+@click.option('-h', '--host', help='Server address', required=True, envvar='CROMWELL_SERVER')
+@click.option('-n', '--name', 'names', multiple=True, help='Filter by one or more workflow names')
+@click.option('-s', '--status', 'statuses', multiple=True, help='Filter by one or more workflow status')
+@click.option('-l', '--label', 'labels', multiple=True, help='Filter by one or more labels (key:value)')
+@click.option('--submitted-after', help='Filter workflows submitted on or after this date-time')
+@click.option('--started-after', help='Filter workflows started on or after this date-time')
+@click.option('--ended-before', help='Filter workflows ended on or before this date-time')
+@click.option('--limit', type=int, help='Maximum number of workflows')
+@click.option('--expand-subworkflows/--no-expand-subworkflows', default=True, show_default=True,
+              help='Aggregate calls of subworkflows instead of subworkflow calls')
+@click.option('-w', '--workers', default=10, show_default=True, help='Number of concurrent metadata requests')
+@click.option('-o', '--output', type=click.Path(dir_okay=False), help='Destination file (CSV to stdout by default)')
+@click.option('-f', '--format', 'table_format', type=click.Choice(TABLE_FORMATS),
+              help='Format of output file (guessed from its extension: .parquet, .arrow or CSV)')
+def cromwell_analytics(host, names, statuses, labels, submitted_after, started_after, ended_before, limit,
+                       expand_subworkflows, workers, output, table_format):
+    """
+    Aggregate calls across workflows.
+    For each fully qualified call name, reports median (p50), p95 and maximum run time in seconds, failure and
+    cache hit rates, CPU-hours and memory GB-hours. Parquet and Arrow outputs require pyarrow.
+    """
+    from ..analytics import CallStats, analyze, table_format_of, write_table
+    client = cromwell_client(host)
+    table_format = table_format or table_format_of(output)
+
+    def report_error(workflow_id, error):
+        click.echo('{}: {}'.format(workflow_id, error), err=True)
+
+    try:
+        # subworkflows are excluded from listing as they are part of their root workflow
+        workflows = client.iter_workflows(None, names, statuses, submitted_after, started_after, ended_before, labels,
+                                          False, limit=limit)
+        workflow_ids = (workflow['id'] for workflow in workflows)
+        aggregator = analyze(client, workflow_ids, workers, expand_subworkflows, report_error)
+        write_table([stats._asdict() for stats in aggregator.results()], CallStats._fields, output, table_format)
+    except Exception as e:
+        click.echo(str(e), err=True)
+        exit(1)
+
+
+@cromwell.command('collect')
+@click.option('-h', '--host', help='Server address', required=True, envvar='CROMWELL_SERVER')
+@click.option('--no-task-dir', is_flag=True, default=False, help='Do not create subdirectories for tasks')
+@click.option('--copy', 'mode', flag_value='copy', default=True, help='Copy output files (default).')
+@click.option('--move', 'mode', flag_value='move', help='Move output files.')
+@click.option('--link', 'mode', flag_value='link',
+              help='Create hard links to output files, copy them if they are on another file system.')
+@click.option('--overwrite', is_flag=True, default=False, help='Overwrite existing files.')
+@click.option('-w', '--workers', default=4, show_default=True, help='Number of simultaneous file transfers')
+@click.option('--max-rate', type=float, help='Maximum transfer rate in MB/s shared by all workers')
+@click.option('--progress-interval', default=10, show_default=True, help='Seconds between progress reports')
+@click.option('--no-manifest', is_flag=True, default=False,
+              help='Do not record collected files, every file is transferred again in next runs')
+@click.option('--checksum', is_flag=True, default=False,
+              help='Record SHA-256 checksum of collected files and verify it before skipping them')
+@click.argument('workflow_id')
+@click.argument('destination', type=click.Path())
+def cromwell_collect(host, workflow_id, no_task_dir, mode, overwrite, workers, max_rate, progress_interval,
+                     no_manifest, checksum, destination):
+    """Copy or move output files to directory
+
+    Collected files are recorded in a manifest in DESTINATION so that files already up to date are skipped
+    when collecting again."""
+    from ..transfer import Manifest, Progress, RateLimiter, copy_file, link_file, move_file
+    client = cromwell_client(host)
+    data = call_client_method(client.outputs, workflow_id)
+
+    os.makedirs(destination, exist_ok=True)
+
+    jobs = []
+    for task_name, task_outputs in data.items():
+        if no_task_dir:
+            task_dir = destination
+        else:
+            task_dir = os.path.join(destination, task_name)
+            os.makedirs(task_dir, exist_ok=True)
+
+        if isinstance(task_outputs, str):
+            files = [task_outputs]
+        elif any(isinstance(i, list) for i in task_outputs):
+            files = itertools.chain.from_iterable(task_outputs)
+        else:
+            files = task_outputs
+
+        for src_file in files:
+            jobs.append((src_file, os.path.join(task_dir, os.path.basename(src_file))))
+
+    transfer_file = dict(copy=copy_file, move=move_file, link=link_file)[mode]
+    limiter = RateLimiter(max_rate * 1e6) if max_rate else None
+    progress = Progress(len(jobs))
+    manifest = None if no_manifest else Manifest(destination)
+
+    def transfer(job):
+        src_file, dst_file = job
+        try:
+            src_stat = os.stat(src_file)
+        except FileNotFoundError:
+            # source file may have been moved by a previous run
+            if manifest is None or not manifest.is_current(src_file, dst_file, checksum=checksum):
+                raise
+            progress.add_file(skipped=True)
+            return
+        if mode != 'move' and manifest is not None and manifest.is_current(src_file, dst_file, src_stat, checksum):
+            progress.add_file(skipped=True)
+            return
+        replace = overwrite or (manifest is not None and manifest.get(dst_file) is not None)
+        transfer_file(src_file, dst_file, replace, limiter, progress)
+        if manifest is not None:
+            manifest.add(src_file, dst_file, src_stat, checksum)
+        progress.add_file()
+
+    stop = threading.Event()
+
+    def report():
+        while not stop.wait(progress_interval):
+            click.echo(progress.report(), err=True)
+
+    threading.Thread(target=report, daemon=True).start()
+    failed = False
+    results = imap_unordered(transfer, jobs, workers)
+    try:
+        for (src_file, dst_file), _, error in results:
+            if isinstance(error, FileExistsError):
+                click.echo('File already exists: ' + dst_file, err=True)
+                failed = True
+                break
+            elif isinstance(error, FileNotFoundError):
+                click.echo('File not found: ' + src_file, err=True)
+            elif error is not None:
+                click.echo('Failed to collect {}: {}'.format(src_file, error), err=True)
+                failed = True
+    finally:
+        results.close()
+        stop.set()
+        if manifest is not None:
+            manifest.close()
+    click.echo(progress.report(), err=True)
+    if failed:
+        exit(1)
+
+
+@cromwell.command('describe')
+@click.option('-h', '--host', help='Server address', required=True, envvar='CROMWELL_SERVER')
+@click.option('-i', '--inputs', help='Path to inputs file')
+@click.option('-l', '--language', type=click.Choice(['WDL', 'CWL']), help='Workflow file format')
+@click.option('-v', '--version', 'language_version', type=click.Choice(['draft-2', '1.0']), help='Language version')
+@click.argument('workflow')
+def cromwell_describe(host, workflow, inputs, language, language_version):
+    """Describe a workflow"""
+    client = cromwell_client(host)
+    data = call_client_method(client.describe, workflow, inputs, language, language_version)
+    click.echo(dumps(data))
+
+
+@cromwell.command('info')
+@click.option('-h', '--host', help='Server address', required=True, envvar='CROMWELL_SERVER')
+@click.option('-f', '--format', 'output_format', default='console', type=click.Choice(['console', 'json']),
+              help='Format of output')
+def cromwell_info(host, output_format):
+    """Ger server info"""
+    client = cromwell_client(host)
+    data = call_client_method(client.info)
+
+    if output_format == 'json':
+        write_as_json(data)
+    else:
+        click.echo('Default backend: {}'.format(data.get('defaultBackend')))
+        click.echo('Supported backends: {}'.format(','.join(data.get('supportedBackends'))))
+
+
+@cromwell.command('list')
+@click.option('-h', '--host', help='Server address', required=True, envvar='CROMWELL_SERVER')
+@click.option('-i', '--id', 'ids', multiple=True, help='Filter by one or more workflow IDs')
+@click.option('-n', '--name', 'names', multiple=True, help='Filter by one or more workflow names')
+@click.option('-s', '--status', 'statuses', multiple=True, help='Filter by one or more workflow status')
+@click.option('-l', '--label', 'labels', multiple=True, help='Filter by one or more labels (key:value)')
+@click.option('--submitted-after', help='Filter workflows submitted on or after this date-time')
+@click.option('--started-after', help='Filter workflows started on or after this date-time')
+@click.option('--ended-before', help='Filter workflows ended on or before this date-time')
+@click.option('--include-subworkflows/--exclude-subworkflows', default=None,
+              help='Include or exclude subworkflows (server default is to include)')
+@click.option('--limit', type=int, help='Maximum number of workflows')
+@click.option('--page-size', default=1000, show_default=True, help='Number of workflows requested at a time')
+@click.option('--local', is_flag=True, default=False, help='Query the local index instead of the server, see sync')
+@click.option('--index', 'index_path', envvar='WFTOOLS_INDEX', type=click.Path(dir_okay=False),
+              help='Local index file (in cache directory by default)')
+@click.option('-f', '--format', 'output_format', default='console', type=click.Choice(['console'] + OUTPUT_FORMATS),
+              help='Format of output')
+def cromwell_list(host, ids, names, statuses, labels, submitted_after, started_after, ended_before,
+                  include_subworkflows, limit, page_size, local, index_path, output_format):
+    """List workflows"""
+    def write(data):
+        try:
+            if output_format != 'console':
+                write_rows(data, output_format, WORKFLOW_FIELDS)
+            else:
+                click.echo('{:36}  {:9}  {:24}  {:24}  {:24}  {}'.format('ID', 'Status', 'Start', 'End', 'Submitted',
+                                                                         'Name'))
+                for workflow in data:
+                    click.echo('{:36}  {:9}  {:24}  {:24}  {:24}  {}'.format(workflow.get('id', '-'),
+                                                                             workflow.get('status', '-'),
+                                                                             workflow.get('start', '-'),
+                                                                             workflow.get('end', '-'),
+                                                                             workflow.get('submission', '-'),
+                                                                             workflow.get('name', '-')))
+        except Exception as e:
+            click.echo(str(e), err=True)
+            exit(1)
+
+    if local:
+        from ..index import WorkflowIndex, default_index_path
+        with WorkflowIndex(index_path or default_index_path(host)) as index:
+            write(index.query(ids, names, statuses, submitted_after, started_after, ended_before, labels,
+                              include_subworkflows, limit))
+    else:
+        client = cromwell_client(host)
+        write(client.iter_workflows(ids, names, statuses, submitted_after, started_after, ended_before, labels,
+                                    include_subworkflows, page_size, limit))
+
+
+@cromwell.command('logs')
+@click.option('-h', '--host', help='Server address', required=True, envvar='CROMWELL_SERVER')
+@click.option('-f', '--format', 'output_format', default='console', type=click.Choice(['console'] + OUTPUT_FORMATS),
+              help='Format of output')
+@click.argument('workflow_id')
+def cromwell_logs(host, workflow_id, output_format):
+    """Get the logs for a workflow"""
+    client = cromwell_client(host)
+    data = call_client_method(client.logs, workflow_id)
+
+    if output_format == 'json':
+        click.echo(dumps(data))
+    elif output_format in OUTPUT_FORMATS:
+        rows = (dict(log, task=task_name) for task_name, task_logs in data.items() for log in task_logs)
+        write_rows(rows, output_format, LOG_FIELDS)
+    else:
+        for task in data:
+            click.echo('Task {}'.format(task))
+            for idx in range(len(data[task])):
+                click.echo('Shard {} stdout: {}'.format(idx, data[task][idx]['stdout']))
+                click.echo('Shard {} stderr: {}'.format(idx, data[task][idx]['stderr']))
+
+
+@cromwell.command('metadata')
+@click.option('-h', '--host', help='Server address', required=True, envvar='CROMWELL_SERVER')
+@click.option('-i', '--include-key', 'include_keys', multiple=True, help='Metadata keys to be retrieved')
+@click.option('-e', '--exclude-key', 'exclude_keys', multiple=True, help='Metadata keys to be excluded')
+@click.option('--expand-subworkflows', is_flag=True, help='Include metadata of subworkflows')
+@click.option('--calls', 'flat', is_flag=True,
+              help='One row per shard and attempt of each call (always the case with csv and ndjson formats)')
+@click.option('-f', '--format', 'output_format', default='json', type=click.Choice(OUTPUT_FORMATS),
+              help='Format of output')
+@click.argument('workflow_id')
+def cromwell_metadata(host, workflow_id, include_keys, exclude_keys, expand_subworkflows, flat, output_format):
+    """
+    Get workflow metadata.
+    Rows of calls hold a compact summary of each shard and attempt, plus flattened values of other keys
+    given with --include-key (e.g. runtimeAttributes.cpu); metadata is streamed one call at a time.
+    """
+    client = cromwell_client(host)
+    extra_keys = [key for key in include_keys if key not in CALL_KEYS]
+    # Cromwell selects top-level keys of calls only, nested values are selected from rows
+    include_keys = list(dict.fromkeys(key.split('.')[0] for key in include_keys)) or None
+    exclude_keys = list(exclude_keys) or None
+    if output_format == 'json' and not flat:
+        data = call_client_method(client.metadata, workflow_id, exclude_keys, expand_subworkflows, include_keys)
+        click.echo(dumps(data))
+        return
+
+    if include_keys:
+        include_keys = CALL_KEYS + [key for key in include_keys if key not in CALL_KEYS]
+    shards = client.iter_shards(workflow_id, include_keys, exclude_keys, expand_subworkflows)
+    rows = (call_row(shard, extra_keys, output_format == 'csv') for shard in shards)
+    try:
+        write_rows(rows, output_format, CallRecord._fields if not extra_keys else None)
+    except Exception as e:
+        click.echo(str(e), err=True)
+        exit(1)
+
+
+@cromwell.command('release')
+@click.option('-h', '--host', help='Server address', required=True, envvar='CROMWELL_SERVER')
+@click.option('-F', '--file', 'ids_file', type=click.File(), help='File containing workflow IDs, one per line')
+@click.option('-w', '--workers', default=10, show_default=True, help='Number of simultaneous requests')
+@click.option('-f', '--format', 'output_format', default='console', type=click.Choice(['console'] + OUTPUT_FORMATS),
+              help='Format of output')
+@click.argument('workflow_ids', nargs=-1)
+def cromwell_release(host, workflow_ids, ids_file, workers, output_format):
+    """Switch from 'On Hold' to 'Submitted' status"""
+    with cromwell_client(host, pool_size=workers) as client:
+        call_client_method_bulk(client.release, read_ids(workflow_ids, ids_file), workers, output_format)
+
+
+@cromwell.command('status')
+@click.option('-h', '--host', help='Server address', required=True, envvar='CROMWELL_SERVER')
+@click.option('-F', '--file', 'ids_file', type=click.File(), help='File containing workflow IDs, one per line')
+@click.option('-w', '--workers', default=10, show_default=True, help='Number of simultaneous requests')
+@click.option('-f', '--format', 'output_format', default='console', type=click.Choice(['console'] + OUTPUT_FORMATS),
+              help='Format of output')
+@click.argument('workflow_ids', nargs=-1)
+def cromwell_status(host, workflow_ids, ids_file, workers, output_format):
+    """Retrieves the current state for workflows"""
+    with cromwell_client(host, pool_size=workers) as client:
+        call_client_method_bulk(client.status, read_ids(workflow_ids, ids_file), workers, output_format)
+
+
+@cromwell.command('submit')
+@click.option('-h', '--host', help='Server address', required=True, envvar='CROMWELL_SERVER')
+@click.option('-i', '--inputs', help='Path to inputs file')
+@click.option('-d', '--dependencies',
+              help='ZIP file or directory containing workflow source files that are used to resolve local imports')
+@click.option('-o', '--options', help='Path to options file')
+@click.option('-t', '--labels', help='Labels file to apply to this workflow')
+@click.option('-l', '--language', type=click.Choice(['WDL', 'CWL']), help='Workflow file format')
+@click.option('-v', '--version', 'language_version', type=click.Choice(['draft-2', '1.0']), help='Language version')
+@click.option('--hold', is_flag=True, default=False, help='Put workflow on hold upon submission')
+@click.option('--root', help='The root object to be run (CWL)')
+@click.argument('workflow')
+def cromwell_submit(host, workflow, inputs, dependencies, options, labels, language, language_version, root, hold):
+    """Submit a workflow for execution"""
+    client = cromwell_client(host)
+    data = call_client_method(client.submit, workflow, inputs, options, dependencies, labels, language,
+                              language_version, root, hold)
+    click.echo(data)
+
+
+@cromwell.command('submit-samples')
+@click.option('-h', '--host', help='Server address', required=True, envvar='CROMWELL_SERVER')
+@click.option('-d', '--dependencies',
+              help='ZIP file or directory containing workflow source files that are used to resolve local imports')
+@click.option('-o', '--options', help='Path to options file')
+@click.option('-t', '--labels', help='Labels file to apply to all workflows')
+@click.option('-l', '--language', type=click.Choice(['WDL', 'CWL']), help='Workflow file format')
+@click.option('-v', '--version', 'language_version', type=click.Choice(['draft-2', '1.0']), help='Language version')
+@click.option('--hold', is_flag=True, default=False, help='Put workflows on hold upon submission')
+@click.option('--id-column', help='Column of sample sheet with sample IDs (first column by default)')
+@click.option('--ledger', 'ledger_path', help='SQLite file recording submitted samples [default: SAMPLES.ledger]')
+@click.option('-b', '--batch-size', default=100, show_default=True, help='Maximum number of workflows per request')
+@click.option('--max-in-flight', type=int, help='Maximum number of submitted and running workflows in server')
+@click.option('--max-per-second', type=float, help='Maximum number of workflows submitted per second')
+@click.option('--interval', default=30, show_default=True, help='Seconds between checks of running workflows')
+@click.option('-f', '--format', 'output_format', default='console', type=click.Choice(['console'] + OUTPUT_FORMATS),
+              help='Format of output')
+@click.argument('workflow')
+@click.argument('samples', type=click.Path(exists=True))
+def cromwell_submit_samples(host, workflow, samples, dependencies, options, labels, language, language_version, hold,
+                            id_column, ledger_path, batch_size, max_in_flight, max_per_second, interval,
+                            output_format):
+    """
+    Submit a workflow for many samples.
+    SAMPLES is a sample sheet (TSV with .tsv or .txt extension, CSV otherwise) with one sample per row and fully
+    qualified input names as columns, or a directory of inputs JSON files (one per sample).
+    Samples are sent in batches and recorded in a ledger; running the command again submits only new samples and
+    recovers batches that were sent when a previous run was interrupted.
+    """
+    from ..bulk import Ledger, read_samples, submit_samples
+    client = cromwell_client(host)
+    if labels is not None:
+        with open(labels) as file:
+            labels = load(file)
+    ledger_path = ledger_path or samples.rstrip(os.sep) + '.ledger'
+
+    with Ledger(ledger_path) as ledger:
+        submitted = submit_samples(client, workflow, read_samples(samples, id_column), ledger, batch_size,
+                                   max_in_flight, max_per_second, interval, labels, options=options,
+                                   dependencies=dependencies, language=language, language_version=language_version,
+                                   hold=hold)
+        rows = (dict(sample=sample, id=workflow_id) for sample, workflow_id in submitted)
+        try:
+            if output_format in OUTPUT_FORMATS:
+                write_rows(rows, output_format, ['sample', 'id'])
+            else:
+                for row in rows:
+                    click.echo('{}\t{}'.format(row['sample'], row['id']))
+        except Exception as e:
+            click.echo(str(e), err=True)
+            exit(1)
+
+
+@cromwell.command('sync')
+@click.option('-h', '--host', help='Server address', required=True, envvar='CROMWELL_SERVER')
+@click.option('--index', 'index_path', envvar='WFTOOLS_INDEX', type=click.Path(dir_okay=False),
+              help='Local index file (in cache directory by default)')
+@click.option('--full', is_flag=True, default=False, help='Fetch all workflows again, e.g. to update labels')
+@click.option('--page-size', default=1000, show_default=True, help='Number of workflows requested at a time')
+def cromwell_sync(host, index_path, full, page_size):
+    """Update local index of workflows
+
+    The first sync fetches all workflows, the next ones only workflows submitted since the previous sync and
+    workflows that were not finished. Only one sync of an index runs at a time, so it can be scheduled with cron.
+    See list --local.
+    """
+    from ..index import IndexLocked, WorkflowIndex, default_index_path
+    client = cromwell_client(host)
+    with WorkflowIndex(index_path or default_index_path(host)) as index:
+        try:
+            count = index.sync(client, page_size, full)
+        except IndexLocked as e:
+            click.echo(str(e), err=True)
+            return
+        except Exception as e:
+            click.echo(str(e), err=True)
+            exit(1)
+    click.echo('{} workflows synced'.format(count), err=True)
+
+
+@cromwell.command('outputs')
+@click.option('-h', '--host', help='Server address', required=True, envvar='CROMWELL_SERVER')
+@click.option('-f', '--format', 'output_format', default='console', type=click.Choice(['console'] + OUTPUT_FORMATS),
+              help='Format of output')
+@click.argument('workflow_id')
+def cromwell_outputs(host, workflow_id, output_format):
+    """Get the outputs for a workflow"""
+    client = cromwell_client(host)
+    data = call_client_method(client.outputs, workflow_id)
+
+    if output_format == 'json':
+        click.echo(dumps(data))
+    elif output_format in OUTPUT_FORMATS:
+        write_rows(output_rows(data), output_format, OUTPUT_FIELDS)
+    else:
+        for task in data:
+            click.echo(task)
+            if type(data[task]) is str:
+                click.echo(data[task])
+                continue
+            if any(isinstance(i, list) for i in data[task]):
+                files = itertools.chain.from_iterable(data[task])
+            else:
+                files = data[task]
+            for file in files:
+                click.echo(file)
+
+
+@cromwell.command('profile')
+@click.option('-h', '--host', help='Server address', required=True, envvar='CROMWELL_SERVER')
+@click.option('--expand-subworkflows', is_flag=True, help='Profile calls of subworkflows')
+@click.option('-s', '--sort', default='wall', show_default=True, type=click.Choice(SORT_KEYS),
+              help='Rank calls by this field')
+@click.option('--shards', is_flag=True, help='One row per shard and attempt instead of per call')
+@click.option('--limit', type=int, help='Maximum number of calls in console output')
+@click.option('-f', '--format', 'output_format', default='console', type=click.Choice(['console'] + OUTPUT_FORMATS),
+              help='Format of output (json is the summary, csv and ndjson are rows of calls or shards)')
+@click.argument('workflow_id')
+def cromwell_profile(host, workflow_id, expand_subworkflows, sort, shards, limit, output_format):
+    """
+    Profile time spent by calls of a workflow.
+    Queue time is from call start to job start, run time is the duration of the job.
+    Cache savings are estimated from shards of the same call that did run.
+    The critical path is inferred from the timeline, as the call that ended last before each call started.
+    """
+    from ..profile import PROFILE_KEYS, CallProfile, ShardProfile, profile_shards
+    client = cromwell_client(host)
+    try:
+        if shards:
+            data = client.iter_shards(workflow_id, PROFILE_KEYS, expand_sub_workflows=expand_subworkflows)
+            rows = (shard._asdict() for shard in profile_shards(data))
+            if output_format == 'console':
+                output_format = 'csv'
+            write_rows(rows, output_format, ShardProfile._fields)
+            return
+        summary = client.profile(workflow_id, expand_subworkflows, sort)
+    except Exception as e:
+        click.echo(str(e), err=True)
+        exit(1)
+
+    if output_format == 'json':
+        click.echo(dumps(dict(summary, calls=[call._asdict() for call in summary['calls']])))
+    elif output_format in OUTPUT_FORMATS:
+        write_rows((call._asdict() for call in summary['calls']), output_format, CallProfile._fields)
+    else:
+        line = '{:1} {:40}  {:>6}  {:>8}  {:>9}  {:>10}  {:>10}  {:>10}  {:>10}'
+        click.echo(line.format('', 'Call', 'Shards', 'Attempts', 'CacheHits', 'Wall', 'Queue', 'Run', 'Saved'))
+        for call in summary['calls'][:limit]:
+            click.echo(line.format('*' if call.critical else '', call.name, call.shards, call.attempts,
+                                   call.cache_hits, format_duration(call.wall), format_duration(call.queue),
+                                   format_duration(call.run), format_duration(call.cache_savings)))
+        click.echo()
+        click.echo('Wall time: {}'.format(format_duration(summary['wall'])))
+        click.echo('Run time: {}, queue time: {}'.format(format_duration(summary['run']),
+                                                         format_duration(summary['queue'])))
+        click.echo('Cache hits: {} (saved about {})'.format(summary['cache_hits'],
+                                                           format_duration(summary['cache_savings'])))
+        click.echo('Retries: {} ({} preemptions)'.format(summary['retries'], summary['preemptions']))
+        click.echo('Critical path (*): {}'.format(' -> '.join(summary['critical_path'])))
+
+
+@cromwell.command('validate')
+@click.option('-h', '--host', help='Server address', required=True, envvar='CROMWELL_SERVER')
+@click.option('-i', '--inputs', help='Path to inputs file')
+@click.option('-l', '--language', type=click.Choice(['WDL', 'CWL']), help='Workflow file format')
+@click.option('-v', '--version', 'language_version', type=click.Choice(['draft-2', '1.0']), help='Language version')
+@click.argument('workflow')
+def cromwell_validate(host, workflow, inputs, language, language_version):
+    """Validate a workflow and its inputs"""
+    client = cromwell_client(host)
+    data = call_client_method(client.describe, workflow, inputs, language, language_version)
+    if data.get('valid'):
+        click.echo('Valid')
+    else:
+        click.echo('Invalid')
+        for error in data.get('errors'):
+            click.echo(error, err=True)
+
+
+@cromwell.command('version')
+@click.option('-h', '--host', help='Server address', required=True, envvar='CROMWELL_SERVER')
+def cromwell_version(host):
+    """Return the version of this Cromwell server"""
+    client = cromwell_client(host)
+    data = call_client_method(client.version)
+    click.echo(data)
+
+
+@cromwell.command('wait')
+@click.option('-h', '--host', help='Server address', required=True, envvar='CROMWELL_SERVER')
+@click.option('-F', '--file', 'ids_file', type=click.File(), help='File containing workflow IDs, one per line')
+@click.option('--interval', default=5.0, show_default=True, help='Initial seconds between polls')
+@click.option('--max-interval', default=60.0, show_default=True,
+              help='Maximum seconds between polls, interval grows while no workflow changes')
+@click.option('--timeout', type=float, help='Give up after this many seconds and exit with status 2')
+@click.option('--exit-code', default=1, show_default=True, help='Exit status when any workflow did not succeed')
+@click.option('-q', '--quiet', is_flag=True, default=False, help='Do not print state transitions')
+@click.option('-f', '--format', 'output_format', default='console', type=click.Choice(['console', 'ndjson']),
+              help='Format of output')
+@click.argument('workflow_ids', nargs=-1)
+def cromwell_wait(host, workflow_ids, ids_file, interval, max_interval, timeout, exit_code, quiet, output_format):
+    """Wait until workflows reach a terminal state"""
+    workflow_ids = list(read_ids(workflow_ids, ids_file))
+    if not workflow_ids:
+        raise click.UsageError('No workflow IDs given.')
+    states = dict()
+    with cromwell_client(host) as client:
+        try:
+            for event in client.watch(workflow_ids, interval, max_interval, timeout=timeout):
+                states[event.id] = event.state
+                if quiet:
+                    continue
+                if output_format == 'ndjson':
+                    click.echo(dumps(dict(id=event.id, previous=event.previous, status=event.state)))
+                else:
+                    click.echo('{:36}  {} -> {}'.format(event.id, event.previous or '-', event.state))
+        except TimeoutError as e:
+            click.echo(str(e), err=True)
+            exit(2)
+        except Exception as e:
+            click.echo(str(e), err=True)
+            exit(1)
+    if any(state != 'Succeeded' for state in states.values()):
+        exit(exit_code)
@@ -0,0 +1,197 @@
+import itertools
+import os
+import sys
+from json import dumps
+
+import click
+
+from . import OUTPUT_FORMATS, call_client_method, read_ids, write_as_json, write_rows
+from ..parallel import imap_unordered
+from ..tes import TesClient, read_tasks
+
+TASK_FIELDS = ['id', 'state', 'name', 'creation_time', 'cpu_cores', 'ram_gb', 'disk_gb']
+
+
+def task_row(task):
+    """
+    Flatten a TES task to the fields listed in TASK_FIELDS
+    :param task: Task object
+    :return: dict
+    """
+    resources = task.get('resources') or dict()
+    return dict(id=task.get('id'), state=task.get('state'), name=task.get('name'),
+                creation_time=task.get('creation_time'), cpu_cores=resources.get('cpu_cores'),
+                ram_gb=resources.get('ram_gb'), disk_gb=resources.get('disk_gb'))
+
+
+@click.group()
+def tes():
+    """Task Execution Schema"""
+
+
+@tes.command('abort')
+@click.option('-h', '--host', help='Server address', required=True, envvar='TES_SERVER')
+@click.argument('task_id')
+def tes_abort(host, task_id):
+    """Abort a running task"""
+    client = TesClient(host)
+    data = call_client_method(client.abort, task_id)
+    click.echo(data)
+
+
+@tes.command('info')
+@click.option('-h', '--host', help='Server address', required=True, envvar='TES_SERVER')
+def tes_info(host):
+    """Information about the service"""
+    client = TesClient(host)
+    data = call_client_method(client.info)
+    write_as_json(data)
+
+
+@tes.command('list')
+@click.option('-h', '--host', help='Server address', required=True, envvar='TES_SERVER')
+@click.option('-i', '--id', 'ids', multiple=True, help='Filter by one or more task ID')
+@click.option('-n', '--name', 'names', multiple=True, help='Filter by one or more task name')
+@click.option('-p', '--name-prefix', help='Filter by task name prefix')
+@click.option('-s', '--status', 'states', multiple=True, help='Filter by one or more task states')
+@click.option('-c', '--column', 'columns', multiple=True, type=click.Choice(TASK_FIELDS),
+              help='Columns of CSV output (all by default)')
+@click.option('--view', type=click.Choice(['MINIMAL', 'BASIC', 'FULL'], case_sensitive=False),
+              help='Task fields requested to server, the smallest view that covers the output by default')
+@click.option('--limit', type=int, help='Maximum number of tasks')
+@click.option('--page-size', type=int, help='Number of tasks requested at a time')
+@click.option('-f', '--format', 'output_format', default='console', type=click.Choice(['console'] + OUTPUT_FORMATS),
+              help='Format of output')
+def tes_list(host, ids, names, name_prefix, states, columns, view, limit, page_size, output_format):
+    """List tasks"""
+    client = TesClient(host)
+
+    columns = columns or TASK_FIELDS
+    if view is None:
+        minimal = output_format == 'csv' and set(columns).issubset(('id', 'state'))
+        view = 'MINIMAL' if minimal and not names else 'BASIC'
+    if names and name_prefix is None:
+        # server only filters by prefix, exact names are matched below
+        name_prefix = os.path.commonprefix(names) or None
+    states = [t.upper() for t in states]
+
+    data = client.iter_tasks(view, name_prefix, page_size)
+    data = (t for t in data if (not ids or t.get('id') in ids) and (not names or t.get('name') in names) and
+            (not states or t.get('state') in states))
+    data = itertools.islice(data, limit)
+
+    try:
+        if output_format == 'csv':
+            write_rows(map(task_row, data), output_format, columns)
+        elif output_format != 'console':
+            write_rows(data, output_format)
+        else:
+            click.echo('{:24}  {:8}  {:28}  {:3}  {:6}  {:6}'.format('ID', 'State', 'Created', 'CPU', 'RAM', 'DISK'))
+            for task in map(task_row, data):
+                click.echo('{:24}  {:8}  {:28}  {:3}  {:6.2f}  {:6.2f}'.format(task.get('id'),
+                                                                               task.get('state'),
+                                                                               task.get('creation_time') or '-',
+                                                                               task.get('cpu_cores') or 0,
+                                                                               task.get('ram_gb') or 0,
+                                                                               task.get('disk_gb') or 0))
+    except Exception as e:
+        click.echo(str(e), err=True)
+        exit(1)
+
+
+@tes.command('submit')
+@click.option('-h', '--host', help='Server address', required=True, envvar='TES_SERVER')
+@click.option('-w', '--workers', default=10, show_default=True, help='Number of tasks created simultaneously')
+@click.option('-f', '--format', 'output_format', default='console', type=click.Choice(['console'] + OUTPUT_FORMATS),
+              help='Format of output')
+@click.argument('paths', nargs=-1)
+def tes_submit(host, paths, workers, output_format):
+    """
+    Create tasks.
+    PATHS are JSON (task or array of tasks), NDJSON (.ndjson, .jsonl) or YAML files, or directories of them;
+    "-" or no argument reads NDJSON from stdin. Task IDs are printed as tasks are created.
+    """
+    if not paths and sys.stdin.isatty():
+        raise click.UsageError('Missing tasks: give files as arguments or NDJSON on stdin.')
+    tasks = itertools.chain.from_iterable(read_tasks(path) for path in paths or ['-'])
+    failed = []
+
+    with TesClient(host, pool_size=workers) as client:
+        def results():
+            for task, result, error in imap_unordered(client.create_task, tasks, workers):
+                if error is not None:
+                    failed.append(task)
+                yield dict(name=task.get('name'), id=result and result['id'], error=error and str(error))
+
+        try:
+            if output_format == 'console':
+                for row in results():
+                    if row['error'] is None:
+                        click.echo('{}\t{}'.format(row['id'], row['name'] or ''))
+                    else:
+                        click.echo('{}: {}'.format(row['name'] or '-', row['error']), err=True)
+            else:
+                write_rows(results(), output_format, ['name', 'id', 'error'])
+        except Exception as e:
+            click.echo(str(e), err=True)
+            exit(1)
+    if failed:
+        exit(1)
+
+
+@tes.command('status')
+@click.option('-h', '--host', help='Server address', required=True, envvar='TES_SERVER')
+@click.argument('task_id')
+def tes_status(host, task_id):
+    """Retrieves the current state of a task"""
+    client = TesClient(host)
+    data = call_client_method(client.status, task_id)
+    click.echo(data.get('state'))
+
+
+@tes.command('watch')
+@click.option('-h', '--host', help='Server address', required=True, envvar='TES_SERVER')
+@click.option('-F', '--file', 'ids_file', type=click.File(), help='File containing task IDs, one per line')
+@click.option('-p', '--name-prefix', help='Watch tasks whose name starts with this prefix')
+@click.option('--interval', default=5.0, show_default=True, help='Initial seconds between polls')
+@click.option('--max-interval', default=60.0, show_default=True,
+              help='Maximum seconds between polls, interval grows while no task changes')
+@click.option('--timeout', type=float, help='Give up after this many seconds and exit with status 2')
+@click.option('--page-size', type=int, help='Number of tasks requested at a time')
+@click.option('--exit-code', default=1, show_default=True, help='Exit status when any task did not complete')
+@click.option('-q', '--quiet', is_flag=True, default=False, help='Do not print state transitions')
+@click.option('-f', '--format', 'output_format', default='console', type=click.Choice(['console', 'ndjson']),
+              help='Format of output')
+@click.argument('task_ids', nargs=-1)
+def tes_watch(host, task_ids, ids_file, name_prefix, interval, max_interval, timeout, page_size, exit_code, quiet,
+              output_format):
+    """
+    Watch tasks until they reach a terminal state, printing state transitions.
+    States are polled with MINIMAL list calls, a few per interval however many tasks are watched.
+    """
+    if name_prefix is not None and not task_ids and ids_file is None:
+        task_ids = []
+    else:
+        task_ids = list(read_ids(task_ids, ids_file))
+        if not task_ids and name_prefix is None:
+            raise click.UsageError('No task IDs or name prefix given.')
+    states = dict()
+    with TesClient(host) as client:
+        try:
+            for event in client.watch(task_ids, name_prefix, interval, max_interval, timeout=timeout,
+                                      page_size=page_size):
+                states[event.id] = event.state
+                if quiet:
+                    continue
+                if output_format == 'ndjson':
+                    click.echo(dumps(dict(id=event.id, previous=event.previous, state=event.state)))
+                else:
+                    click.echo('{:36}  {} -> {}'.format(event.id, event.previous or '-', event.state))
+        except TimeoutError as e:
+            click.echo(str(e), err=True)
+            exit(2)
+        except Exception as e:
+            click.echo(str(e), err=True)
+            exit(1)
+    if any(state != 'COMPLETE' for state in states.values()):
+        exit(exit_code)
@@ -0,0 +1,98 @@
+import itertools
+
+import click
+
+from . import OUTPUT_FORMATS, call_client_method, write_as_json, write_rows
+from ..wes import WesClient
+
+RUN_FIELDS = ['run_id', 'state']
+
+
+@click.group()
+def wes():
+    """Workflow Execution Schema"""
+
+
+@wes.command('abort')
+@click.option('-h', '--host', help='Server address', required=True, envvar='WES_SERVER')
+@click.argument('task_id')
+def wes_abort(host, task_id):
+    """Cancel a running workflow"""
+    client = WesClient(host)
+    data = call_client_method(client.abort, task_id)
+    click.echo(data)
+
+
+@wes.command('info')
+@click.option('-h', '--host', help='Server address', required=True, envvar='WES_SERVER')
+def wes_info(host):
+    """Get information about service"""
+    client = WesClient(host)
+    data = call_client_method(client.info)
+    write_as_json(data)
+
+
+@wes.command('list')
+@click.option('-h', '--host', help='Server address', required=True, envvar='WES_SERVER')
+@click.option('-s', '--state', 'states', multiple=True, help='Filter by one or more run states')
+@click.option('--limit', type=int, help='Maximum number of runs')
+@click.option('--page-size', type=int, help='Number of runs requested at a time')
+@click.option('-f', '--format', 'output_format', default='console', type=click.Choice(['console'] + OUTPUT_FORMATS),
+              help='Format of output')
+def wes_list(host, states, limit, page_size, output_format):
+    """List the workflow runs"""
+    client = WesClient(host)
+    states = [s.upper() for s in states]
+    data = client.iter_runs(page_size)
+    data = itertools.islice((r for r in data if not states or r.get('state') in states), limit)
+
+    try:
+        if output_format != 'console':
+            write_rows(data, output_format, RUN_FIELDS)
+        else:
+            click.echo('{:36}  {}'.format('ID', 'State'))
+            for run in data:
+                click.echo('{:36}  {}'.format(run.get('run_id', '-'), run.get('state', '-')))
+    except Exception as e:
+        click.echo(str(e), err=True)
+        exit(1)
+
+
+@wes.command('logs')
+@click.option('-h', '--host', help='Server address', required=True, envvar='WES_SERVER')
+@click.argument('run_id')
+def wes_logs(host, run_id):
+    """Get detailed info about a workflow run"""
+    client = WesClient(host)
+    data = call_client_method(client.logs, run_id)
+    click.echo(data)
+
+
+@wes.command('status')
+@click.option('-h', '--host', help='Server address', required=True, envvar='WES_SERVER')
+@click.argument('run_id')
+def wes_status(host, run_id):
+    """Get quick status info about a workflow run"""
+    client = WesClient(host)
+    data = call_client_method(client.status, run_id)
+    click.echo(data)
+
+
+@wes.command('submit')
+@click.option('-h', '--host', help='Server address', required=True, envvar='WES_SERVER')
+@click.option('-i', '--inputs', help='Path to inputs file')
+@click.option('-d', '--dependencies', multiple=True,
+              help='Files or directories attached to the run, e.g. workflow imports (directory files keep their '
+                   'relative paths)')
+@click.option('-o', '--options', help='Path to workflow engine parameters file')
+@click.option('-t', '--tags', help='Tags file (JSON object) to apply to this workflow')
+@click.option('-l', '--language', type=click.Choice(['WDL', 'CWL']), help='Workflow file format')
+@click.option('-v', '--version', 'language_version', type=click.Choice(['draft-2', '1.0', 'v1.0']),
+              help='Language version')
+@click.argument('workflow')
+def wes_submit(host, workflow, inputs, dependencies, options, tags, language, language_version):
+    """Run a workflow, WORKFLOW is a URL, a path relative to attached directories or a local file to be attached"""
+    client = WesClient(host)
+    data = call_client_method(client.submit, workflow, inputs, language, language_version, list(dependencies),
+                              options, tags)
+    click.echo(data)
@@ -1,4 +1,16 @@
+import json
+import os
+import sys
+
 from .client import Client
+from .watch import watch
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+TASK_EXTENSIONS = ('.json', '.ndjson', '.jsonl', '.yaml', '.yml')
 
 
 class TesClient(Client):
@@ -6,14 +18,16 @@ class TesClient(Client):
     TES API client
     Provides all methods available in the API
     """
+    terminal_states = ('COMPLETE', 'EXECUTOR_ERROR', 'SYSTEM_ERROR', 'CANCELED', 'PREEMPTED')
 
-    def __init__(self, host, api_version='v1'):
+    def __init__(self, host, api_version='v1', **kwargs):
         """
         Initializes TesClient
         :param host: TES implementation server URL
         :param api_version: TES API version
+        :param kwargs: connection pool, timeout and retry options passed to Client
         """
-        super().__init__(host)
+        super().__init__(host, **kwargs)
         self.api_version = api_version
 
     def abort(self, task_id):
@@ -27,12 +41,15 @@ class TesClient(Client):
     def create_task(self, task):
         """
         Create a new task
-        :param task: Task object to be submitted
-        :return:
+        :param task: dict of Task object to be submitted as JSON body
+        :return: dict with task ID
         """
-        data = dict(task=task)
         path = '/{version}/tasks'.format(version=self.api_version)
-        return super().post(path, data)
+        response = super().post(path, json=task)
+        if not isinstance(response, dict) or 'id' not in response:
+            message = response.get('message') if isinstance(response, dict) else None
+            raise Exception(message or 'Task not created: {}'.format(response))
+        return response
 
     def info(self):
         """
@@ -42,7 +59,29 @@ class TesClient(Client):
         path = '/{version}/tasks/service-info'.format(version=self.api_version)
         return super().get(path)
 
-    def list(self, view='MINIMAL', name_prefix=None, page_size=None, page_token=False):
+    def iter_tasks(self, view='MINIMAL', name_prefix=None, page_size=None, limit=None):
+        """
+        Iterate over tasks fetching one page at a time following next_page_token
+        :param view: Affects the fields included in the returned Task messages (MINIMAL, BASIC or FULL), see list
+        :param name_prefix: Filter the list to include tasks where the name matches this prefix
+        :param page_size: Number of tasks to return in one page
+        :param limit: Stop after this many tasks
+        :return: generator of Task objects
+        """
+        page_token = None
+        count = 0
+        while True:
+            response = self.list(view, name_prefix, page_size, page_token)
+            for task in response.get('tasks') or []:
+                if limit is not None and count >= limit:
+                    return
+                count += 1
+                yield task
+            page_token = response.get('next_page_token')
+            if not page_token:
+                return
+
+    def list(self, view='MINIMAL', name_prefix=None, page_size=None, page_token=None):
         """
         List tasks
         :param view: Affects the fields included in the returned Task messages.
@@ -73,3 +112,84 @@ class TesClient(Client):
         data = dict(id=task_id, view=view)
         path = '/{version}/tasks/{id}'.format(version=self.api_version, id=task_id)
         return super().get(path, data)
+
+    def watch(self, task_ids=None, name_prefix=None, interval=5, max_interval=60, jitter=0.1, timeout=None,
+              callback=None, page_size=None, status_threshold=10):
+        """
+        Poll states of tasks with MINIMAL list calls and yield state transitions until all tasks reach a terminal state
+        (COMPLETE, EXECUTOR_ERROR, SYSTEM_ERROR, CANCELED or PREEMPTED)
+        :param task_ids: task IDs to watch
+        :param name_prefix: without task IDs, watch tasks whose name matches this prefix, including tasks created
+            while watching (task IDs or name prefix are required)
+        :param interval: initial seconds between polls, it grows while nothing changes
+        :param max_interval: maximum seconds between polls
+        :param jitter: fraction of interval randomly added or subtracted
+        :param timeout: raise TimeoutError after this many seconds
+        :param callback: function called with every Event
+        :param page_size: Number of tasks per list call
+        :param status_threshold: up to this many unfinished tasks are polled one by one instead of listed
+        :return: generator of wftools.watch.Event(id, previous, state), raises an exception for unknown tasks
+        """
+        task_ids = list(task_ids or [])
+        if not task_ids and name_prefix is None:
+            raise ValueError('Task IDs or a name prefix are required')
+
+        def state(task_id):
+            # a task without state (e.g. not found) would never reach a terminal state
+            task = self.status(task_id)
+            if not task.get('state'):
+                raise Exception('Unknown task {}: {}'.format(task_id, task.get('msg') or task.get('message') or task))
+            return task['state']
+
+        def fetch(active):
+            if task_ids and len(active) <= status_threshold:
+                return {task_id: state(task_id) for task_id in active}
+            states = dict()
+            for task in self.iter_tasks('MINIMAL', name_prefix, page_size):
+                if task['id'] in active or (not task_ids and name_prefix is not None):
+                    states[task['id']] = task.get('state') or state(task['id'])
+                    if task_ids and len(states) == len(active):
+                        # every watched task was found, skip remaining pages
+                        break
+            for task_id in active.difference(states) if task_ids else []:
+                # not listed, e.g. filtered out by name prefix
+                states[task_id] = state(task_id)
+            return states
+
+        return watch(fetch, task_ids, self.terminal_states, interval, max_interval, jitter=jitter, timeout=timeout,
+                     callback=callback)
+
+
+def read_tasks(path):
+    """
+    Read task documents from a file, a directory of files or stdin.
+    JSON files hold a task or an array of tasks, NDJSON files (.ndjson, .jsonl and stdin given as "-") one task per
+    line and YAML files (requires PyYAML) one or more documents.
+    :param path: file or directory path, or "-" for stdin
+    :return: generator of dict of tasks
+    """
+    if path == '-':
+        yield from _read_ndjson(sys.stdin)
+    elif os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            if name.endswith(TASK_EXTENSIONS):
+                yield from read_tasks(os.path.join(path, name))
+    elif path.endswith(('.ndjson', '.jsonl')):
+        with open(path) as file:
+            yield from _read_ndjson(file)
+    elif path.endswith(('.yaml', '.yml')):
+        if yaml is None:
+            raise Exception('Reading {} requires PyYAML, install wftools[yaml]'.format(path))
+        with open(path) as file:
+            for document in yaml.safe_load_all(file):
+                yield from document if isinstance(document, list) else [document]
+    else:
+        with open(path) as file:
+            document = json.load(file)
+        yield from document if isinstance(document, list) else [document]
+
+
+def _read_ndjson(file):
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
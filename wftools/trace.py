@@ -0,0 +1,108 @@
+import json
+import re
+import sys
+import threading
+from collections import OrderedDict, namedtuple
+
+RequestEvent = namedtuple('RequestEvent', ['method', 'url', 'template', 'status', 'bytes', 'wait', 'elapsed',
+                                           'decode', 'error'])
+RequestEvent.__doc__ = ('Timing of one HTTP request in seconds: wait until response headers (connection and server '
+                        'time), elapsed until the body was received and decode of JSON')
+
+EndpointStats = namedtuple('EndpointStats', ['method', 'template', 'count', 'errors', 'p50', 'p95', 'max', 'bytes',
+                                             'decode'])
+EndpointStats.__doc__ = 'Latency of requests to one endpoint in seconds, errors include HTTP error statuses'
+
+# path segments kept as is in templates, e.g. API versions
+VERSION = re.compile(r'v\d+(alpha\d*|beta\d*)?$')
+
+
+def percentile(values, q):
+    """
+    Percentile with linear interpolation between closest ranks
+    :param values: sorted sequence of numbers
+    :param q: percentile between 0 and 100
+    :return: float or None when values is empty
+    """
+    if not len(values):
+        return None
+    position = (len(values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def path_template(path):
+    """
+    Replace IDs in an API path so that requests to the same endpoint are grouped,
+    e.g. /api/workflows/v1/0f3c.../status gives /api/workflows/v1/{id}/status.
+    Segments after the API version holding digits are taken to be IDs.
+    :param path: API path
+    :return: path template
+    """
+    segments = []
+    versioned = False
+    for segment in path.split('?')[0].split('/'):
+        name, colon, action = segment.partition(':')
+        if versioned and any(c.isdigit() for c in name):
+            segment = '{id}' + colon + action
+        versioned = versioned or bool(VERSION.match(name))
+        segments.append(segment)
+    return '/'.join(segments)
+
+
+class Tracer:
+    """
+    Request hook of wftools.client.Client collecting timings by endpoint,
+    optionally writing every request to a file as NDJSON
+    """
+
+    def __init__(self, file=None):
+        """
+        Initializes Tracer
+        :param file: opened file receiving one JSON object per request
+        """
+        self.file = file
+        self.endpoints = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __call__(self, event):
+        """
+        Record a request
+        :param event: RequestEvent
+        """
+        with self.lock:
+            self.endpoints.setdefault((event.method, event.template), []).append(event)
+            if self.file is not None:
+                self.file.write(json.dumps(event._asdict()) + '\n')
+
+    def stats(self):
+        """
+        :return: list of EndpointStats, slowest endpoints (by total elapsed time) first
+        """
+        stats = []
+        with self.lock:
+            for (method, template), events in self.endpoints.items():
+                elapsed = sorted(e.elapsed for e in events)
+                errors = sum(1 for e in events if e.error or (e.status or 0) >= 400)
+                stats.append((sum(elapsed), EndpointStats(
+                    method, template, len(events), errors, percentile(elapsed, 50), percentile(elapsed, 95),
+                    elapsed[-1], sum(e.bytes or 0 for e in events), sum(e.decode or 0 for e in events))))
+        stats.sort(key=lambda s: s[0], reverse=True)
+        return [s for _, s in stats]
+
+    def report(self, file=None):
+        """
+        Write a table of latency by endpoint, durations in milliseconds
+        :param file: destination file (stderr by default)
+        """
+        file = file or sys.stderr
+        stats = self.stats()
+        if not stats:
+            return
+        file.write('{:6} {:40} {:>6} {:>6} {:>9} {:>9} {:>9} {:>11} {:>9}\n'.format(
+            'METHOD', 'ENDPOINT', 'COUNT', 'ERRORS', 'P50 ms', 'P95 ms', 'MAX ms', 'BYTES', 'DECODE ms'))
+        for s in stats:
+            file.write('{:6} {:40} {:>6} {:>6} {:>9.1f} {:>9.1f} {:>9.1f} {:>11} {:>9.1f}\n'.format(
+                s.method, s.template, s.count, s.errors, s.p50 * 1000, s.p95 * 1000, s.max * 1000, s.bytes,
+                s.decode * 1000))
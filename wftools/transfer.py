@@ -0,0 +1,355 @@
+import errno
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Linux ioctl that shares data blocks between two files (Btrfs, XFS, OCFS2 and others)
+FICLONE = 0x40049409
+CHUNK_SIZE = 64 * 1024 * 1024
+FALLBACK_ERRORS = (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.ENOTTY, errno.EOPNOTSUPP, errno.EBADF, errno.EPERM)
+
+
+class RateLimiter:
+    """
+    Token bucket shared by threads that limits the number of bytes transferred per second
+    """
+
+    def __init__(self, rate):
+        """
+        Initializes RateLimiter
+        :param rate: maximum bytes per second
+        """
+        self.rate = rate
+        self.allowance = rate
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def consume(self, size):
+        """
+        Block until `size` bytes can be transferred
+        :param size: number of bytes
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.allowance = min(self.rate, self.allowance + (now - self.last) * self.rate) - size
+            self.last = now
+            wait = -self.allowance / self.rate if self.allowance < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+class Progress:
+    """
+    Thread-safe counter of transferred files and bytes
+    """
+
+    def __init__(self, total_files):
+        self.total_files = total_files
+        self.files = 0
+        self.skipped = 0
+        self.bytes = 0
+        self.start = time.monotonic()
+        self.lock = threading.Lock()
+
+    def add_bytes(self, size):
+        with self.lock:
+            self.bytes += size
+
+    def add_file(self, skipped=False):
+        with self.lock:
+            self.files += 1
+            if skipped:
+                self.skipped += 1
+
+    def report(self):
+        """
+        :return: human readable summary of progress and throughput
+        """
+        elapsed = max(time.monotonic() - self.start, 1e-6)
+        return '{}/{} files ({} up to date), {:.1f} MB in {:.1f}s ({:.1f} MB/s)'.format(
+            self.files, self.total_files, self.skipped, self.bytes / 1e6, elapsed, self.bytes / 1e6 / elapsed)
+
+
+class Manifest:
+    """
+    Record of files transferred to a directory, stored as JSON lines in the directory itself.
+    Each entry holds the source path, size, modification time and optionally SHA-256 checksum of a destination file
+    so that interrupted or repeated transfers only process files that changed.
+    """
+    file_name = '.wftools-manifest.jsonl'
+
+    def __init__(self, directory):
+        """
+        Initializes Manifest loading existing entries
+        :param directory: destination directory
+        """
+        self.directory = directory
+        self.path = os.path.join(directory, self.file_name)
+        self.entries = dict()
+        self.lock = threading.Lock()
+        self.file = None
+        lines = 0
+        if os.path.exists(self.path):
+            with open(self.path) as file:
+                for line in file:
+                    lines += 1
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # last line of an interrupted run may be incomplete
+                        continue
+                    self.entries[entry['dst']] = entry
+        self.stale_lines = lines - len(self.entries)
+
+    def _key(self, dst_file):
+        return os.path.relpath(dst_file, self.directory)
+
+    def get(self, dst_file):
+        """
+        :param dst_file: destination file path
+        :return: manifest entry (dict) or None
+        """
+        return self.entries.get(self._key(dst_file))
+
+    def is_current(self, src_file, dst_file, src_stat=None, checksum=False):
+        """
+        Check whether destination file was transferred from source file and neither of them has changed since then
+        :param src_file: source file path
+        :param dst_file: destination file path
+        :param src_stat: os.stat_result of source file or None if it does not exist anymore (moved)
+        :param checksum: verify SHA-256 checksum of destination file if it was recorded
+        :return: True if destination file is up to date
+        """
+        entry = self.get(dst_file)
+        if entry is None or entry['src'] != src_file:
+            return False
+        if src_stat is not None and (src_stat.st_size != entry['size'] or src_stat.st_mtime_ns != entry['mtime']):
+            return False
+        try:
+            if os.stat(dst_file).st_size != entry['size']:
+                return False
+        except FileNotFoundError:
+            return False
+        if checksum and entry.get('sha256') and file_checksum(dst_file) != entry['sha256']:
+            return False
+        return True
+
+    def add(self, src_file, dst_file, src_stat, checksum=False):
+        """
+        Record a transferred file, the entry is written to disk immediately
+        :param src_file: source file path
+        :param dst_file: destination file path
+        :param src_stat: os.stat_result of source file before transfer
+        :param checksum: compute SHA-256 checksum of destination file
+        """
+        entry = dict(dst=self._key(dst_file), src=src_file, size=src_stat.st_size, mtime=src_stat.st_mtime_ns,
+                     sha256=file_checksum(dst_file) if checksum else None)
+        with self.lock:
+            if entry['dst'] in self.entries:
+                self.stale_lines += 1
+            self.entries[entry['dst']] = entry
+            if self.file is None:
+                self.file = open(self.path, 'a')
+            self.file.write(json.dumps(entry) + '\n')
+            self.file.flush()
+
+    def close(self):
+        """
+        Close manifest file, rewriting it without outdated entries if needed
+        """
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+            if self.stale_lines:
+                tmp_path = self.path + '.part'
+                with open(tmp_path, 'w') as file:
+                    for entry in self.entries.values():
+                        file.write(json.dumps(entry) + '\n')
+                os.replace(tmp_path, self.path)
+                self.stale_lines = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def file_checksum(path):
+    """
+    Compute SHA-256 checksum of a file
+    :param path: file path
+    :return: hexadecimal digest
+    """
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def _temporary_path(dst_file):
+    directory, name = os.path.split(dst_file)
+    return os.path.join(directory, '.' + name + '.part')
+
+
+def _commit(tmp_file, dst_file, overwrite):
+    """Atomically rename temporary file to destination, raising FileExistsError if it exists unless overwrite"""
+    if overwrite:
+        os.replace(tmp_file, dst_file)
+        return
+    try:
+        try:
+            os.link(tmp_file, dst_file)
+        except OSError as e:
+            if e.errno not in FALLBACK_ERRORS + (errno.ENOTSUP,):
+                raise
+            # no hard links on this file system (e.g. FUSE, SMB, exFAT): reserve destination name, then rename
+            os.close(os.open(dst_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL))
+            try:
+                os.replace(tmp_file, dst_file)
+            except BaseException:
+                os.unlink(dst_file)
+                raise
+    finally:
+        try:
+            os.unlink(tmp_file)
+        except FileNotFoundError:
+            pass
+
+
+def _reflink(src_fd, dst_fd):
+    if fcntl is None:
+        return False
+    try:
+        fcntl.ioctl(dst_fd, FICLONE, src_fd)
+        return True
+    except OSError as e:
+        if e.errno in FALLBACK_ERRORS:
+            return False
+        raise
+
+
+def _copy_range(src_fd, dst_fd, size, limiter, progress):
+    if not hasattr(os, 'copy_file_range'):
+        return False
+    copied = 0
+    while copied < size:
+        count = min(CHUNK_SIZE, size - copied)
+        if limiter is not None:
+            limiter.consume(count)
+        try:
+            sent = os.copy_file_range(src_fd, dst_fd, count)
+        except OSError as e:
+            if copied == 0 and e.errno in FALLBACK_ERRORS:
+                return False
+            raise
+        if sent == 0:
+            if copied == 0:
+                # some file systems report nothing copied instead of an error, copy by reading
+                return False
+            raise OSError(errno.EIO, 'Source file truncated while copying: {} of {} bytes copied'.format(copied, size))
+        copied += sent
+        if progress is not None:
+            progress.add_bytes(sent)
+    return True
+
+
+def _copy_stream(src, dst, limiter, progress):
+    while True:
+        chunk = src.read(CHUNK_SIZE if limiter is None else min(CHUNK_SIZE, max(int(limiter.rate), 1)))
+        if not chunk:
+            break
+        if limiter is not None:
+            limiter.consume(len(chunk))
+        dst.write(chunk)
+        if progress is not None:
+            progress.add_bytes(len(chunk))
+
+
+def copy_file(src_file, dst_file, overwrite=False, limiter=None, progress=None):
+    """
+    Copy file content using the fastest method available:
+    reflink (copy-on-write clone), copy_file_range (in-kernel copy) and then a buffered copy.
+    Data is written to a temporary file in the destination directory that is renamed when complete,
+    so destination file is never left partially written.
+    :param src_file: source file path
+    :param dst_file: destination file path
+    :param overwrite: replace destination file if it exists, otherwise raise FileExistsError
+    :param limiter: RateLimiter to cap bandwidth, it disables reflink
+    :param progress: Progress to be updated with transferred bytes
+    """
+    tmp_file = _temporary_path(dst_file)
+    if os.path.lexists(tmp_file):
+        # left by an interrupted transfer
+        os.unlink(tmp_file)
+    try:
+        with open(src_file, 'rb') as src, open(tmp_file, 'xb') as dst:
+            size = os.fstat(src.fileno()).st_size
+            if limiter is None and _reflink(src.fileno(), dst.fileno()):
+                if progress is not None:
+                    progress.add_bytes(size)
+            elif not _copy_range(src.fileno(), dst.fileno(), size, limiter, progress):
+                _copy_stream(src, dst, limiter, progress)
+        shutil.copymode(src_file, tmp_file)
+    except BaseException:
+        if os.path.lexists(tmp_file):
+            os.unlink(tmp_file)
+        raise
+    _commit(tmp_file, dst_file, overwrite)
+
+
+def link_file(src_file, dst_file, overwrite=False, limiter=None, progress=None):
+    """
+    Create a hard link to source file, copy it when source and destination are not on the same file system
+    :param src_file: source file path
+    :param dst_file: destination file path
+    :param overwrite: replace destination file if it exists, otherwise raise FileExistsError
+    :param limiter: RateLimiter to cap bandwidth of copy fallback
+    :param progress: Progress to be updated with transferred bytes
+    """
+    try:
+        if overwrite:
+            tmp_file = _temporary_path(dst_file)
+            if os.path.lexists(tmp_file):
+                os.unlink(tmp_file)
+            os.link(src_file, tmp_file)
+            _commit(tmp_file, dst_file, overwrite)
+        else:
+            os.link(src_file, dst_file)
+    except OSError as e:
+        if e.errno not in FALLBACK_ERRORS:
+            raise
+        copy_file(src_file, dst_file, overwrite, limiter, progress)
+
+
+def move_file(src_file, dst_file, overwrite=False, limiter=None, progress=None):
+    """
+    Move file by renaming it, copy and delete it when source and destination are not on the same file system
+    :param src_file: source file path
+    :param dst_file: destination file path
+    :param overwrite: replace destination file if it exists, otherwise raise FileExistsError
+    :param limiter: RateLimiter to cap bandwidth of copy fallback
+    :param progress: Progress to be updated with transferred bytes
+    """
+    try:
+        if overwrite:
+            os.replace(src_file, dst_file)
+        else:
+            # link + unlink is a rename that fails if destination exists
+            os.link(src_file, dst_file)
+            os.unlink(src_file)
+    except OSError as e:
+        if e.errno not in FALLBACK_ERRORS:
+            raise
+        copy_file(src_file, dst_file, overwrite, limiter, progress)
+        os.unlink(src_file)
@@ -0,0 +1,53 @@
+import random
+import time
+from collections import namedtuple
+
+Event = namedtuple('Event', ['id', 'previous', 'state'])
+Event.__doc__ = 'State transition of a workflow or task. previous is None when it is first seen'
+
+
+def watch(fetch, ids, terminal_states, interval=5, max_interval=60, backoff=1.5, jitter=0.1, timeout=None,
+          callback=None):
+    """
+    Poll states and yield an Event every time a state changes until all watched items reach a terminal state.
+    The polling interval grows by `backoff` while nothing changes, up to `max_interval`, and goes back to `interval`
+    after a change. Each sleep is randomized by +/- `jitter` to spread requests of many watchers.
+    :param fetch: function that receives the set of non-terminal IDs and returns a dict of {id: state}.
+        Items returned by fetch that are not in the set start being watched as well.
+    :param ids: IDs to watch, may be empty if fetch discovers them (watching ends if the first poll finds nothing)
+    :param terminal_states: states that end watching of an item
+    :param interval: initial seconds between polls
+    :param max_interval: maximum seconds between polls
+    :param backoff: factor applied to interval when nothing changed
+    :param jitter: fraction of interval randomly added or subtracted
+    :param timeout: raise TimeoutError after this many seconds
+    :param callback: function called with every Event
+    :return: generator of Event
+    """
+    states = dict.fromkeys(ids)
+    deadline = None if timeout is None else time.monotonic() + timeout
+    current_interval = interval
+    while True:
+        active = {i for i, state in states.items() if state not in terminal_states}
+        changed = False
+        for item_id, state in fetch(active).items():
+            previous = states.get(item_id)
+            if state != previous:
+                changed = True
+                states[item_id] = state
+                event = Event(item_id, previous, state)
+                if callback is not None:
+                    callback(event)
+                yield event
+
+        if all(state in terminal_states for state in states.values()):
+            return
+
+        current_interval = interval if changed else min(current_interval * backoff, max_interval)
+        sleep_time = current_interval * random.uniform(1 - jitter, 1 + jitter)
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError('Timed out waiting for {} of {}'.format(len(active), len(states)))
+            sleep_time = min(sleep_time, remaining)
+        time.sleep(sleep_time)
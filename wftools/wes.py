@@ -1,4 +1,9 @@
+import json
+import os
+
+from . import is_url
 from .client import Client
+from .multipart import MultipartEncoder
 
 
 class WesClient(Client):
@@ -6,9 +11,9 @@ class WesClient(Client):
     WES API client
     """
 
-    def __init__(self, host, api_version='v1'):
+    def __init__(self, host, api_version='v1', **kwargs):
         self.base_path = '/ga4gh/wes/' + api_version
-        super().__init__(host)
+        super().__init__(host, **kwargs)
 
     def abort(self, run_id):
         """
@@ -27,6 +32,26 @@ class WesClient(Client):
         path = self._get_path('service-info')
         return super().get(path)
 
+    def iter_runs(self, page_size=None, limit=None):
+        """
+        Iterate over workflow runs fetching one page at a time following next_page_token
+        :param page_size: Number of runs to return in one page
+        :param limit: Stop after this many runs
+        :return: generator of run objects (run_id and state)
+        """
+        page_token = None
+        count = 0
+        while True:
+            response = self.list(page_size, page_token)
+            for run in response.get('runs') or []:
+                if limit is not None and count >= limit:
+                    return
+                count += 1
+                yield run
+            page_token = response.get('next_page_token')
+            if not page_token:
+                return
+
     def list(self, page_size=None, page_token=None):
         """
         List the workflow runs
@@ -56,33 +81,83 @@ class WesClient(Client):
         path = self._get_path('{id}/status'.format(id=run_id))
         return super().get(path)
 
-    def submit(self, workflow_url, workflow_params, workflow_type, workflow_type_version, workflow_attachment,
+    def submit(self, workflow_url, workflow_params, workflow_type, workflow_type_version, workflow_attachment=None,
                workflow_engine_parameters=None, tags=None):
         """
-        Run a workflow
-        :param workflow_url: URL or relative path (attachment) to primary workflow
-        :param workflow_params: path to workflow params JSON file
+        Run a workflow. The request body is streamed with one part per attachment, so large bundles are not loaded
+        in memory.
+        :param workflow_url: URL or path to primary workflow, relative to attachments or a local file to be attached
+        :param workflow_params: path to workflow params JSON file or dict
         :param workflow_type: workflow language (CWL, WDL)
         :param workflow_type_version: version of the workflow language
-        :param tags: list of tags to label workflow submission
-        :param workflow_engine_parameters: path to engine-specific params JSON fie
-        :param workflow_attachment: dict of {filename: file_path} of workflow files
-        :return:
+        :param workflow_attachment: dict of {filename: file_path}, or list of file and directory paths
+            (files of directories are attached with paths relative to the directory)
+        :param workflow_engine_parameters: path to engine-specific params JSON file or dict
+        :param tags: path to JSON file or dict of tags to label workflow submission
+        :return: dict with run_id
         """
-        data = dict(workflow_url=workflow_url, workflow_type=workflow_type, workflow_type_version=workflow_type_version,
-                    tags=tags)
-
-        data['workflow_attachment'] = dict()
-        for filename, file_path in workflow_attachment.items():
-            data['workflow_attachment'][filename] = open(file_path)
-
-        data['workflow_params'] = open(workflow_params)
+        attachments = attachment_files(workflow_attachment)
+        if not is_url(workflow_url) and os.path.isfile(workflow_url):
+            workflow_url = self._attach_workflow(workflow_url, attachments)
 
-        if workflow_engine_parameters:
-            data['workflow_engine_parameters'] = open(workflow_engine_parameters)
+        fields = [('workflow_params', _json_field(workflow_params)), ('workflow_type', workflow_type),
+                  ('workflow_type_version', workflow_type_version), ('workflow_url', workflow_url)]
+        if tags is not None:
+            fields.append(('tags', _json_field(tags)))
+        if workflow_engine_parameters is not None:
+            fields.append(('workflow_engine_parameters', _json_field(workflow_engine_parameters)))
+        fields += [('workflow_attachment', (name, file_path)) for name, file_path in attachments]
 
+        body = MultipartEncoder([(name, value) for name, value in fields if value is not None])
         path = self._get_path('runs')
-        return super().post(path, data)
+        try:
+            return super().post(path, body=body, content_type=body.content_type)
+        finally:
+            body.close()
+
+    @staticmethod
+    def _attach_workflow(workflow, attachments):
+        """Attach local workflow file unless already attached, return its name relative to attachments"""
+        workflow = os.path.abspath(workflow)
+        for name, file_path in attachments:
+            if os.path.abspath(file_path) == workflow:
+                return name
+        name = os.path.basename(workflow)
+        attachments.append((name, workflow))
+        return name
 
     def _get_path(self, part):
         return '{base_path}/{part}'.format(base_path=self.base_path, part=part)
+
+
+def attachment_files(workflow_attachment):
+    """
+    List files to attach to a run
+    :param workflow_attachment: dict of {filename: file_path}, or list of file and directory paths
+    :return: list of (filename, file_path) tuples
+    """
+    if not workflow_attachment:
+        return []
+    if isinstance(workflow_attachment, dict):
+        return list(workflow_attachment.items())
+    attachments = []
+    for path in workflow_attachment:
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                dirs.sort()
+                for name in sorted(names):
+                    file_path = os.path.join(root, name)
+                    attachments.append((os.path.relpath(file_path, path).replace(os.sep, '/'), file_path))
+        else:
+            attachments.append((os.path.basename(path), path))
+    return attachments
+
+
+def _json_field(value):
+    """Serialize dict as JSON string, or read and validate JSON file"""
+    if value is None:
+        return None
+    if isinstance(value, dict):
+        return json.dumps(value)
+    with open(value) as file:
+        return json.dumps(json.load(file))